@@ -0,0 +1,136 @@
+"""
+Build the processed movie dataset without Jupyter.
+
+Runs the same load -> preprocess -> merge -> clean -> inflate -> check -> export
+pipeline as src/notebooks/data_preparation.ipynb. Run it from the repository root:
+
+    python -m src.build_dataset --data-dir data/ --format all --workers 4 --profile
+"""
+
+import sys
+import time
+import argparse
+
+from src.utils.pipeline_utils import CACHE_DIR, build_data_preparation_pipeline
+
+
+def _peak_rss_bytes():
+    """Peak resident memory of the process, None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_bytes(n_bytes):
+    if n_bytes is None:
+        return "n/a"
+    return f"{n_bytes / 2**20:,.1f} MiB"
+
+
+def print_report(report, total_seconds):
+    """Print the per-stage timings (and peak memory if profiled) of a pipeline run."""
+    profiled = any("peak_bytes" in entry for entry in report)
+    header = f"{'stage':<18}{'status':<10}{'seconds':>10}"
+    if profiled:
+        header += f"{'peak memory':>16}"
+    print(header)
+    print("-" * len(header))
+    for entry in report:
+        line = (
+            f"{entry['stage']:<18}"
+            f"{'cached' if entry['cached'] else 'run':<10}"
+            f"{entry['seconds']:>10.2f}"
+        )
+        if profiled:
+            line += f"{_format_bytes(entry.get('peak_bytes')):>16}"
+        print(line)
+    print("-" * len(header))
+    print(f"{'total':<28}{total_seconds:>10.2f}")
+    print(f"Peak resident memory: {_format_bytes(_peak_rss_bytes())}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build data/processed/movies_processed.csv from the raw datasets."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default="data/",
+        help="directory containing the MovieSummaries, TMDB and IMDB folders",
+    )
+    parser.add_argument(
+        "--cpi-file", default="data/Inflation/CPIAUCNS.csv", help="CPI data file"
+    )
+    parser.add_argument(
+        "--target-year",
+        type=int,
+        default=None,
+        help="year to adjust money to (defaults to the latest release year)",
+    )
+    parser.add_argument(
+        "--output-dir", default="data/processed/", help="output directory"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "all"],
+        default="csv",
+        help="output format of the processed dataset",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of IMDb files loaded in parallel",
+    )
+    parser.add_argument(
+        "--cache-dir", default=CACHE_DIR, help="directory of the stage cache"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="ignore the cache and rerun every stage"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="trace allocations to report the peak memory of every stage",
+    )
+    args = parser.parse_args(argv)
+    # the pipeline builds file paths by concatenation
+    if not args.data_dir.endswith("/"):
+        args.data_dir += "/"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipeline = build_data_preparation_pipeline(
+        path=args.data_dir,
+        cpi_file=args.cpi_file,
+        target_year=args.target_year,
+        output_dir=args.output_dir,
+        output_format=args.format,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+    )
+
+    start = time.perf_counter()
+    try:
+        outputs = pipeline.run(force=args.force, profile=args.profile)
+    except (ValueError, OSError) as error:
+        # failed checks, or a missing or unreadable input file
+        print(f"Build failed: {error}", file=sys.stderr)
+        return 1
+    total_seconds = time.perf_counter() - start
+
+    print()
+    print_report(pipeline.report, total_seconds)
+    for path in outputs["output_paths"]:
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Export every datastory figure without Jupyter.
+
+Computes the figure inputs once from the processed dataset, then builds and
+writes the figures in parallel. Figures whose inputs did not change since
+the last export are skipped. Run it from the repository root:
+
+    python -m src.export_figures --workers 4 --plotlyjs shared
+"""
+
+import sys
+import time
+import argparse
+
+from src.utils.export_utils import export_datastory_figures
+from src.utils.figure_utils import DATASTORY_ROOT
+from src.utils.storage_utils import load_processed_movies
+
+
+def print_report(report, total_seconds):
+    """Print the status and build/write times of every figure."""
+    header = f"{'figure':<48}{'status':<10}{'build s':>10}{'write s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report.iterrows():
+        print(
+            f"{name:<48}{row['status']:<10}"
+            f"{row['build_seconds']:>10.2f}{row['write_seconds']:>10.2f}"
+        )
+    print("-" * len(header))
+    counts = report["status"].value_counts()
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    print(f"Inputs computed in {report.attrs['inputs_seconds']:.2f}s")
+    print(f"Total {total_seconds:.2f}s")
+    for name, error in report["error"].dropna().items():
+        print(f"{name} failed: {error}", file=sys.stderr)
+
+
+def _plotlyjs(value):
+    return {"true": True, "false": False}.get(value.lower(), value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write the datastory figures from the processed dataset."
+    )
+    parser.add_argument(
+        "--data",
+        default=None,
+        help="processed dataset (defaults to the Parquet cache, or the CSV export)",
+    )
+    parser.add_argument("--output-dir", default=DATASTORY_ROOT, help="output root")
+    parser.add_argument(
+        "--plotlyjs",
+        type=_plotlyjs,
+        default="cdn",
+        help="where the HTML files get plotly.js from: cdn, shared or true (embedded)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="number of figures built in parallel"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=None,
+        help="sections (echo, shades, tongues, starlight, treasure) or figures",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild every figure, even if its inputs are unchanged",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    df = load_processed_movies(args.data)
+    report = export_datastory_figures(
+        df,
+        root=args.output_dir,
+        include_plotlyjs=args.plotlyjs,
+        workers=args.workers,
+        only=args.only,
+        force=args.force,
+    )
+    total_seconds = time.perf_counter() - start
+
+    print_report(report, total_seconds)
+    return int((report["status"] == "failed").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
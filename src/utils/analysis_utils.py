@@ -1,11 +1,16 @@
-import ast
 import numpy as np
 import pandas as pd
 from scipy.stats import pearsonr, spearmanr, f_oneway
+from scipy.stats import t as t_dist
 
+from src.utils.encoding_utils import parse_tuple_list
+from src.utils.index_utils import GenreIndex
 
-def genre_correlation(df, genre):
-    genre_data = df[df["genres_list"].apply(lambda x: genre in x)]
+
+def genre_correlation(df, genre, genre_index=None):
+    if genre_index is None:
+        genre_index = GenreIndex.from_frame(df)
+    genre_data = df.iloc[genre_index.rows(genre)]
     pearson_corr, _ = pearsonr(
         genre_data["averageRating"], np.log10(genre_data["inflated_revenue"])
     )
@@ -17,16 +22,111 @@ def genre_correlation(df, genre):
     )
 
 
+def _segmented_average_ranks(values, segments, n_segments):
+    """
+    Rank values within each segment, giving tied values their average rank.
+
+    Args:
+        values (np.ndarray): values to rank
+        segments (np.ndarray): segment id of every value
+        n_segments (int): number of segments
+
+    Returns:
+        np.ndarray: 1-based rank of every value within its segment
+    """
+    order = np.lexsort((values, segments))
+    sorted_values = values[order]
+    sorted_segments = segments[order]
+
+    # position of every value within its segment (1-based)
+    segment_starts = np.zeros(n_segments + 1, dtype=np.int64)
+    np.cumsum(np.bincount(segments, minlength=n_segments), out=segment_starts[1:])
+    positions = np.arange(len(values)) - segment_starts[sorted_segments] + 1
+
+    # runs of equal values within a segment share the mean of their positions
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = (sorted_segments[1:] != sorted_segments[:-1]) | (
+        sorted_values[1:] != sorted_values[:-1]
+    )
+    run_ids = np.cumsum(new_run) - 1
+    run_ranks = np.bincount(run_ids, weights=positions) / np.bincount(run_ids)
+
+    ranks = np.empty(len(values))
+    ranks[order] = run_ranks[run_ids]
+    return ranks
+
+
+def _segmented_pearson(x, y, segments, n_segments):
+    """Pearson correlation of x and y within each segment (NaN if undefined)."""
+    counts = np.bincount(segments, minlength=n_segments).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.bincount(segments, weights=x, minlength=n_segments) / counts
+        mean_y = np.bincount(segments, weights=y, minlength=n_segments) / counts
+        dx = x - mean_x[segments]
+        dy = y - mean_y[segments]
+        sxy = np.bincount(segments, weights=dx * dy, minlength=n_segments)
+        sxx = np.bincount(segments, weights=dx * dx, minlength=n_segments)
+        syy = np.bincount(segments, weights=dy * dy, minlength=n_segments)
+        corr = sxy / np.sqrt(sxx * syy)
+    corr[counts < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def genre_correlations(df, genres=None, genre_index=None, x_column="averageRating"):
+    """
+    Pearson and Spearman correlations between rating and log revenue for every genre.
+
+    Equivalent to calling genre_correlation once per genre, but all genres are
+    computed together with segmented operations over the genre index.
+
+    Args:
+        df (pd.DataFrame): DataFrame with "genres_list", "averageRating" and "inflated_revenue"
+        genres (list): genres to compute, defaults to all genres in the index
+        genre_index (GenreIndex): optional pre-built index over df["genres_list"]
+        x_column (str): column correlated with the log revenue instead of the
+            rating (e.g. "log_budget")
+
+    Returns:
+        pd.DataFrame: "Pearson" and "Spearman" columns indexed by "Genre", NaN
+        for genres with fewer than two movies or constant values
+    """
+    if genre_index is None:
+        genre_index = GenreIndex.from_frame(df)
+    if genres is None:
+        genres = genre_index.genres.tolist()
+
+    # (genre, movie) membership pairs for the requested genres
+    postings = [genre_index.rows(genre) for genre in genres]
+    segments = np.repeat(np.arange(len(genres)), [len(rows) for rows in postings])
+    rows = np.concatenate(postings) if postings else np.empty(0, dtype=np.int64)
+
+    x = df[x_column].to_numpy(dtype=float)[rows]
+    y = np.log10(df["inflated_revenue"].to_numpy(dtype=float))[rows]
+
+    pearson = _segmented_pearson(x, y, segments, len(genres))
+    spearman = _segmented_pearson(
+        _segmented_average_ranks(x, segments, len(genres)),
+        _segmented_average_ranks(y, segments, len(genres)),
+        segments,
+        len(genres),
+    )
+
+    return pd.DataFrame(
+        {"Pearson": pearson, "Spearman": spearman},
+        index=pd.Index(genres, name="Genre"),
+    )
+
+
 def extract_names(columns):
     names = []
     for column in columns:
-        literals = ast.literal_eval(column)
+        literals = parse_tuple_list(column)
         names.extend([literals[1] for literals in literals])
     return names
 
 
 def extract_first_language(language_list):
-    parsed_language_list = ast.literal_eval(language_list)
+    parsed_language_list = parse_tuple_list(language_list)
     return parsed_language_list[0][1] if len(parsed_language_list) > 0 else None
 
 
@@ -34,11 +134,11 @@ def extract_languages(language_list):
     """
     Extract the language names from a list of tuples
     Args:
-        language_list (str): a string representation of a list of tuples (each tuple contains a language code and language name)
+        language_list (str | list): a list of tuples, or its string representation (each tuple contains a language code and language name)
     Returns:
         list: a list containing only the language names
     """
-    parsed_language_list = ast.literal_eval(language_list)
+    parsed_language_list = parse_tuple_list(language_list)
     return [
         item[1]
         for item in parsed_language_list
@@ -47,64 +147,101 @@ def extract_languages(language_list):
 
 
 def extract_first_country(country_list):
-    parsed_country_list = ast.literal_eval(country_list)
+    parsed_country_list = parse_tuple_list(country_list)
     return parsed_country_list[0][1] if len(parsed_country_list) > 0 else None
 
 
-def get_movies_with_genres(df, genres):
+def get_movies_with_genres(df, genres, genre_index=None):
     """
     Get a list of movies that have at least one of the specified genres.
 
     Args:
         df (pd.DataFrame): DataFrame containing movie data
         genres (list): List of genres to search for
+        genre_index (GenreIndex): optional pre-built index over df["genres_list"]
 
     Returns:
         list: List of movie names
     """
-    set_genres = set(genres)
-    movies = []
-    for movie_name, genre_list in zip(df["movie_name"], df["genres_list"]):
-        # make the genre_list a set
-        set_movie_genres = set(genre_list)
-        # check if the intersection is not empty
-        if set_movie_genres.intersection(set_genres):
-            movies.append(movie_name)
-    return movies
-
-
-def calculate_count_revenue_correlation(mean_revenue_pivot, genre_year_pivot):
-    correlation_results = []
-    genres = genre_year_pivot.columns
-    for genre in genres:
-        # create a combined dataframe
-        combined_df = pd.DataFrame(
-            {
-                "mean_revenue": mean_revenue_pivot[genre],
-                "movie_count": genre_year_pivot[genre],
-            }
+    if genre_index is None:
+        genre_index = GenreIndex.from_frame(df)
+    return df["movie_name"].to_numpy()[genre_index.any_of(genres)].tolist()
+
+
+def _masked_column_pearson(x, y, mask):
+    """
+    Pearson correlation between the columns of x and y, using only masked-in cells.
+
+    Returns:
+        tuple: (correlations, number of cells used) per column
+    """
+    n = mask.sum(axis=0)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dx = np.where(mask, x - x.sum(axis=0) / n, 0.0)
+        dy = np.where(mask, y - y.sum(axis=0) / n, 0.0)
+        corr = (dx * dy).sum(axis=0) / np.sqrt(
+            (dx * dx).sum(axis=0) * (dy * dy).sum(axis=0)
         )
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0), n
+
+
+def _correlation_pvalues(corr, n):
+    """Two-sided p-values of correlation coefficients under the t-distribution."""
+    dof = n - 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = corr * np.sqrt(dof / ((1.0 - corr) * (1.0 + corr)))
+    pvalues = 2 * t_dist.sf(np.abs(t), dof)
+    pvalues[np.abs(corr) == 1.0] = 0.0
+    pvalues[n < 3] = np.nan
+    return pvalues
+
+
+def calculate_count_revenue_correlation(
+    mean_revenue_pivot, genre_year_pivot, return_pvalues=False
+):
+    """
+    Correlation between mean revenue and movie count over time, for every genre.
+
+    Works on the two pivot tables as matrices: for each genre column, the
+    periods where both the mean revenue and the count are positive are used.
+
+    Args:
+        mean_revenue_pivot (pd.DataFrame): mean revenue per period (rows) and genre (columns)
+        genre_year_pivot (pd.DataFrame): movie count per period (rows) and genre (columns)
+        return_pvalues (bool): also return "Pearson_pvalue" and "Spearman_pvalue"
+
+    Returns:
+        pd.DataFrame: "Pearson" and "Spearman" columns indexed by the sorted "Genre"
+    """
+    genres = genre_year_pivot.columns
+    revenue, count = mean_revenue_pivot[genres].align(
+        genre_year_pivot, join="outer", axis=0
+    )
+    x = revenue.to_numpy(dtype=float)
+    y = count.to_numpy(dtype=float)
+
+    # drop cells where mean revenue or count is 0 (or missing)
+    with np.errstate(invalid="ignore"):
+        mask = (x > 0) & (y > 0)
+
+    pearson_corr, n = _masked_column_pearson(x, y, mask)
+
+    # rank the remaining cells of every column, ties get their average rank
+    x_ranks = pd.DataFrame(np.where(mask, x, np.nan)).rank().to_numpy()
+    y_ranks = pd.DataFrame(np.where(mask, y, np.nan)).rank().to_numpy()
+    spearman_corr, _ = _masked_column_pearson(x_ranks, y_ranks, mask)
+
+    correlation_df = pd.DataFrame(
+        {"Pearson": pearson_corr, "Spearman": spearman_corr},
+        index=pd.Index(genres, name="Genre"),
+    )
+    if return_pvalues:
+        correlation_df["Pearson_pvalue"] = _correlation_pvalues(pearson_corr, n)
+        correlation_df["Spearman_pvalue"] = _correlation_pvalues(spearman_corr, n)
 
-        # drop rows where mean revenue or count is 0
-        filtered_df = combined_df[
-            (combined_df["mean_revenue"] > 0) & (combined_df["movie_count"] > 0)
-        ]
-
-        if not filtered_df.empty:
-            # calculate Pearson and Spearman correlations
-            pearson_corr, _ = pearsonr(
-                filtered_df["mean_revenue"], filtered_df["movie_count"]
-            )
-            spearman_corr, _ = spearmanr(
-                filtered_df["mean_revenue"], filtered_df["movie_count"]
-            )
-
-            # append results to the list
-            correlation_results.append(
-                {"Genre": genre, "Pearson": pearson_corr, "Spearman": spearman_corr}
-            )
-
-    # convert the list to a dataframe
-    correlation_df = pd.DataFrame(correlation_results)
-    correlation_df = correlation_df.set_index("Genre").sort_index()
+    # genres without any usable period are left out
+    correlation_df = correlation_df[n > 0].sort_index()
     return correlation_df
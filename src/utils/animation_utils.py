@@ -0,0 +1,452 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+from typing import Dict, List, Optional, Sequence
+
+# Animated figures are built as one base trace holding everything that does not
+# change over time (labels, colours, category order, hover templates) and frames
+# holding only the changing arrays. plotly.js merges every frame into the base
+# trace, so attributes missing from a frame keep their base value. Numeric
+# arrays are passed as numpy arrays, which plotly serializes as typed arrays
+# ({"dtype", "bdata"}) instead of JSON number lists.
+
+
+def to_typed_array(values) -> np.ndarray:
+    """
+    Convert numeric values to a compact numpy array.
+
+    Integers are kept as they are, since plotly already serializes int64 and
+    uint64 arrays on the smallest typed array holding them. Booleans become
+    int8 and everything else float64 (revenues do not fit the precision of
+    float32).
+
+    Args:
+        values: list, Series or array of numbers
+
+    Returns:
+        np.ndarray: the values
+    """
+    array = np.asarray(values)
+    if array.dtype.kind in "iu":
+        return array
+    if array.dtype.kind == "b":
+        return array.astype(np.int8)
+    return array.astype(np.float64)
+
+
+def discrete_colorscale(colors: Sequence[str]) -> List[list]:
+    """
+    Colorscale mapping the integer codes 0..len(colors)-1 to the given colours.
+
+    Used with cmin=-0.5 and cmax=len(colors)-0.5, so that frames carry
+    integer colour codes instead of repeating colour strings.
+    """
+    n = len(colors)
+    scale = []
+    for i, color in enumerate(colors):
+        scale.append([i / n, color])
+        scale.append([(i + 1) / n, color])
+    return scale
+
+
+def _delta_trace(trace_type, changes: Dict):
+    typed = {}
+    for key, value in changes.items():
+        if isinstance(value, dict):
+            typed[key] = {k: _typed_value(v) for k, v in value.items()}
+        else:
+            typed[key] = _typed_value(value)
+    return trace_type(**typed)
+
+
+def _typed_value(value):
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+        array = np.asarray(value)
+        if array.dtype.kind in "iufb":
+            return to_typed_array(array)
+        return array.tolist()
+    return value
+
+
+def add_delta_frames(
+    fig: go.Figure,
+    frames: Dict[str, List[Dict]],
+    layouts: Optional[Dict[str, Dict]] = None,
+) -> go.Figure:
+    """
+    Set the animation frames of a figure, each only holding what changes.
+
+    Args:
+        fig (go.Figure): figure whose traces hold the static attributes
+        frames (dict): frame name -> list with, for each trace of the figure,
+            a dict of the attributes changing in that frame (e.g. {"x": ...})
+        layouts (dict): optional frame name -> layout attributes changing in
+            that frame (e.g. an axis range)
+
+    Returns:
+        go.Figure: the figure
+    """
+    trace_types = [type(trace) for trace in fig.data]
+    layouts = layouts or {}
+    fig.frames = [
+        go.Frame(
+            data=[
+                _delta_trace(trace_types[i], changes)
+                for i, changes in enumerate(traces)
+            ],
+            traces=list(range(len(traces))),
+            layout=layouts.get(name),
+            name=str(name),
+        )
+        for name, traces in frames.items()
+    ]
+    return fig
+
+
+def ranked_bar_frames(pivot: pd.DataFrame) -> Dict[str, List[Dict]]:
+    """
+    Delta frames of a racing bar chart: the value and rank of every category.
+
+    Every row of the pivot is a frame and every column a category, whose bar
+    keeps its position in the base trace (and so its label and colour) while
+    its y coordinate is its rank in the frame, 0 being the largest value.
+
+    Args:
+        pivot (pd.DataFrame): time x category values, without missing values
+
+    Returns:
+        dict: frame name -> [{"x": values, "y": ranks}]
+    """
+    values = pivot.to_numpy(dtype=float)
+    order = np.argsort(-values, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(values.shape[1])[None, :], axis=1)
+    return {
+        str(name): [{"x": values[i], "y": ranks[i]}]
+        for i, name in enumerate(pivot.index)
+    }
+
+
+def cumulative_top_k(
+    df: pd.DataFrame,
+    item_column: str,
+    value_column: str,
+    time_column: str,
+    k: int,
+    times: Optional[Sequence] = None,
+) -> pd.DataFrame:
+    """
+    Top k items by cumulative value at every time step, e.g. the directors with
+    the highest total revenue up to every year.
+
+    The values are summed per (time, item) from sorted arrays, and the running
+    totals are kept in one array over the items (no time x item grid). With
+    non-negative values, the top k of a step can only contain the previous
+    top k and the items updated in that step, so only those are ranked, with
+    a partition before the final sort. Ties are ranked by first appearance of
+    the item over time.
+
+    Args:
+        df (pd.DataFrame): one row per event (e.g. a movie)
+        item_column (str): column of the ranked items
+        value_column (str): column of the values, missing values count as 0
+        time_column (str): column of the time steps
+        k (int): number of items kept at every step
+        times (list): time steps reported, defaults to the unique times of df
+            (steps without events keep the previous ranking)
+
+    Returns:
+        pd.DataFrame: time, item, cumulative value and rank (0 for the
+        largest) of the top items of every step, sorted by time and rank
+    """
+    df = df[df[item_column].notna() & df[time_column].notna()]
+    df = df.sort_values(time_column, kind="stable")
+    codes, items = pd.factorize(df[item_column])
+    event_times = df[time_column].to_numpy()
+    values = df[value_column].fillna(0).to_numpy(dtype=float)
+
+    # sum per (time, item), sorted by time
+    order = np.lexsort((codes, event_times))
+    codes, event_times, values = codes[order], event_times[order], values[order]
+    if len(codes):
+        starts = np.flatnonzero(
+            np.r_[
+                True, (codes[1:] != codes[:-1]) | (event_times[1:] != event_times[:-1])
+            ]
+        )
+        codes, event_times = codes[starts], event_times[starts]
+        values = np.add.reduceat(values, starts)
+
+    steps = np.unique(event_times if times is None else np.asarray(times))
+    # events up to every step, the ones between two steps count in the later one
+    bounds = np.searchsorted(event_times, steps, side="right")
+    incremental = bool((values >= 0).all())
+
+    totals = np.zeros(len(items))
+    active = np.zeros(len(items), dtype=bool)
+    top = np.empty(0, dtype=np.int64)
+    start = 0
+    results = []
+    for step, end in zip(steps, bounds):
+        updated = codes[start:end]
+        np.add.at(totals, updated, values[start:end])
+        start = end
+        if incremental:
+            candidates = np.union1d(top, updated)
+        else:
+            active[updated] = True
+            candidates = np.flatnonzero(active)
+        if len(candidates) > k:
+            candidate_totals = totals[candidates]
+            kth = np.partition(candidate_totals, len(candidates) - k)[
+                len(candidates) - k
+            ]
+            candidates = candidates[candidate_totals >= kth]
+        top = candidates[np.lexsort((candidates, -totals[candidates]))][:k]
+        results.append((np.full(len(top), step), top, totals[top]))
+
+    if not results:
+        return pd.DataFrame(columns=[time_column, item_column, value_column, "rank"])
+    step_values, top_codes, top_totals = (np.concatenate(r) for r in zip(*results))
+    return pd.DataFrame(
+        {
+            time_column: step_values,
+            item_column: items.take(top_codes),
+            value_column: top_totals,
+            "rank": np.concatenate([np.arange(len(r[1])) for r in results]),
+        }
+    )
+
+
+def race_frames(
+    top: pd.DataFrame, item_column: str, value_column: str, time_column: str
+):
+    """
+    Delta frames of a racing bar chart from the output of cumulative_top_k.
+
+    Every item ever in the top has a bar in the base trace (label and colour
+    stored once); frames carry the values and ranks. The value is missing,
+    which hides the bar, when the item is not in the top of that step.
+
+    Returns:
+        tuple: the items, in order of first appearance in the top, and the
+        frames (step -> [{"x": values, "y": ranks}])
+    """
+    items = pd.unique(top[item_column])
+    values = top.pivot(index=time_column, columns=item_column, values=value_column)
+    ranks = top.pivot(index=time_column, columns=item_column, values="rank")
+    values = values.reindex(columns=items).to_numpy(dtype=float)
+    # hidden bars have no value, their rank (-1) keeps the ranks integers
+    ranks = ranks.reindex(columns=items).fillna(-1).to_numpy(dtype=int)
+    steps = top[time_column].unique()
+    return items, {
+        str(step): [{"x": values[i], "y": ranks[i]}] for i, step in enumerate(steps)
+    }
+
+
+def treemap_top_data(year_data: pd.DataFrame, mode: str, top_n: int) -> pd.DataFrame:
+    """
+    Tiles of a treemap of one year: its top movies or directors by revenue.
+
+    Args:
+        year_data (pd.DataFrame): movies of the year, with the movie_name,
+            director and inflated_revenue columns
+        mode (str): "movies" for the top movies, "directors" for the top
+            directors (with their movie names joined by commas)
+        top_n (int): number of tiles
+
+    Returns:
+        pd.DataFrame: movie_name, director and inflated_revenue of the tiles
+    """
+    if mode == "movies":
+        return year_data.nlargest(top_n, "inflated_revenue")[
+            ["movie_name", "director", "inflated_revenue"]
+        ].reset_index()
+    if mode == "directors":
+        top_data = (
+            year_data.groupby("director")["inflated_revenue"]
+            .sum()
+            .nlargest(top_n)
+            .reset_index()
+        )
+        top_data["movie_name"] = top_data["director"].apply(
+            lambda x: ",".join(year_data[year_data["director"] == x]["movie_name"])
+        )
+        return top_data
+    raise ValueError("Invalid mode. Choose 'movies' or 'directors'.")
+
+
+def treemap_tables(
+    data: pd.DataFrame, mode: str, top_n: int, year_column: str = "release_year"
+) -> Dict:
+    """
+    Tiles of the treemaps of all years at once (see treemap_top_data).
+
+    One sort and one top-n per year replace the per-year filtering of the
+    whole table. In "directors" mode a single groupby over (year, director)
+    sums the revenues, and the movie names are joined for the selected
+    directors only.
+
+    Args:
+        data (pd.DataFrame): movies, with the movie_name, director,
+            inflated_revenue and year columns
+        mode (str): "movies" or "directors"
+        top_n (int): number of tiles per year
+        year_column (str): column of the years
+
+    Returns:
+        dict: year -> tiles of the year, in the order of treemap_top_data,
+        for every year of the data
+    """
+    if mode == "movies":
+        tiles = data[[year_column, "movie_name", "director", "inflated_revenue"]]
+    elif mode == "directors":
+        tiles = (
+            data.groupby([year_column, "director"], sort=True)["inflated_revenue"]
+            .sum()
+            .reset_index()
+        )
+    else:
+        raise ValueError("Invalid mode. Choose 'movies' or 'directors'.")
+
+    # stable sort with missing revenues last, so that ties keep their order
+    # and years with fewer than top_n revenues are padded as with nlargest
+    tiles = tiles.sort_values(
+        [year_column, "inflated_revenue"], ascending=[True, False], kind="stable"
+    )
+    tiles = tiles.groupby(year_column, sort=False).head(top_n)
+
+    if mode == "directors":
+        # join the movie names of the selected (year, director) groups only
+        keys = pd.MultiIndex.from_frame(tiles[[year_column, "director"]])
+        rows = data[
+            pd.MultiIndex.from_frame(data[[year_column, "director"]]).isin(keys)
+        ]
+        names = rows.groupby([year_column, "director"], sort=False)[
+            "movie_name"
+        ].agg(",".join)
+        tiles["movie_name"] = names.reindex(keys).to_numpy()
+    tables = {
+        year: table.drop(columns=year_column).reset_index(drop=True)
+        for year, table in tiles.groupby(year_column, sort=True)
+    }
+    # years without any tile still get their (empty) frame
+    empty = tiles.iloc[:0].drop(columns=year_column)
+    return {
+        year: tables.get(year, empty)
+        for year in sorted(data[year_column].dropna().unique())
+    }
+
+
+def treemap_animation(
+    tables: Dict,
+    label_column: str,
+    text_column: str,
+    color_column: str,
+    colors: Sequence[str],
+    hovertemplate: str,
+    start=None,
+    value_column: str = "inflated_revenue",
+) -> go.Figure:
+    """
+    Animated treemap with one frame per table and flat (parent-less) tiles.
+
+    The base trace holds the tile ids and parents, the colorscale and the
+    hover template; frames carry the tile labels and hover text (which change
+    from one frame to the next), the values and integer colour codes. The
+    colour of every color_column value is the same in all frames.
+
+    Args:
+        tables (dict): frame name -> DataFrame of its tiles
+        label_column (str): column of the tile labels
+        text_column (str): column shown in the hover as %{text}
+        color_column (str): column the tiles are coloured by
+        colors (list): colour sequence, cycled through
+        hovertemplate (str): hover template of the tiles
+        start: name of the frame shown first, defaults to the first table
+        value_column (str): column of the tile sizes
+
+    Returns:
+        go.Figure: the animated treemap, without layout or controls
+    """
+    names = list(tables)
+    if start is None:
+        start = names[0]
+    n_slots = max((len(table) for table in tables.values()), default=0)
+
+    # same code for a colour value in every frame, in order of appearance
+    codes = {}
+    for table in tables.values():
+        for category in table[color_column]:
+            codes.setdefault(category, len(codes) % len(colors))
+
+    frames = {}
+    for name in names:
+        table = tables[name]
+        frames[str(name)] = [
+            {
+                "labels": table[label_column].astype(str).tolist(),
+                "text": table[text_column].astype(str).tolist(),
+                "values": table[value_column].to_numpy(dtype=float),
+                "marker": {
+                    "colors": table[color_column].map(codes).to_numpy(dtype=int)
+                },
+            }
+        ]
+
+    initial = frames[str(start)][0]
+    fig = go.Figure(
+        go.Treemap(
+            labels=initial["labels"],
+            text=initial["text"],
+            values=initial["values"],
+            # slot ids: tiles may share a label, ids must be unique
+            ids=[str(i) for i in range(n_slots)],
+            parents=[""] * n_slots,
+            branchvalues="total",
+            textinfo="label",
+            hovertemplate=hovertemplate,
+            marker=dict(
+                colors=initial["marker"]["colors"],
+                colorscale=discrete_colorscale(colors),
+                cmin=-0.5,
+                cmax=len(colors) - 0.5,
+                showscale=False,
+            ),
+        )
+    )
+    return add_delta_frames(fig, frames)
+
+
+def revenue_treemap_animation(
+    tables: Dict, mode: str, colors: Sequence[str], start=None
+) -> go.Figure:
+    """
+    Animated treemap of the top movies or directors by revenue, coloured by director.
+
+    Args:
+        tables (dict): year -> tiles of the year (see treemap_top_data)
+        mode (str): "movies" or "directors", the mode the tiles were built with
+        colors (list): colour sequence of the directors
+        start: year shown first, defaults to the first one
+
+    Returns:
+        go.Figure: the animated treemap, without layout or controls
+    """
+    if mode == "movies":
+        label_column, text_column = "movie_name", "director"
+        hovertemplate = "<b>Movie:</b> %{label}<br><b>Director:</b> %{text}"
+    elif mode == "directors":
+        label_column, text_column = "director", "movie_name"
+        hovertemplate = "<b>Movie:</b> %{text}<br><b>Director:</b> %{label}"
+    else:
+        raise ValueError("Invalid mode. Choose 'movies' or 'directors'.")
+    return treemap_animation(
+        tables,
+        label_column,
+        text_column,
+        "director",
+        colors,
+        hovertemplate + "<br><b>Revenue:</b> %{value:$,.0f}<extra></extra>",
+        start=start,
+    )
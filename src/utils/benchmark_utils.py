@@ -0,0 +1,172 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr, spearmanr
+
+from src.utils import analysis_utils as au
+from src.utils import cube_utils as cu
+from src.utils import data_utils as du
+
+
+def time_call(func, *args, repeat=5, **kwargs):
+    """
+    Time a function call.
+
+    Args:
+        func (callable): function to time
+        *args: positional arguments passed to func
+        repeat (int): number of timed calls
+        **kwargs: keyword arguments passed to func
+
+    Returns:
+        tuple: (result of the last call, best wall time in seconds)
+    """
+    best = np.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _count_revenue_correlation_loop(mean_revenue_pivot, genre_year_pivot):
+    """Reference per-genre loop that calculate_count_revenue_correlation replaced."""
+    correlation_results = []
+    for genre in genre_year_pivot.columns:
+        combined_df = pd.DataFrame(
+            {
+                "mean_revenue": mean_revenue_pivot[genre],
+                "movie_count": genre_year_pivot[genre],
+            }
+        )
+        filtered_df = combined_df[
+            (combined_df["mean_revenue"] > 0) & (combined_df["movie_count"] > 0)
+        ]
+        if len(filtered_df) > 1:
+            pearson_corr, _ = pearsonr(
+                filtered_df["mean_revenue"], filtered_df["movie_count"]
+            )
+            spearman_corr, _ = spearmanr(
+                filtered_df["mean_revenue"], filtered_df["movie_count"]
+            )
+            correlation_results.append(
+                {"Genre": genre, "Pearson": pearson_corr, "Spearman": spearman_corr}
+            )
+    correlation_df = pd.DataFrame(correlation_results)
+    return correlation_df.set_index("Genre").sort_index()
+
+
+def benchmark_count_revenue_correlation(mean_revenue_pivot, genre_year_pivot, repeat=5):
+    """
+    Compare calculate_count_revenue_correlation with the per-genre loop.
+
+    Args:
+        mean_revenue_pivot (pd.DataFrame): mean revenue per period and genre
+        genre_year_pivot (pd.DataFrame): movie count per period and genre
+        repeat (int): number of timed calls of each implementation
+
+    Returns:
+        pd.Series: best times of both implementations, the speedup and the
+        largest absolute difference between their results
+    """
+    expected, loop_time = time_call(
+        _count_revenue_correlation_loop,
+        mean_revenue_pivot,
+        genre_year_pivot,
+        repeat=repeat,
+    )
+    result, vectorized_time = time_call(
+        au.calculate_count_revenue_correlation,
+        mean_revenue_pivot,
+        genre_year_pivot,
+        repeat=repeat,
+    )
+    result = result.loc[expected.index, ["Pearson", "Spearman"]]
+
+    return pd.Series(
+        {
+            "loop_seconds": loop_time,
+            "vectorized_seconds": vectorized_time,
+            "speedup": loop_time / vectorized_time,
+            "max_abs_difference": np.nanmax(np.abs(result - expected).to_numpy()),
+        }
+    )
+
+
+def benchmark_date_parsing(values, repeat=3):
+    """
+    Compare normalize_dates with the per-row parse_date path.
+
+    Args:
+        values (pd.Series): raw date strings
+        repeat (int): number of timed calls of each implementation
+
+    Returns:
+        pd.Series: best times of both implementations, the speedup and the
+        number of rows where the parsed dates differ
+    """
+    expected, per_row_time = time_call(
+        lambda: pd.to_datetime(values.apply(du.parse_date)), repeat=repeat
+    )
+    (dates, _), vectorized_time = time_call(
+        du.normalize_dates, values, repeat=repeat
+    )
+
+    return pd.Series(
+        {
+            "per_row_seconds": per_row_time,
+            "vectorized_seconds": vectorized_time,
+            "speedup": per_row_time / vectorized_time,
+            "mismatches": int((dates.ne(expected) & ~(dates.isna() & expected.isna())).sum()),
+        }
+    )
+
+
+def _explode_pivots(df_genres):
+    """Reference explode + groupby computation of the Shades pivot tables."""
+    exploded = df_genres.explode("genres_list")
+    grouped = exploded.groupby(["release_year", "genres_list"])["inflated_revenue"]
+    mean_revenue_pivot = grouped.mean().unstack()
+    genre_year_pivot = grouped.size().unstack(fill_value=0)
+    exploded["decade"] = exploded["release_year"] // 10 * 10
+    mean_revenue_pivot_decade = (
+        exploded.groupby(["decade", "genres_list"])["inflated_revenue"].mean().unstack()
+    )
+    return mean_revenue_pivot, genre_year_pivot, mean_revenue_pivot_decade
+
+
+def benchmark_genre_year_cube(df_genres, repeat=5):
+    """
+    Compare the GenreYearCube views with the explode + groupby pivot tables.
+
+    Args:
+        df_genres (pd.DataFrame): output of prepare_df_for_genre_analysis
+        repeat (int): number of timed calls of each implementation
+
+    Returns:
+        pd.Series: best times of the groupby path, the cube construction and
+        the cube views, and whether all tables are equal
+    """
+    expected, groupby_time = time_call(_explode_pivots, df_genres, repeat=repeat)
+    cube, build_time = time_call(cu.GenreYearCube, df_genres, repeat=repeat)
+    pivots, views_time = time_call(
+        lambda: (
+            cube.pivot("mean"),
+            cube.pivot("count"),
+            cube.pivot("mean", by="decade"),
+        ),
+        repeat=repeat,
+    )
+
+    return pd.Series(
+        {
+            "groupby_seconds": groupby_time,
+            "cube_build_seconds": build_time,
+            "cube_views_seconds": views_time,
+            "equal": all(
+                np.allclose(p.to_numpy(float), e.to_numpy(float), equal_nan=True)
+                for p, e in zip(pivots, expected)
+            ),
+        }
+    )
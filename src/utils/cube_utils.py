@@ -0,0 +1,543 @@
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+
+from src.utils.encoding_utils import get_encoding
+
+# Aggregates stored for every cell; everything else is derived from them
+STORED_MEASURES = [
+    "count",
+    "sum",
+    "sum_sq",
+    "min",
+    "max",
+    "log_count",
+    "log_sum",
+    "log_sum_sq",
+]
+DERIVED_MEASURES = ["mean", "var", "std", "log_mean", "log_std"]
+
+
+def _cell_aggregates(cells: np.ndarray, values: np.ndarray, n_cells: int) -> Dict:
+    """
+    count, sum, sum of squares, min, max and log10-moments of values per cell.
+
+    Args:
+        cells (np.ndarray): cell id of every value, in [0, n_cells)
+        values (np.ndarray): values to aggregate
+        n_cells (int): number of cells
+
+    Returns:
+        dict: measure name -> array of length n_cells (min/max are NaN for
+        empty cells)
+    """
+    aggregates = {
+        "count": np.bincount(cells, minlength=n_cells).astype(float),
+        "sum": np.bincount(cells, values, minlength=n_cells),
+        "sum_sq": np.bincount(cells, values * values, minlength=n_cells),
+    }
+
+    positive = values > 0
+    logs = np.log10(values[positive])
+    aggregates["log_count"] = np.bincount(cells[positive], minlength=n_cells).astype(
+        float
+    )
+    aggregates["log_sum"] = np.bincount(cells[positive], logs, minlength=n_cells)
+    aggregates["log_sum_sq"] = np.bincount(
+        cells[positive], logs * logs, minlength=n_cells
+    )
+
+    aggregates["min"] = np.full(n_cells, np.nan)
+    aggregates["max"] = np.full(n_cells, np.nan)
+    if len(cells):
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+        occupied = sorted_cells[starts]
+        aggregates["min"][occupied] = np.minimum.reduceat(values[order], starts)
+        aggregates["max"][occupied] = np.maximum.reduceat(values[order], starts)
+    return aggregates
+
+
+def _roll_up(aggregates: Dict, groups: np.ndarray, axis: int = 0) -> Dict:
+    """
+    Merge the cells of aggregates along an axis, by group.
+
+    Args:
+        aggregates (dict): measure name -> array of cells
+        groups (np.ndarray): sorted group of every position along axis
+        axis (int): axis to roll up
+
+    Returns:
+        dict: the rolled-up aggregates, with one position per group along axis
+    """
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    rolled = {}
+    for measure, cells in aggregates.items():
+        if measure == "min":
+            rolled[measure] = np.fmin.reduceat(cells, starts, axis=axis)
+        elif measure == "max":
+            rolled[measure] = np.fmax.reduceat(cells, starts, axis=axis)
+        else:
+            rolled[measure] = np.add.reduceat(cells, starts, axis=axis)
+    return rolled
+
+
+def _derive(aggregates: Dict, measure: str) -> np.ndarray:
+    """Compute a stored or derived measure from the stored aggregates."""
+    if measure in aggregates:
+        return aggregates[measure]
+    if measure not in DERIVED_MEASURES:
+        raise ValueError(
+            f"Unknown measure {measure!r}, expected one of "
+            f"{STORED_MEASURES + DERIVED_MEASURES}"
+        )
+
+    prefix = "log_" if measure.startswith("log_") else ""
+    count = aggregates[f"{prefix}count"]
+    total = aggregates[f"{prefix}sum"]
+    total_sq = aggregates[f"{prefix}sum_sq"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+        if measure in ("mean", "log_mean"):
+            return mean
+        # sample variance, as pandas computes it
+        var = np.where(
+            count > 1, np.maximum(total_sq - total * mean, 0) / (count - 1), np.nan
+        )
+    if measure == "var":
+        return var
+    return np.sqrt(var)
+
+
+class GenreYearCube:
+    """
+    Materialized genre x release year aggregates of the movie revenues.
+
+    Built once from the output of data_utils.prepare_df_for_genre_analysis,
+    it stores for every (year, genre) cell the count, sum, sum of squares,
+    min, max and log10-moments of the revenues. Yearly, per-decade and
+    per-genre tables are rolled up from these cells, never from the movies.
+
+    A movie with several genres counts once in each of its genres.
+    """
+
+    def __init__(
+        self,
+        df_genres: pd.DataFrame,
+        genre_column: str = "genres_list",
+        value_column: str = "inflated_revenue",
+        year_column: str = "release_year",
+    ):
+        lengths = df_genres[genre_column].map(len).to_numpy(dtype=np.int64)
+        flat = pd.Series(
+            [genre for genres in df_genres[genre_column] for genre in genres],
+            dtype=object,
+        )
+        genre_codes, genres = pd.factorize(flat, sort=True)
+        year_codes, years = pd.factorize(
+            df_genres[year_column].to_numpy(dtype=np.int64), sort=True
+        )
+
+        self.genres = pd.Index(genres, name=genre_column)
+        self.years = pd.Index(years, name=year_column)
+
+        rows = np.repeat(np.arange(len(df_genres)), lengths)
+        cells = year_codes[rows] * len(self.genres) + genre_codes
+        values = df_genres[value_column].to_numpy(dtype=float)[rows]
+        shape = (len(self.years), len(self.genres))
+        aggregates = _cell_aggregates(cells, values, shape[0] * shape[1])
+        self.aggregates = {
+            measure: flat_cells.reshape(shape)
+            for measure, flat_cells in aggregates.items()
+        }
+
+    def _periods(self, by: str):
+        """Rolled-up aggregates and period index for a period granularity."""
+        if by == "year":
+            return self.aggregates, self.years
+        if by == "decade":
+            decades = self.years.to_numpy() // 10 * 10
+            index = pd.Index(np.unique(decades), name="decade")
+            return _roll_up(self.aggregates, decades, axis=0), index
+        if by == "all":
+            whole = np.zeros(len(self.years), dtype=np.int64)
+            return _roll_up(self.aggregates, whole, axis=0), pd.Index(["all"])
+        raise ValueError(f"Unknown period {by!r}, expected 'year', 'decade' or 'all'")
+
+    def _genre_positions(self, genres: Optional[Iterable[str]]) -> np.ndarray:
+        if genres is None:
+            return np.arange(len(self.genres))
+        genres = list(genres)
+        positions = self.genres.get_indexer(genres)
+        if (positions < 0).any():
+            missing = [g for g, p in zip(genres, positions) if p < 0]
+            raise KeyError(f"Genres not in the cube: {missing}")
+        return positions
+
+    def pivot(
+        self,
+        measure: str = "mean",
+        by: str = "year",
+        genres: Optional[Iterable[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Period x genre table of a measure.
+
+        pivot("mean") and pivot("count") are the mean_revenue_pivot and
+        genre_year_pivot of the Shades plots, and by="decade" gives their
+        per-decade versions.
+
+        Args:
+            measure (str): one of STORED_MEASURES or DERIVED_MEASURES
+            by (str): "year", "decade" or "all"
+            genres (iterable): genres (columns) to keep, all if None
+
+        Returns:
+            pd.DataFrame: one row per period and one column per genre; counts
+            of empty cells are 0 and other measures NaN
+        """
+        aggregates, index = self._periods(by)
+        positions = self._genre_positions(genres)
+        values = _derive(aggregates, measure)[:, positions]
+        if measure in ("count", "log_count"):
+            values = values.astype(np.int64)
+        columns = self.genres[positions]
+        return pd.DataFrame(values, index=index, columns=columns)
+
+    def genre_summary(
+        self,
+        measures: Iterable[str] = ("count", "mean", "std", "min", "max", "log_mean"),
+        genres: Optional[Iterable[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Statistics of every genre over all years.
+
+        Args:
+            measures (iterable): measures to compute
+            genres (iterable): genres to keep, all if None
+
+        Returns:
+            pd.DataFrame: one row per genre and one column per measure
+        """
+        aggregates, _ = self._periods("all")
+        positions = self._genre_positions(genres)
+        return pd.DataFrame(
+            {m: _derive(aggregates, m)[0, positions] for m in measures},
+            index=self.genres[positions],
+        )
+
+    def top_genres(self, n: int = 10, measure: str = "count") -> List[str]:
+        """The n genres with the highest value of a measure over all years."""
+        summary = self.genre_summary([measure])[measure]
+        return summary.sort_values(ascending=False, kind="stable").index[:n].tolist()
+
+
+# Season of every month (index 0 unused), as in data_utils.assign_season
+_MONTH_SEASONS = np.array(
+    [None]
+    + ["Winter"] * 2
+    + ["Spring"] * 3
+    + ["Summer"] * 3
+    + ["Fall"] * 3
+    + ["Winter"],
+    dtype=object,
+)
+
+# Additive measures stored in every cuboid
+CUBE_MEASURES = [
+    "count",
+    "revenue_count",
+    "revenue_sum",
+    "budget_count",
+    "budget_sum",
+    "roi_count",
+    "roi_sum",
+]
+# Measures derived from the additive ones when a cuboid is queried
+CUBE_DERIVED_MEASURES = {
+    "mean_revenue": ("revenue_sum", "revenue_count"),
+    "mean_budget": ("budget_sum", "budget_count"),
+    "mean_roi": ("roi_sum", "roi_count"),
+}
+
+
+class _Dimension:
+    """
+    Values of one cube dimension for every movie.
+
+    Every dimension is stored as lists (single-valued ones have lists of
+    length 0 or 1): the value codes of movie i are codes[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, name: str, labels: pd.Index, codes: np.ndarray, offsets: np.ndarray):
+        self.name = name
+        self.labels = labels
+        self.codes = codes
+        self.offsets = offsets
+        self.lengths = np.diff(offsets)
+        self.multi_valued = bool((self.lengths > 1).any())
+
+    @classmethod
+    def from_values(cls, name: str, values) -> "_Dimension":
+        """Single-valued dimension, missing values being left out."""
+        codes, labels = pd.factorize(pd.Series(values), sort=True)
+        present = codes >= 0
+        offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(present, out=offsets[1:])
+        return cls(name, pd.Index(labels, name=name), codes[present], offsets)
+
+    @classmethod
+    def from_lists(cls, name: str, lists) -> "_Dimension":
+        """Multi-valued dimension; repeated values of a movie are only kept once."""
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        rows = np.repeat(np.arange(len(lists)), lengths)
+        flat = pd.Series([value for values in lists for value in values], dtype=object)
+        codes, labels = pd.factorize(flat, sort=True)
+        pairs = np.unique(np.stack([rows, codes]), axis=1)
+        pairs = pairs[:, pairs[1] >= 0]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs[0], minlength=len(lists)), out=offsets[1:])
+        return cls(name, pd.Index(labels, name=name), pairs[1], offsets)
+
+
+def _expand(dimensions: List[_Dimension], rows: np.ndarray):
+    """
+    Cross every movie with the combinations of its values on the dimensions.
+
+    Args:
+        dimensions (list): dimensions to cross
+        rows (np.ndarray): movie positions to expand
+
+    Returns:
+        tuple: (movie position and cell key of every (movie, combination) pair)
+    """
+    keys = np.zeros(len(rows), dtype=np.int64)
+    for dimension in dimensions:
+        lengths = dimension.lengths[rows]
+        ends = np.cumsum(lengths)
+        within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+        codes = dimension.codes[np.repeat(dimension.offsets[rows], lengths) + within]
+        keys = np.repeat(keys, lengths) * len(dimension.labels) + codes
+        rows = np.repeat(rows, lengths)
+    return rows, keys
+
+
+class MovieCube:
+    """
+    In-process OLAP cube of the processed movie table.
+
+    Dimensions are genre, language, country (multi-valued), director, season,
+    release_year and decade. Every cuboid (group-by over a set of dimensions)
+    stores the additive measures of CUBE_MEASURES; a movie contributes once to
+    every cell it belongs to, so counts are exact even for movies with several
+    genres, languages or countries. Cuboids over up to materialize dimensions
+    are computed when the cube is built, higher-order ones on first use, and
+    both only from the encoded dimension arrays, never from the DataFrame.
+    """
+
+    DIMENSIONS = [
+        "genre",
+        "language",
+        "country",
+        "director",
+        "season",
+        "release_year",
+        "decade",
+    ]
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        encodings: Optional[Dict] = None,
+        dimensions: Optional[List[str]] = None,
+        materialize: int = 2,
+        split_genres: bool = True,
+    ):
+        """
+        Args:
+            df (pd.DataFrame): processed movie table
+            encodings (dict): optional pre-computed encodings of the list columns
+            dimensions (list): dimensions of the cube, defaults to DIMENSIONS
+            materialize (int): highest order of the cuboids computed upfront
+            split_genres (bool): split "Action/Adventure" into two genres, as
+                data_utils.prepare_df_for_genre_analysis does
+        """
+        dimensions = self.DIMENSIONS if dimensions is None else dimensions
+        builders = {
+            "genre": lambda: _Dimension.from_lists(
+                "genre",
+                [
+                    [part for genre in genres for part in genre.split("/")]
+                    for genres in get_encoding(df, "movie_genres", encodings).name_lists()
+                ]
+                if split_genres
+                else get_encoding(df, "movie_genres", encodings).name_lists(),
+            ),
+            "language": lambda: _Dimension.from_lists(
+                "language", get_encoding(df, "movie_languages", encodings).name_lists()
+            ),
+            "country": lambda: _Dimension.from_lists(
+                "country", get_encoding(df, "movie_countries", encodings).name_lists()
+            ),
+            "director": lambda: _Dimension.from_values(
+                "director", df["director"].replace("Unknown", np.nan).to_numpy()
+            ),
+            "season": lambda: _Dimension.from_values(
+                "season",
+                _MONTH_SEASONS[
+                    df["release_month"].fillna(0).to_numpy(dtype=np.int64).clip(0, 12)
+                ],
+            ),
+            "release_year": lambda: _Dimension.from_values(
+                "release_year", df["release_year"].astype("Int64")
+            ),
+            "decade": lambda: _Dimension.from_values(
+                "decade", df["release_year"].astype("Int64") // 10 * 10
+            ),
+        }
+        unknown = set(dimensions) - set(builders)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+        self.dimensions = {name: builders[name]() for name in dimensions}
+        self.n_movies = len(df)
+
+        revenue = pd.to_numeric(df["inflated_revenue"], errors="coerce").to_numpy(float)
+        # budgets of less than 1000 are likely to be noise, as in
+        # data_utils.prepare_df_for_budget_analysis
+        raw_budget = pd.to_numeric(df["budget"], errors="coerce").to_numpy(float)
+        budget = np.where(
+            raw_budget > 1000,
+            pd.to_numeric(df["inflated_budget"], errors="coerce").to_numpy(float),
+            np.nan,
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = (revenue - budget) / budget
+        # (weight, value) of every additive measure, NaN values being left out
+        self._facts = {"count": np.ones(len(df))}
+        for name, values in [("revenue", revenue), ("budget", budget), ("roi", roi)]:
+            known = ~np.isnan(values)
+            self._facts[f"{name}_count"] = known.astype(float)
+            self._facts[f"{name}_sum"] = np.where(known, values, 0.0)
+
+        self._cuboids = {}
+        for order in range(materialize + 1):
+            for combination in itertools.combinations(dimensions, order):
+                self.cuboid(combination)
+
+    def cuboid(self, dimensions: Iterable[str]) -> pd.DataFrame:
+        """
+        Additive measures of every non-empty cell of a group-by over dimensions.
+
+        Args:
+            dimensions (iterable): dimensions to group by, in any order
+
+        Returns:
+            pd.DataFrame: one row per cell, indexed by the value codes of the
+            dimensions (in the cube's dimension order)
+        """
+        key = tuple(d for d in self.dimensions if d in set(dimensions))
+        if len(key) != len(set(dimensions)):
+            unknown = sorted(set(dimensions) - set(self.dimensions))
+            raise ValueError(f"Unknown dimensions: {unknown}")
+        if key not in self._cuboids:
+            self._cuboids[key] = self._compute(key)
+        return self._cuboids[key]
+
+    def _compute(self, key) -> pd.DataFrame:
+        dimensions = [self.dimensions[d] for d in key]
+        rows, keys = _expand(dimensions, np.arange(self.n_movies))
+        cells, inverse = np.unique(keys, return_inverse=True)
+        measures = {
+            measure: np.bincount(inverse, values[rows], minlength=len(cells))
+            for measure, values in self._facts.items()
+        }
+
+        # decode the cell keys into the code of every dimension
+        codes = {}
+        for dimension in reversed(dimensions):
+            cells, codes[dimension.name] = np.divmod(cells, len(dimension.labels))
+        index = (
+            pd.MultiIndex.from_arrays([codes[d] for d in key], names=list(key))
+            if key
+            else pd.RangeIndex(1)
+        )
+        return pd.DataFrame(measures, index=index)
+
+    def query(
+        self,
+        by: Iterable[str] = (),
+        where: Optional[Dict[str, object]] = None,
+        measures: Iterable[str] = ("count", "mean_revenue"),
+    ) -> pd.DataFrame:
+        """
+        Slice and dice the cube.
+
+        Args:
+            by (iterable): dimensions of the result
+            where (dict): dimension -> value or list of values to keep
+            measures (iterable): measures of CUBE_MEASURES or
+                CUBE_DERIVED_MEASURES to return
+
+        Returns:
+            pd.DataFrame: one row per non-empty cell, indexed by the values
+            of the by dimensions
+
+        Filtering a multi-valued dimension (genre, language, country) on
+        several values counts a movie once per matching value, as a movie
+        belongs to each of the cells; use one value per query for exact
+        movie counts.
+        """
+        by = list(by)
+        where = dict(where or {})
+        filtered = self.cuboid(by + [d for d in where if d not in by])
+
+        mask = np.ones(len(filtered), dtype=bool)
+        for name, values in where.items():
+            dimension = self.dimensions[name]
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            codes = dimension.labels.get_indexer(list(values))
+            mask &= np.isin(filtered.index.get_level_values(name), codes[codes >= 0])
+        filtered = filtered[mask]
+
+        # sum the cells over the filtered dimensions that are not in the result
+        key = [d for d in self.dimensions if d in by]
+        if not key:
+            result = filtered.sum().to_frame().T
+        elif len(key) < filtered.index.nlevels:
+            result = filtered.groupby(level=key).sum()
+        else:
+            result = filtered
+        result = self._decode(result, key)
+        return self._measures(result, measures)
+
+    def _decode(self, result: pd.DataFrame, key: List[str]) -> pd.DataFrame:
+        """Replace the value codes of the index by the dimension values."""
+        if not key:
+            return result.reset_index(drop=True)
+        arrays = [
+            self.dimensions[d].labels[np.asarray(result.index.get_level_values(d))]
+            for d in key
+        ]
+        result = result.copy()
+        result.index = (
+            pd.MultiIndex.from_arrays(arrays, names=key) if len(key) > 1 else arrays[0]
+        )
+        return result
+
+    @staticmethod
+    def _measures(result: pd.DataFrame, measures: Iterable[str]) -> pd.DataFrame:
+        columns = {}
+        for measure in measures:
+            if measure in CUBE_DERIVED_MEASURES:
+                total, count = CUBE_DERIVED_MEASURES[measure]
+                columns[measure] = result[total] / result[count].where(result[count] > 0)
+            elif measure in CUBE_MEASURES:
+                values = result[measure]
+                columns[measure] = (
+                    values.astype(np.int64) if measure.endswith("count") else values
+                )
+            else:
+                raise ValueError(f"Unknown measure {measure!r}")
+        return pd.DataFrame(columns, index=result.index)
@@ -1,10 +1,13 @@
 import os
-import ast
+import csv
+import json
+import time
 import numpy as np
 import pandas as pd
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from src.utils import analysis_utils as au
+from src.utils.encoding_utils import decode_freebase_columns, get_encoding
 
 
 def load_cmu_movies_data(path):
@@ -87,33 +90,99 @@ def parse_date(date_str):
         return pd.NaT
 
 
+# Date formats found in the CMU data, from the most to the least precise
+DATE_FORMATS = {
+    "day": (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d"),
+    "month": (r"\d{4}-\d{2}", "%Y-%m"),
+    "year": (r"\d{4}", "%Y"),
+}
+
+
+# Resolution of the parsed dates: datetime64[ns] only spans the years 1677 to
+# 2262, while the CMU data has dates such as "1010-12-02", which parse_date
+# keeps under pandas 3 (whose pd.to_datetime parses strings to microseconds)
+DATE_DTYPE = "datetime64[us]"
+
+
+def normalize_dates(values):
+    """
+    Parse a column of mixed-precision dates ("2001", "2001-08", "2001-08-24").
+
+    Each format is parsed in one vectorized pass; other values go through a
+    single pd.to_datetime call. Missing parts default to the first month/day,
+    as with parse_date, and the precision column records which parts are real.
+    Dates are returned as DATE_DTYPE, so dates outside the datetime64[ns]
+    range are kept (pandas versions before 3 still parse them to NaT, as
+    parse_date does there).
+
+    Args:
+        values (pd.Series): raw date strings
+
+    Returns:
+        tuple: Contains two Series aligned to values:
+            - dates: parsed dates (NaT when missing or invalid)
+            - precision: "year", "month" or "day" (NaN when the date is missing)
+    """
+    text = values.astype("string").str.strip()
+    dates = pd.Series(pd.NaT, index=values.index, dtype=DATE_DTYPE)
+    precision = pd.Series(np.nan, index=values.index, dtype=object)
+
+    remaining = text.notna().to_numpy(copy=True)
+    for name, (pattern, date_format) in DATE_FORMATS.items():
+        matches = remaining & text.str.fullmatch(pattern).fillna(False).to_numpy()
+        dates[matches] = pd.to_datetime(
+            text[matches], format=date_format, errors="coerce"
+        ).astype(DATE_DTYPE)
+        precision[matches] = name
+        remaining = remaining & ~matches
+
+    # Any other format is parsed (slowly) in a single call
+    if remaining.any():
+        dates[remaining] = (
+            pd.to_datetime(text[remaining], format="mixed", errors="coerce", utc=True)
+            .dt.tz_localize(None)
+            .astype(DATE_DTYPE)
+        )
+        precision[remaining] = "day"
+
+    precision[dates.isna().to_numpy()] = np.nan
+    precision = precision.astype(
+        pd.CategoricalDtype(list(reversed(DATE_FORMATS)), ordered=True)
+    )
+    return dates, precision
+
+
 def parse_dict(field):
     """
-    Convert dictionary to a tuple (key, value) pairs
+    Convert a JSON dictionary to a list of (key, value) pairs
     """
     try:
-        return [x for x in ast.literal_eval(field).items()]
-    except:
+        return list(json.loads(field).items())
+    except (TypeError, ValueError, AttributeError):
         return []
 
 
-def preprocess_cmu_movies_data(df_movies, df_characters):
+def preprocess_cmu_movies_data(df_movies, df_characters, return_encodings=False):
     """
     Clean and standardize CMU movie and character datasets.
 
     Performs the following operations:
     - Converts numeric fields to appropriate data types
-    - Standardizes date fields to datetime format
+    - Standardizes date fields to datetime format, recording the precision
+      (year/month/day) of the movie release dates
     - Parses structured fields (languages, countries, genres)
 
     Args:
         df_movies (pd.DataFrame): Raw movies metadata
         df_characters (pd.DataFrame): Raw character metadata
+        return_encodings (bool): Also return the encoded list columns
 
     Returns:
         tuple: Contains two preprocessed DataFrames:
             - df_movies: Cleaned movie metadata
             - df_characters: Cleaned character metadata
+            - encodings: Encoded languages, countries and genres (only if
+              return_encodings is True, see encoding_utils)
     """
     # Convert appropriate columns to numeric data types
     df_movies["movie_box_office_revenue"] = pd.to_numeric(
@@ -123,18 +192,23 @@ def preprocess_cmu_movies_data(df_movies, df_characters):
         df_movies["movie_runtime"], errors="coerce"
     )
 
-    # Convert release date to datetime
-    df_movies["movie_release_date"] = df_movies["movie_release_date"].apply(parse_date)
-    df_characters["movie_release_date"] = df_characters["movie_release_date"].apply(
-        parse_date
+    # Convert release date to datetime, keeping track of which parts are known
+    (
+        df_movies["movie_release_date"],
+        df_movies["movie_release_date_precision"],
+    ) = normalize_dates(df_movies["movie_release_date"])
+    df_characters["movie_release_date"], _ = normalize_dates(
+        df_characters["movie_release_date"]
     )
-    df_characters["actor_dob"] = df_characters["actor_dob"].apply(parse_date)
+    df_characters["actor_dob"], _ = normalize_dates(df_characters["actor_dob"])
 
-    # Process JSON-like fields
-    df_movies["movie_languages"] = df_movies["movie_languages"].apply(parse_dict)
-    df_movies["movie_countries"] = df_movies["movie_countries"].apply(parse_dict)
-    df_movies["movie_genres"] = df_movies["movie_genres"].apply(parse_dict)
+    # Process JSON-like fields (decoded in bulk into a shared vocabulary)
+    encodings = decode_freebase_columns(df_movies)
+    for column, encoding in encodings.items():
+        df_movies[column] = encoding.pair_lists()
 
+    if return_encodings:
+        return df_movies, df_characters, encodings
     return df_movies, df_characters
 
 
@@ -191,7 +265,11 @@ def preprocess_tmdb_data(df_tmdb):
     return df_tmdb
 
 
-def load_imdb_data(path):
+def _read_imdb_tsv(file):
+    return pd.read_csv(file, sep="\t", low_memory=False)
+
+
+def load_imdb_data(path, max_workers=1):
     """
     Load core IMDb datasets from compressed TSV files.
 
@@ -203,6 +281,7 @@ def load_imdb_data(path):
 
     Args:
         path (str): Base directory path containing the IMDB folder
+        max_workers (int): Number of files decompressed and parsed in parallel
 
     Returns:
         tuple: Contains four DataFrames:
@@ -221,15 +300,208 @@ def load_imdb_data(path):
     title_ratings_file = f"{path}IMDB/title.ratings.tsv.gz"
     title_crew_file = f"{path}IMDB/title.crew.tsv.gz"
     name_basics_file = f"{path}IMDB/name.basics.tsv.gz"
+    files = [title_basics_file, title_ratings_file, title_crew_file, name_basics_file]
 
-    df_title_basics = pd.read_csv(title_basics_file, sep="\t", low_memory=False)
-    df_title_ratings = pd.read_csv(title_ratings_file, sep="\t", low_memory=False)
-    df_title_crew = pd.read_csv(title_crew_file, sep="\t", low_memory=False)
-    df_name_basics = pd.read_csv(name_basics_file, sep="\t", low_memory=False)
+    # gzip decompression and the C parser release the GIL, so threads overlap
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        df_title_basics, df_title_ratings, df_title_crew, df_name_basics = (
+            executor.map(_read_imdb_tsv, files)
+        )
 
     return df_title_basics, df_title_ratings, df_title_crew, df_name_basics
 
 
+def _timed_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def load_all_sources(path, max_workers=3, imdb_workers=4, use_processes=False):
+    """
+    Load the CMU, TMDB and IMDb datasets concurrently.
+
+    Args:
+        path (str): Base directory path containing the dataset folders
+        max_workers (int): Number of sources loaded in parallel
+        imdb_workers (int): Number of IMDb files loaded in parallel
+        use_processes (bool): Use a process pool instead of a thread pool
+            (frames are then pickled back to the main process)
+
+    Returns:
+        tuple: Contains two dictionaries:
+            - sources: "cmu" -> (df_movies, df_plots, df_characters),
+              "tmdb" -> df_tmdb and "imdb" -> (df_title_basics,
+              df_title_ratings, df_title_crew, df_name_basics), as returned
+              by the individual loaders
+            - timings: seconds spent loading each source, and in total
+    """
+    start = time.perf_counter()
+    loaders = {
+        "cmu": (load_cmu_movies_data, (path,)),
+        "tmdb": (load_tmdb_data, (path,)),
+        "imdb": (load_imdb_data, (path, imdb_workers)),
+    }
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(_timed_call, func, *args)
+            for name, (func, args) in loaders.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    sources = {name: result for name, (result, _) in results.items()}
+    timings = {name: seconds for name, (_, seconds) in results.items()}
+    timings["total"] = time.perf_counter() - start
+
+    return sources, timings
+
+
+# Columns and compact dtypes read by stream_imdb_data for each IMDb file
+IMDB_STREAM_COLUMNS = {
+    "title.basics": {
+        "tconst": "object",
+        "titleType": "category",
+        "primaryTitle": "object",
+        "startYear": "Int16",
+    },
+    "title.ratings": {
+        "tconst": "object",
+        "averageRating": "float32",
+        "numVotes": "Int32",
+    },
+    "title.crew": {"tconst": "object", "directors": "object"},
+    "name.basics": {"nconst": "object", "primaryName": "object"},
+}
+
+
+def _stream_tsv(file, columns, keep, chunksize):
+    """
+    Read a (gzipped) IMDb TSV chunk by chunk, keeping only the rows selected by keep.
+
+    Args:
+        file (str): path to the TSV file
+        columns (dict): column name -> dtype of the columns to read
+        keep (callable): chunk -> boolean mask of the rows to keep
+        chunksize (int): number of rows per chunk
+
+    Returns:
+        pd.DataFrame: the kept rows
+    """
+    reader = pd.read_csv(
+        file,
+        sep="\t",
+        usecols=list(columns),
+        dtype=columns,
+        na_values="\\N",
+        keep_default_na=False,
+        quoting=csv.QUOTE_NONE,
+        chunksize=chunksize,
+    )
+    with reader:
+        chunks = [chunk[keep(chunk)] for chunk in reader]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def stream_imdb_data(
+    path, tconsts=None, nconsts=None, columns=None, chunksize=500_000
+):
+    """
+    Load the IMDb datasets chunk by chunk, keeping only the movies we can join.
+
+    Filters are applied to every chunk while reading, so memory use is bounded
+    by the chunk size and the size of the kept rows:
+    - title.basics: only titleType == "movie" (and tconsts, if given)
+    - title.ratings / title.crew: only the kept movies
+    - name.basics: only nconsts, or the first directors of the kept movies
+
+    Args:
+        path (str): Base directory path containing the IMDB folder
+        tconsts (iterable): optional set of title ids to keep
+        nconsts (iterable): optional set of person ids to keep
+        columns (dict): optional file name -> {column: dtype} overriding
+            IMDB_STREAM_COLUMNS (the key columns must be kept)
+        chunksize (int): number of rows read at a time
+
+    Returns:
+        tuple: Contains four DataFrames in the same order as load_imdb_data
+    """
+
+    if "IMDB" not in os.listdir(path):
+        raise FileNotFoundError(
+            "IMDB directory not found in specified path. Please first download the dataset from https://datasets.imdbws.com and extract it to the data/IMDB folder."
+        )
+
+    columns = {**IMDB_STREAM_COLUMNS, **(columns or {})}
+    tconsts = None if tconsts is None else set(tconsts)
+
+    def keep_movies(chunk):
+        mask = chunk["titleType"] == "movie"
+        if tconsts is not None:
+            mask &= chunk["tconst"].isin(tconsts)
+        return mask
+
+    basics_columns = {"titleType": "category", **columns["title.basics"]}
+    df_title_basics = _stream_tsv(
+        f"{path}IMDB/title.basics.tsv.gz", basics_columns, keep_movies, chunksize
+    )
+    movie_tconsts = set(df_title_basics["tconst"])
+    if "titleType" not in columns["title.basics"]:
+        df_title_basics = df_title_basics.drop(columns="titleType")
+
+    def keep_titles(chunk):
+        return chunk["tconst"].isin(movie_tconsts)
+
+    df_title_ratings = _stream_tsv(
+        f"{path}IMDB/title.ratings.tsv.gz",
+        columns["title.ratings"],
+        keep_titles,
+        chunksize,
+    )
+    df_title_crew = _stream_tsv(
+        f"{path}IMDB/title.crew.tsv.gz", columns["title.crew"], keep_titles, chunksize
+    )
+
+    if nconsts is None:
+        nconsts = df_title_crew["directors"].str.split(",", n=1).str[0].dropna()
+    nconsts = set(nconsts)
+
+    df_name_basics = _stream_tsv(
+        f"{path}IMDB/name.basics.tsv.gz",
+        columns["name.basics"],
+        lambda chunk: chunk["nconst"].isin(nconsts),
+        chunksize,
+    )
+
+    return df_title_basics, df_title_ratings, df_title_crew, df_name_basics
+
+
+def load_imdb_ratings(ratings_file, tconsts=None, chunksize=500_000):
+    """
+    Load an IMDb title.ratings snapshot, optionally only for some titles.
+
+    Args:
+        ratings_file (str): Path to a title.ratings.tsv(.gz) file
+        tconsts (iterable): optional set of title ids to keep
+        chunksize (int): number of rows read at a time
+
+    Returns:
+        pd.DataFrame: tconst, averageRating and numVotes of the kept titles
+    """
+    tconsts = None if tconsts is None else set(tconsts)
+    return _stream_tsv(
+        ratings_file,
+        IMDB_STREAM_COLUMNS["title.ratings"],
+        lambda chunk: (
+            chunk["tconst"].notna()
+            if tconsts is None
+            else chunk["tconst"].isin(tconsts)
+        ),
+        chunksize,
+    )
+
+
 def preprocess_imdb_data(
     df_title_basics, df_title_ratings, df_title_crew, df_name_basics
 ):
@@ -251,10 +523,54 @@ def preprocess_imdb_data(
     return df_title_basics, df_title_ratings, df_title_crew, df_name_basics
 
 
+def clean_combined_movies(df_movies_combined, min_revenue=1000):
+    """
+    Clean the merged movie dataset before the inflation correction.
+
+    Drops movies without a revenue or with a revenue below min_revenue (most
+    likely incorrect data), and fills missing ratings, votes and directors.
+
+    Args:
+        df_movies_combined (pd.DataFrame): Dataframe after merging all datasets
+        min_revenue (float): Smallest revenue considered valid
+
+    Returns:
+        pd.DataFrame: The cleaned dataframe
+    """
+    df_movies_combined = df_movies_combined.dropna(subset=["combined_revenue"])
+    df_movies_combined = df_movies_combined[
+        df_movies_combined["combined_revenue"] > min_revenue
+    ].copy()
+
+    # Fill missing values with 0 or 'Unknown'
+    df_movies_combined["averageRating"] = df_movies_combined["averageRating"].fillna(0)
+    df_movies_combined["numVotes"] = df_movies_combined["numVotes"].fillna(0)
+    df_movies_combined["director"] = df_movies_combined["director"].fillna("Unknown")
+
+    return df_movies_combined
+
+
+def load_cpi_data(cpi_file):
+    """
+    Load the monthly CPI data and average it per year.
+
+    Args:
+        cpi_file (str): Path to the CPIAUCNS.csv file
+
+    Returns:
+        pd.DataFrame: Yearly average CPI with 'year' and 'CPIAUCNS' columns
+    """
+    df_cpi = pd.read_csv(cpi_file)
+    df_cpi["year"] = pd.to_datetime(df_cpi["observation_date"]).dt.year
+    return df_cpi[["year", "CPIAUCNS"]].groupby("year").mean().reset_index()
+
+
 # Functions for data preparation in results notebook
+# The `encodings` argument takes the output of encoding_utils.encode_list_columns
+# computed once on the full dataset, so that the list columns are never re-parsed.
 
 
-def prepare_df_for_rating_analysis(df):
+def prepare_df_for_rating_analysis(df, encodings=None):
     # Select relevant columns
     df_rating = df[
         ["movie_name", "averageRating", "inflated_revenue", "numVotes", "movie_genres"]
@@ -267,13 +583,13 @@ def prepare_df_for_rating_analysis(df):
     # Remove duplicates
     df_rating.drop_duplicates(inplace=True)
     # Split genres
-    df_rating["genres_list"] = df_rating["movie_genres"].apply(
-        lambda x: [g[1] for g in eval(x)]
-    )
+    df_rating["genres_list"] = get_encoding(
+        df_rating, "movie_genres", encodings
+    ).name_lists()
     return df_rating
 
 
-def prepare_df_for_genre_analysis(df):
+def prepare_df_for_genre_analysis(df, encodings=None):
     # select relevant columns
     df_genres = df[
         ["movie_name", "movie_genres", "inflated_revenue", "release_year"]
@@ -283,15 +599,18 @@ def prepare_df_for_genre_analysis(df):
     # remove duplicates
     df_genres.drop_duplicates(inplace=True)
     # split genres
-    df_genres["genres_list"] = df_genres["movie_genres"].apply(
-        lambda x: [g[1] for g in eval(x)]
-    )
+    df_genres["genres_list"] = get_encoding(
+        df_genres, "movie_genres", encodings
+    ).name_lists()
     # replace genres with "/" with 2 genres, e.g. "Action/Adventure" -> ["Action", "Adventure"]
     df_genres["genres_list"] = df_genres["genres_list"].apply(
         lambda x: [sub_g for g in x for sub_g in (g.split("/") if "/" in g else [g])]
     )
-    # remove duplicates in genres list
-    df_genres["genres_list"] = df_genres["genres_list"].apply(lambda x: list(set(x)))
+    # remove duplicates in genres list, keeping the first occurrence (a set's
+    # order changes from one process to the next)
+    df_genres["genres_list"] = df_genres["genres_list"].apply(
+        lambda x: list(dict.fromkeys(x))
+    )
     # drop movies with no genres
     df_genres = df_genres[df_genres["genres_list"].apply(lambda x: len(x) > 0)]
     # drop column movie_genres
@@ -303,11 +622,12 @@ def prepare_df_for_genre_analysis(df):
     return df_genres
 
 
-def prepare_df_for_country_language_analysis(df):
+def prepare_df_for_country_language_analysis(df, encodings=None):
     """
     Prepare data for the movie Tongues, containing the country and language analysis
     Args:
         df (pd.DataFrame): the intial dataframe
+        encodings (dict): optional pre-computed encodings of the list columns
     Returns:
         df_movie_country_language (pd.DataFrame): the dataframe necessary for the analysis of countries and languages
     """
@@ -322,7 +642,9 @@ def prepare_df_for_country_language_analysis(df):
         ]
     ]
     # handle missing values and duplicats
-    df_movie_country_language = clean_dataframe_movie_country(df_movie_country_language)
+    df_movie_country_language = clean_dataframe_movie_country(
+        df_movie_country_language, encodings
+    )
     # add log revenue
     df_movie_country_language["log_revenue"] = np.log10(
         df_movie_country_language["inflated_revenue"]
@@ -335,21 +657,20 @@ def prepare_df_for_country_language_analysis(df):
     return df_movie_country_language
 
 
-def prepare_df_country_language_extended(df_movie_country_language):
+def prepare_df_country_language_extended(df_movie_country_language, encodings=None):
     """
     Prepare data for on part of the movie Tongues, exploding the movie languages
     Args:
         df_movie_country_language (pd.DataFrame): the initial dataframe created for the country and language anaylsis
+        encodings (dict): optional pre-computed encodings of the list columns
     Returns:
         df_movie_country_language_extended (pd.DataFrame): the dataframe necessary of languages
     """
     df_movie_country_language_extended = df_movie_country_language.copy()
     # extract the languages from the tuples
-    df_movie_country_language_extended["movie_languages"] = (
-        df_movie_country_language_extended["movie_languages"].apply(
-            au.extract_languages
-        )
-    )
+    df_movie_country_language_extended["movie_languages"] = get_encoding(
+        df_movie_country_language_extended, "movie_languages", encodings
+    ).name_lists()
     # explode on the movie languages column
     df_movie_country_language_extended = df_movie_country_language_extended.explode(
         "movie_languages"
@@ -358,7 +679,7 @@ def prepare_df_country_language_extended(df_movie_country_language):
     return df_movie_country_language_extended
 
 
-def prepare_df_for_budget_analysis(df):
+def prepare_df_for_budget_analysis(df, encodings=None):
     # select relevant columns
     df_budget = df[
         [
@@ -376,9 +697,9 @@ def prepare_df_for_budget_analysis(df):
     # remove duplicates
     df_budget.drop_duplicates(inplace=True)
     # split genres
-    df_budget["genres_list"] = df_budget["movie_genres"].apply(
-        lambda x: [g[1] for g in eval(x)]
-    )
+    df_budget["genres_list"] = get_encoding(
+        df_budget, "movie_genres", encodings
+    ).name_lists()
 
     # add log revenue and log budget for better visualization and analysis
     df_budget["log_revenue"] = np.log10(df_budget["inflated_revenue"])
@@ -403,11 +724,12 @@ def prepare_df_for_budget_analysis(df):
 
 
 # Data Cleaning
-def clean_dataframe_movie_country(df_country_language):
+def clean_dataframe_movie_country(df_country_language, encodings=None):
     """
     Clean the dataframe used for country and language analysis by removing NaN values, empty lists and duplicates.
     Args:
         df_country_language (pd.DataFrame): the dataframe for countries and languages to be cleaned
+        encodings (dict): optional pre-computed encodings of the list columns
     Returns:
         df_country_language (pd.DataFrame): the cleaned dataframe
     """
@@ -416,7 +738,7 @@ def clean_dataframe_movie_country(df_country_language):
 
     # Remove empty lists
     df_country_language = remove_empty_lists_country_language_combined(
-        df_country_language
+        df_country_language, encodings
     )
 
     # Remove duplicates
@@ -425,11 +747,13 @@ def clean_dataframe_movie_country(df_country_language):
     return df_country_language
 
 
-def remove_empty_lists_country_language_combined(df: pd.DataFrame) -> pd.DataFrame:
+def remove_empty_lists_country_language_combined(
+    df: pd.DataFrame, encodings: Optional[Dict] = None
+) -> pd.DataFrame:
     """Remove rows where either countries or languages lists are empty."""
     return df[
-        df["movie_countries"].apply(lambda x: len(ast.literal_eval(x)) > 0)
-        & df["movie_languages"].apply(lambda x: len(ast.literal_eval(x)) > 0)
+        (get_encoding(df, "movie_countries", encodings).lengths() > 0)
+        & (get_encoding(df, "movie_languages", encodings).lengths() > 0)
     ]
 
 
@@ -0,0 +1,381 @@
+import re
+import sys
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Columns holding lists of (freebase_id, name) tuples
+LIST_COLUMNS = ["movie_languages", "movie_countries", "movie_genres"]
+
+# One ('freebase_id', 'name') tuple as written by repr(); names containing a
+# single quote are written with double quotes instead
+_PAIR_PATTERN = re.compile(
+    r"""\(\s*'((?:[^'\\]|\\.)*)'\s*,\s*(?:'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)")\s*\)"""
+)
+
+
+def _unescape(text: str) -> str:
+    """Undo the backslash escapes written by repr() without evaluating anything."""
+    if "\\" not in text:
+        return text
+    text = text.encode("latin-1", "backslashreplace").decode("unicode_escape")
+    # characters outside the BMP were escaped as UTF-16 surrogate pairs:
+    # recombine them as json.loads does, since Arrow strings reject surrogates
+    return text.encode("utf-16", "surrogatepass").decode("utf-16", "surrogatepass")
+
+
+@lru_cache(maxsize=None)
+def _parse_tuple_list_string(value: str) -> Tuple[Tuple[str, str], ...]:
+    return tuple(
+        (_unescape(freebase_id), _unescape(single or double))
+        for freebase_id, single, double in _PAIR_PATTERN.findall(value)
+    )
+
+
+def parse_tuple_list(value) -> List[Tuple[str, str]]:
+    """
+    Return a list of (freebase_id, name) tuples from a parsed or stringified cell.
+
+    Strings are parsed with a regular expression (never eval'd) and each
+    distinct string is only parsed once.
+    """
+    if isinstance(value, str):
+        return list(_parse_tuple_list_string(value))
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [tuple(pair) for pair in value]
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, scrambling uint64 values (arithmetic wraps around)."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class Vocabulary:
+    """Shared vocabulary of (freebase_id, name) pairs, each mapped to an integer code."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def encode(self, pairs: Sequence[Tuple[str, str]]) -> List[int]:
+        """Return the codes of the given pairs, adding unseen pairs to the vocabulary."""
+        codes = []
+        for pair in pairs:
+            code = self._codes.get(pair)
+            if code is None:
+                code = len(self.ids)
+                self._codes[pair] = code
+                self.ids.append(sys.intern(pair[0]))
+                self.names.append(sys.intern(pair[1]))
+            codes.append(code)
+        return codes
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, names) as object arrays indexable by code."""
+        if self._arrays is None or len(self._arrays[0]) != len(self.ids):
+            self._arrays = (
+                np.array(self.ids, dtype=object),
+                np.array(self.names, dtype=object),
+            )
+        return self._arrays
+
+
+@dataclass
+class EncodedListColumn:
+    """
+    Compact encoding of a column of (freebase_id, name) lists.
+
+    The codes of row i are codes[offsets[i]:offsets[i + 1]], and index holds
+    the DataFrame index the rows are aligned to.
+    """
+
+    codes: np.ndarray
+    offsets: np.ndarray
+    vocabulary: Vocabulary
+    index: pd.Index
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self) -> np.ndarray:
+        """Number of items in each row."""
+        return np.diff(self.offsets)
+
+    def row_ids(self) -> np.ndarray:
+        """Row position of every entry of codes."""
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def take(self, positions) -> "EncodedListColumn":
+        """Return the encoding of the rows at the given positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[:-1][positions]
+        lengths = self.lengths()[positions]
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return EncodedListColumn(
+            self.codes[gather], offsets, self.vocabulary, self.index[positions]
+        )
+
+    def align(self, index: pd.Index) -> "EncodedListColumn":
+        """Return the encoding of the rows with the given index labels."""
+        if self.index.equals(index):
+            return self
+        positions = self.index.get_indexer(index)
+        if (positions < 0).any():
+            raise KeyError("Some rows are missing from the encoded column")
+        return self.take(positions)
+
+    def row_hashes(self) -> np.ndarray:
+        """
+        64-bit hash of every row's sequence of codes.
+
+        Rows holding the same items in the same order hash equally, so rows
+        can be compared with hashes of scalars. Hashes are only comparable
+        between columns encoded with the same vocabulary.
+        """
+        lengths = self.lengths()
+        # position of every entry within its row
+        positions = np.arange(len(self.codes), dtype=np.int64) - np.repeat(
+            self.offsets[:-1], lengths
+        )
+        entries = _mix64(
+            self.codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+            + positions.astype(np.uint64)
+        )
+        sums = np.zeros(len(entries) + 1, dtype=np.uint64)
+        np.cumsum(entries, out=sums[1:])
+        row_sums = sums[self.offsets[1:]] - sums[self.offsets[:-1]]
+        return _mix64(row_sums ^ _mix64(lengths.astype(np.uint64)))
+
+    def name_lists(self) -> List[List[str]]:
+        """Decode every row to its list of names."""
+        names = self.vocabulary.arrays()[1][self.codes].tolist()
+        bounds = self.offsets.tolist()
+        return [names[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def pair_lists(self) -> List[List[Tuple[str, str]]]:
+        """Decode every row to its list of (freebase_id, name) tuples."""
+        ids, names = self.vocabulary.arrays()
+        pairs = list(zip(ids[self.codes].tolist(), names[self.codes].tolist()))
+        bounds = self.offsets.tolist()
+        return [pairs[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def first_names(self) -> np.ndarray:
+        """Name of the first item of every row, None for empty rows."""
+        first = np.full(len(self), None, dtype=object)
+        non_empty = self.lengths() > 0
+        first[non_empty] = self.vocabulary.arrays()[1][
+            self.codes[self.offsets[:-1][non_empty]]
+        ]
+        return first
+
+
+def _gather_rows(
+    unique_codes: List[List[int]],
+    labels: np.ndarray,
+    vocabulary: Vocabulary,
+    index: pd.Index,
+) -> EncodedListColumn:
+    """Build the encoding of every row from the codes of the distinct cells."""
+    unique_lengths = np.fromiter(
+        map(len, unique_codes), dtype=np.int64, count=len(unique_codes)
+    )
+    unique_offsets = np.zeros(len(unique_codes) + 1, dtype=np.int64)
+    np.cumsum(unique_lengths, out=unique_offsets[1:])
+    flat_codes = np.fromiter(
+        (code for codes in unique_codes for code in codes),
+        dtype=np.int32,
+        count=unique_offsets[-1],
+    )
+
+    lengths = unique_lengths[labels]
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    gather = np.repeat(unique_offsets[:-1][labels] - offsets[:-1], lengths) + np.arange(
+        offsets[-1]
+    )
+
+    return EncodedListColumn(flat_codes[gather], offsets, vocabulary, index)
+
+
+def encode_list_column(
+    values: pd.Series, vocabulary: Optional[Vocabulary] = None
+) -> EncodedListColumn:
+    """
+    Encode a column of (freebase_id, name) lists into codes and offsets.
+
+    Cells may be stringified (as in the CSV export) or already parsed. Each
+    distinct cell is parsed once, then rows are gathered from the distinct
+    cells' codes with array operations.
+
+    Args:
+        values (pd.Series): column to encode
+        vocabulary (Vocabulary): vocabulary to encode into, a new one if None
+
+    Returns:
+        EncodedListColumn: the encoded column, aligned to values.index
+    """
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+
+    cells = values.map(lambda x: tuple(map(tuple, x)) if isinstance(x, list) else x)
+    labels, uniques = pd.factorize(cells, use_na_sentinel=False)
+
+    unique_codes = [vocabulary.encode(parse_tuple_list(value)) for value in uniques]
+    return _gather_rows(unique_codes, labels, vocabulary, values.index)
+
+
+def _load_json_objects(values: Sequence) -> List[dict]:
+    """
+    Parse JSON objects, all in a single json.loads call when they are all valid.
+
+    Missing or invalid values are decoded as empty dictionaries.
+    """
+    strings = [value if isinstance(value, str) else "{}" for value in values]
+    try:
+        parsed = json.loads("[" + ",".join(strings) + "]")
+        if len(parsed) == len(strings) and all(isinstance(x, dict) for x in parsed):
+            return parsed
+    except ValueError:
+        pass
+
+    parsed = []
+    for value in strings:
+        try:
+            obj = json.loads(value)
+        except ValueError:
+            obj = {}
+        parsed.append(obj if isinstance(obj, dict) else {})
+    return parsed
+
+
+def decode_freebase_dicts(
+    values: pd.Series, vocabulary: Optional[Vocabulary] = None
+) -> EncodedListColumn:
+    """
+    Decode a column of raw Freebase id -> name JSON maps (as in movie.metadata.tsv).
+
+    Distinct cells are parsed as JSON in bulk (nothing is ever evaluated as
+    Python code) and repeated names are interned in the vocabulary.
+
+    Args:
+        values (pd.Series): JSON strings such as '{"/m/02h40lc": "English Language"}'
+        vocabulary (Vocabulary): vocabulary to encode into, a new one if None
+
+    Returns:
+        EncodedListColumn: the encoded column, aligned to values.index
+    """
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+
+    labels, uniques = pd.factorize(values, use_na_sentinel=False)
+    unique_codes = [
+        vocabulary.encode(list(obj.items())) for obj in _load_json_objects(uniques)
+    ]
+    return _gather_rows(unique_codes, labels, vocabulary, values.index)
+
+
+def decode_freebase_columns(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    vocabulary: Optional[Vocabulary] = None,
+) -> Dict[str, EncodedListColumn]:
+    """
+    Decode the raw languages, countries and genres columns with one shared vocabulary.
+
+    Args:
+        df (pd.DataFrame): raw CMU movie metadata
+        columns (list): columns to decode, defaults to all list columns present
+        vocabulary (Vocabulary): vocabulary to extend, a new one if None
+
+    Returns:
+        dict: column name -> EncodedListColumn
+    """
+    if columns is None:
+        columns = [col for col in LIST_COLUMNS if col in df.columns]
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+    return {col: decode_freebase_dicts(df[col], vocabulary) for col in columns}
+
+
+def encode_list_columns(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    vocabulary: Optional[Vocabulary] = None,
+) -> Dict[str, EncodedListColumn]:
+    """
+    Encode the languages, countries and genres columns once for a dataset.
+
+    All columns share one vocabulary. The result can be passed as the
+    `encodings` argument of the prepare_df_* helpers in data_utils so that
+    none of them re-parses the stringified lists.
+
+    Args:
+        df (pd.DataFrame): the movie table
+        columns (list): columns to encode, defaults to all list columns present
+        vocabulary (Vocabulary): vocabulary to extend, a new one if None
+
+    Returns:
+        dict: column name -> EncodedListColumn
+    """
+    if columns is None:
+        columns = [col for col in LIST_COLUMNS if col in df.columns]
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+    return {col: encode_list_column(df[col], vocabulary) for col in columns}
+
+
+def hash_rows(
+    df: pd.DataFrame, encodings: Optional[Dict[str, EncodedListColumn]] = None
+) -> np.ndarray:
+    """
+    64-bit hash of every row of a DataFrame, list columns included.
+
+    The languages, countries and genres columns are hashed from their
+    encodings (see EncodedListColumn.row_hashes), so they are never
+    stringified; the other columns are hashed with pandas' hashing.
+
+    Args:
+        df (pd.DataFrame): rows to hash
+        encodings (dict): optional pre-computed encodings of the list columns
+
+    Returns:
+        np.ndarray: uint64 hash of every row, equal for duplicated rows
+    """
+    list_columns = [col for col in LIST_COLUMNS if col in df.columns]
+    other_columns = [col for col in df.columns if col not in list_columns]
+    if other_columns:
+        hashes = pd.util.hash_pandas_object(df[other_columns], index=False).to_numpy()
+    else:
+        hashes = np.zeros(len(df), dtype=np.uint64)
+    # every column is encoded with a single vocabulary, so its equal lists
+    # get equal codes and equal hashes
+    for col in list_columns:
+        row_hashes = get_encoding(df, col, encodings).row_hashes()
+        hashes = _mix64(hashes * np.uint64(31) + row_hashes)
+    return hashes
+
+
+def get_encoding(
+    df: pd.DataFrame,
+    column: str,
+    encodings: Optional[Dict[str, EncodedListColumn]] = None,
+) -> EncodedListColumn:
+    """Return the encoding of df[column], aligned to df, encoding it if not provided."""
+    if encodings is not None and column in encodings:
+        return encodings[column].align(df.index)
+    return encode_list_column(df[column])
@@ -1,39 +1,330 @@
+import numpy as np
 import pandas as pd
-from typing import Dict
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.encoding_utils import get_encoding, hash_rows
+
+
+@dataclass
+class RuleResult:
+    """Outcome of one validation rule."""
+
+    rule: str
+    kind: str
+    passed: bool
+    failed_count: int
+    sample_rows: List[Any] = field(default_factory=list)
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ValidationReport:
+    """Outcomes of a rule set evaluated on a DataFrame."""
+
+    n_rows: int
+    results: List[RuleResult]
+
+    @property
+    def passed(self) -> bool:
+        return all(result.passed for result in self.results)
+
+    def failures(self) -> List[RuleResult]:
+        return [result for result in self.results if not result.passed]
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per rule, with its counts, samples and details."""
+        return pd.DataFrame([vars(result) for result in self.results]).set_index("rule")
+
+    def format(self) -> str:
+        """Human-readable description of the failed rules."""
+        lines = []
+        for result in self.failures():
+            detail = ", ".join(f"{key}={value}" for key, value in result.detail.items())
+            line = f"FAILED {result.rule} ({result.kind}): {result.failed_count:,} rows"
+            if detail:
+                line += f" [{detail}]"
+            if result.sample_rows:
+                line += f", e.g. rows {result.sample_rows}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class Rule(ABC):
+    """
+    A declarative data-quality check.
+
+    Row-level rules return the boolean mask of the offending rows, computed
+    with vectorized column operations; dataset-level rules (such as the ratio
+    of two column means) return None from violations and set passed in
+    evaluate instead.
+    """
+
+    kind = "rule"
+
+    def __init__(self, name: str, columns: Iterable[str]):
+        self.name = name
+        self.columns = list(columns)
+
+    @abstractmethod
+    def violations(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Boolean mask of the offending rows, or None for dataset-level rules."""
+
+    def evaluate(self, df: pd.DataFrame, n_samples: int = 5) -> RuleResult:
+        missing = [col for col in self.columns if col not in df.columns]
+        if missing:
+            return RuleResult(
+                self.name, self.kind, False, len(df), detail={"missing_columns": missing}
+            )
+        mask = self.violations(df)
+        failed = np.flatnonzero(mask)
+        return RuleResult(
+            self.name,
+            self.kind,
+            len(failed) == 0,
+            len(failed),
+            df.index[failed[:n_samples]].tolist(),
+            self.detail(df, mask),
+        )
+
+    def detail(self, df: pd.DataFrame, mask: np.ndarray) -> Dict[str, Any]:
+        return {}
+
+
+class RequiredColumnsRule(Rule):
+    """The columns must exist."""
+
+    kind = "columns"
+
+    def __init__(self, columns: Iterable[str], name: str = "required_columns"):
+        super().__init__(name, columns)
+
+    def violations(self, df):
+        return np.zeros(len(df), dtype=bool)
+
+
+class NotNullRule(Rule):
+    """The columns must not hold missing values."""
+
+    kind = "not_null"
+
+    def __init__(self, columns: Iterable[str], name: str = "not_null"):
+        super().__init__(name, columns)
+
+    def violations(self, df):
+        return df[self.columns].isna().to_numpy().any(axis=1)
+
+    def detail(self, df, mask):
+        if not mask.any():
+            return {}
+        counts = df[self.columns].isna().sum()
+        return {"null_counts": counts[counts > 0].to_dict()}
+
+
+class RangeRule(Rule):
+    """The (non-missing) values of a column must lie within [min_value, max_value]."""
+
+    kind = "range"
+
+    def __init__(
+        self,
+        column: str,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        name: Optional[str] = None,
+    ):
+        super().__init__(name or f"{column}_range", [column])
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def violations(self, df):
+        values = pd.to_numeric(df[self.columns[0]], errors="coerce").to_numpy(
+            dtype=float
+        )
+        mask = np.zeros(len(values), dtype=bool)
+        if self.min_value is not None:
+            mask |= values < self.min_value
+        if self.max_value is not None:
+            mask |= values > self.max_value
+        return mask
+
+    def detail(self, df, mask):
+        return {"min": self.min_value, "max": self.max_value}
+
+
+class UniqueRule(Rule):
+    """The combination of the columns must identify rows uniquely (missing values ignored)."""
+
+    kind = "unique"
+
+    def __init__(self, columns: Iterable[str], name: Optional[str] = None):
+        columns = list(columns)
+        super().__init__(name or f"{'_'.join(columns)}_unique", columns)
+
+    def violations(self, df):
+        subset = df[self.columns]
+        return (
+            subset.duplicated(keep=False) & subset.notna().all(axis=1)
+        ).to_numpy()
+
+
+class ReferenceRule(Rule):
+    """The (non-missing) values of a column must exist in a reference collection."""
+
+    kind = "reference"
+
+    def __init__(self, column: str, reference: Iterable, name: Optional[str] = None):
+        super().__init__(name or f"{column}_reference", [column])
+        self.reference = pd.Index(reference).unique()
+
+    def violations(self, df):
+        values = df[self.columns[0]]
+        return (values.notna() & ~values.isin(self.reference)).to_numpy()
+
+
+class RatioRule(Rule):
+    """
+    The ratio of two columns must lie strictly within (low, high).
+
+    With aggregate=True the ratio of the column means is checked (a single
+    dataset-level value), otherwise the ratio of every row is.
+    """
+
+    kind = "ratio"
+
+    def __init__(
+        self,
+        numerator: str,
+        denominator: str,
+        low: float,
+        high: float,
+        aggregate: bool = True,
+        name: Optional[str] = None,
+    ):
+        super().__init__(name or f"{numerator}_{denominator}_ratio", [numerator, denominator])
+        self.low = low
+        self.high = high
+        self.aggregate = aggregate
+
+    def _ratio(self, df):
+        numerator, denominator = (
+            pd.to_numeric(df[col], errors="coerce") for col in self.columns
+        )
+        if self.aggregate:
+            return numerator.mean() / denominator.mean()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (numerator / denominator).to_numpy(dtype=float)
+
+    def violations(self, df):
+        if self.aggregate:
+            return None
+        ratio = self._ratio(df)
+        return ~np.isnan(ratio) & ((ratio <= self.low) | (ratio >= self.high))
+
+    def evaluate(self, df, n_samples=5):
+        if not self.aggregate or any(col not in df.columns for col in self.columns):
+            return super().evaluate(df, n_samples)
+        ratio = self._ratio(df)
+        return RuleResult(
+            self.name,
+            self.kind,
+            bool(self.low < ratio < self.high),
+            0,
+            detail={"ratio": round(float(ratio), 4), "bounds": (self.low, self.high)},
+        )
+
+    def detail(self, df, mask):
+        return {"bounds": (self.low, self.high)}
+
+
+def validate(
+    df: pd.DataFrame, rules: Iterable[Rule], n_samples: int = 5
+) -> ValidationReport:
+    """
+    Evaluate a rule set on a DataFrame.
+
+    Nothing is printed: the report holds, for every rule, whether it passed,
+    the number of offending rows and the index labels of up to n_samples of them.
+
+    Args:
+        df (pd.DataFrame): data to validate
+        rules (iterable): Rule instances
+        n_samples (int): number of offending row labels kept per rule
+
+    Returns:
+        ValidationReport: the outcome of every rule
+    """
+    return ValidationReport(len(df), [rule.evaluate(df, n_samples) for rule in rules])
+
+
+def _empty_lists_mask(
+    df: pd.DataFrame, list_columns: List[str], encodings: Optional[Dict] = None
+) -> np.ndarray:
+    """Mask of the rows where any of the list columns is empty."""
+    empty = np.zeros(len(df), dtype=bool)
+    for col in list_columns:
+        empty |= get_encoding(df, col, encodings).lengths() == 0
+    return empty
 
 
 def validate_dataframes(
     df_country: pd.DataFrame,
     df_language: pd.DataFrame,
     df_country_language: pd.DataFrame,
+    encodings: Optional[Dict] = None,
+    return_indices: bool = False,
 ) -> Dict[str, Dict[str, int]]:
-    """Validate dataframes for empty lists and duplicates."""
-
-    initial_state = {
-        "empty_lists": {
-            "countries": count_empty_lists(df_country, "movie_countries"),
-            "languages": count_empty_lists(df_language, "movie_languages"),
-            "combined": count_empty_lists_combined(df_country_language),
-        },
-        "duplicates": {
-            "countries": df_country.duplicated().sum(),
-            "languages": df_language.duplicated().sum(),
-            "combined": df_country_language.duplicated().sum(),
-        },
+    """
+    Validate dataframes for empty lists and duplicates.
+
+    Each frame's rows are hashed once, list columns through their encodings
+    (see encoding_utils.hash_rows), so no list is ever stringified.
+
+    Args:
+        df_country (pd.DataFrame): frame with a movie_countries column
+        df_language (pd.DataFrame): frame with a movie_languages column
+        df_country_language (pd.DataFrame): frame with both columns
+        encodings (dict): optional pre-computed encodings of the list columns
+        return_indices (bool): whether to also return the index labels of
+            the offending rows
+
+    Returns:
+        dict: {"empty_lists": {frame: count}, "duplicates": {frame: count}},
+        with the same structure of pd.Index of offending rows if
+        return_indices is True. Duplicates are counted like
+        DataFrame.duplicated(), the first occurrence not being one.
+    """
+    frames = {
+        "countries": (df_country, ["movie_countries"]),
+        "languages": (df_language, ["movie_languages"]),
+        "combined": (df_country_language, ["movie_countries", "movie_languages"]),
     }
-    print(f"Empty lists - Countries: {initial_state['empty_lists']['countries']}")
-    print(f"Empty lists - Languages: {initial_state['empty_lists']['languages']}")
-    print(f"Empty lists - Combined: {initial_state['empty_lists']['combined']}")
-    print(f"Duplicates - Countries: {initial_state['duplicates']['countries']}")
-    print(f"Duplicates - Languages: {initial_state['duplicates']['languages']}")
-    print(f"Duplicates - Combined: {initial_state['duplicates']['combined']}")
+    counts = {"empty_lists": {}, "duplicates": {}}
+    indices = {"empty_lists": {}, "duplicates": {}}
+    for name, (df, list_columns) in frames.items():
+        empty = _empty_lists_mask(df, list_columns, encodings)
+        duplicated = pd.Series(hash_rows(df, encodings)).duplicated().to_numpy()
+        counts["empty_lists"][name] = int(empty.sum())
+        counts["duplicates"][name] = int(duplicated.sum())
+        if return_indices:
+            indices["empty_lists"][name] = df.index[empty]
+            indices["duplicates"][name] = df.index[duplicated]
+
+    if return_indices:
+        return counts, indices
+    return counts
 
 
-def count_empty_lists(df: pd.DataFrame, column: str) -> int:
-    return df[df[column] == "[]"].shape[0]
+def count_empty_lists(
+    df: pd.DataFrame, column: str, encodings: Optional[Dict] = None
+) -> int:
+    return int((get_encoding(df, column, encodings).lengths() == 0).sum())
 
 
-def count_empty_lists_combined(df: pd.DataFrame) -> int:
-    return df[(df["movie_countries"] == "[]") | (df["movie_languages"] == "[]")].shape[
-        0
-    ]
+def count_empty_lists_combined(
+    df: pd.DataFrame, encodings: Optional[Dict] = None
+) -> int:
+    return int(
+        _empty_lists_mask(df, ["movie_countries", "movie_languages"], encodings).sum()
+    )
@@ -0,0 +1,762 @@
+import os
+import json
+import copy
+import time
+import pickle
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils import analysis_utils as au
+from src.utils import data_utils as du
+from src.utils import figure_utils as fu
+from src.utils import pipeline_utils as pipe
+from src.utils.cube_utils import GenreYearCube
+from src.utils.encoding_utils import encode_list_columns, get_encoding
+
+# File, at the output root, with the inputs hash and outputs of every figure
+MANIFEST_FILE = ".figures_manifest.json"
+
+# Number of genres, languages and countries shown in the "top" plots
+TOP_N = 20
+TOP_N_SMALL = 10
+# Minimum number of movies of a genre, language or country ranked by revenue
+MIN_GROUP_MOVIES = 10
+
+
+@dataclass
+class FigureSpec:
+    """
+    A datastory figure: its builder, the named inputs it is called with (in
+    that order) and extra keyword arguments.
+
+    Builders either end with figure_utils.output_figure (the functions of
+    interactive_plots_utils), return a plotly figure, or draw matplotlib
+    figures; the last two are saved under section/name.
+    """
+
+    name: str
+    section: str
+    builder: Callable
+    inputs: List[str] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def _log_roi(roi):
+    return np.log10(roi + 1)
+
+
+def compute_figure_inputs(
+    df: pd.DataFrame, encodings: Optional[Dict] = None
+) -> Dict[str, Any]:
+    """
+    Compute, once, every input of the datastory figures from the processed dataset.
+
+    Args:
+        df (pd.DataFrame): the processed movie table
+        encodings (dict): optional pre-computed encodings of the list columns
+
+    Returns:
+        dict: input name -> value
+    """
+    import plotly.express as px
+    import statsmodels.api as sm
+
+    if encodings is None:
+        encodings = encode_list_columns(df)
+    inputs = {"colors": px.colors.qualitative.Set2}
+
+    # Echo: rating and revenue
+    df_rating = du.prepare_df_for_rating_analysis(df, encodings)
+    df_rating["log_revenue"] = np.log10(df_rating["inflated_revenue"])
+    df_rating["log_numVotes"] = np.log10(df_rating["numVotes"])
+    top_rating_genres = (
+        df_rating["genres_list"].explode().value_counts().head(TOP_N).index.tolist()
+    )
+    inputs["df_rating"] = df_rating
+    inputs["genre_corrs"] = au.genre_correlations(df_rating, genres=top_rating_genres)
+    inputs["model_multi"] = sm.OLS(
+        df_rating["log_revenue"],
+        sm.add_constant(df_rating[["averageRating", "log_numVotes"]]),
+    ).fit()
+
+    # Shades: genres
+    df_genres = du.prepare_df_for_genre_analysis(df, encodings)
+    df_genres["num_genres"] = df_genres["genres_list"].map(len)
+    cube = GenreYearCube(df_genres)
+    summary = cube.genre_summary(["count", "mean"])
+    top_genres = cube.top_genres(TOP_N)
+    mean_genre_revenue = summary[summary["count"] >= MIN_GROUP_MOVIES].sort_values(
+        "mean", ascending=False
+    )
+    mean_genre_order = mean_genre_revenue.index[:TOP_N].tolist()
+    genres_exploded = df_genres.explode("genres_list")
+    inputs.update(
+        {
+            "df_genres": df_genres,
+            "genre_counts_top20": summary["count"].loc[top_genres],
+            "num_genres_distribution": df_genres["num_genres"]
+            .value_counts()
+            .sort_index(),
+            "mean_genre_revenue": mean_genre_revenue,
+            "mean_genre_order": mean_genre_order,
+            "df_top_genres": genres_exploded[
+                genres_exploded["genres_list"].isin(mean_genre_order)
+            ],
+            "sorted_avg_revenue": df_genres.groupby("num_genres")["inflated_revenue"]
+            .mean()
+            .sort_values(ascending=False),
+            "mean_revenue_pivot": cube.pivot("mean", genres=top_genres),
+            "genre_year_pivot": cube.pivot("count", genres=top_genres),
+            "mean_revenue_pivot_decade": cube.pivot(
+                "mean", by="decade", genres=top_genres
+            ),
+        }
+    )
+
+    # Tongues: languages and countries
+    df_cl = du.prepare_df_for_country_language_analysis(df, encodings)
+    df_cl["first_country"] = get_encoding(
+        df_cl, "movie_countries", encodings
+    ).first_names()
+    df_cl["nbr_languages"] = get_encoding(df_cl, "movie_languages", encodings).lengths()
+    df_cl_extended = du.prepare_df_country_language_extended(df_cl, encodings)
+
+    top_languages = df_cl_extended["movie_languages"].value_counts().head(TOP_N_SMALL)
+    languages = df_cl_extended.groupby("movie_languages")["inflated_revenue"].agg(
+        ["mean", "count"]
+    )
+    countries = df_cl.groupby("first_country")["inflated_revenue"].agg(
+        ["mean", "count"]
+    )
+    language_years = df_cl_extended[
+        df_cl_extended["movie_languages"].isin(top_languages.index)
+    ]
+    inputs.update(
+        {
+            "df_movie_country_language": df_cl,
+            "df_movie_country_language_extended": df_cl_extended,
+            "top_countries_count": df_cl["first_country"]
+            .value_counts()
+            .head(TOP_N_SMALL),
+            "top_languages_count": top_languages,
+            "top_languages_revenue": languages[languages["count"] >= MIN_GROUP_MOVIES][
+                "mean"
+            ].nlargest(TOP_N_SMALL),
+            "top_countries_revenue": countries[countries["count"] >= MIN_GROUP_MOVIES][
+                "mean"
+            ].nlargest(TOP_N_SMALL),
+            "language_revenue_per_year": language_years.groupby(
+                ["release_year", "movie_languages"]
+            )["inflated_revenue"]
+            .mean()
+            .rename("average_revenue")
+            .reset_index(),
+            "mean_language_revenue": sorted(df_cl["nbr_languages"].unique().tolist()),
+            "country_revenue_df": pd.DataFrame(
+                {
+                    "Country": countries.index,
+                    "Average Box Office Revenue": countries["mean"].to_numpy(),
+                }
+            ),
+        }
+    )
+
+    # Starlight: directors
+    df_dir = du.prepare_director_data(df)
+    per_director = df_dir.groupby("director")["inflated_revenue"].agg(["size", "sum"])
+    inputs.update(
+        {
+            "df_dir": df_dir,
+            "director_movie_count": per_director["size"]
+            .nlargest(TOP_N_SMALL)
+            .rename("movie_count")
+            .reset_index(),
+            "director_total_revenue": per_director["sum"]
+            .nlargest(15)
+            .rename("total_revenue")
+            .reset_index(),
+        }
+    )
+
+    # Treasure: budget
+    df_budget = du.prepare_df_for_budget_analysis(df, encodings)
+    budget_exploded = df_budget.explode("genres_list")
+    top_budget_genres = budget_exploded["genres_list"].value_counts().head(TOP_N)
+    top_budget_genres = top_budget_genres.index.tolist()
+    df_budget_filtered = budget_exploded[
+        budget_exploded["genres_list"].isin(top_budget_genres)
+    ].copy()
+    df_budget_filtered["log_ROI"] = _log_roi(df_budget_filtered["ROI"])
+    inputs.update(
+        {
+            "df_budget": df_budget,
+            "df_budget_scatter": df_budget[
+                [
+                    "movie_name",
+                    "inflated_budget",
+                    "inflated_revenue",
+                    "log_budget",
+                    "log_revenue",
+                ]
+            ],
+            "df_budget_filtered": df_budget_filtered,
+            "top_20_genres": top_budget_genres,
+            "genre_corrs_budget": au.genre_correlations(
+                df_budget, genres=top_budget_genres, x_column="log_budget"
+            ),
+        }
+    )
+    return inputs
+
+
+def datastory_figures() -> List[FigureSpec]:
+    """The builders of interactive_plots_utils and plot_utils, with their inputs."""
+    import plotly.express as px
+    from src.utils import interactive_plots_utils as ipu
+    from src.utils import plot_utils as pu
+
+    return [
+        # Echo
+        FigureSpec(
+            "num_movies_per_genre",
+            "echo",
+            ipu.plot_num_of_movies_per_genre,
+            ["df_rating"],
+        ),
+        FigureSpec(
+            "imdb_rating_distribution",
+            "echo",
+            ipu.plot_imdb_rating_distribution,
+            ["df_rating"],
+        ),
+        FigureSpec(
+            "box_office_revenue_distribution",
+            "echo",
+            ipu.plot_box_office_revenue_distribution,
+            ["df_rating"],
+        ),
+        FigureSpec(
+            "imdb_rating_vs_box_office_revenue",
+            "echo",
+            ipu.plot_imdb_rating_vs_box_office_revenue,
+            ["df_rating"],
+        ),
+        FigureSpec(
+            "correlation_matrix", "echo", ipu.plot_correlation_matrix, ["df_rating"]
+        ),
+        FigureSpec(
+            "genre_correlation", "echo", ipu.plot_genre_correlation, ["genre_corrs"]
+        ),
+        FigureSpec(
+            "3d_regression_plane",
+            "echo",
+            ipu.plot_3d_regression_plane,
+            ["df_rating", "model_multi"],
+        ),
+        FigureSpec(
+            "hexbin_regression_plane",
+            "echo",
+            ipu.plot_hexbin_regression_plane,
+            ["df_rating"],
+        ),
+        FigureSpec(
+            "genre_correlation_bars",
+            "echo",
+            pu.plot_genre_correlation_bars,
+            ["genre_corrs"],
+        ),
+        FigureSpec(
+            "rating_correlation_heatmap",
+            "echo",
+            pu.plot_correlation_heatmap,
+            ["df_rating"],
+            {"cols": ["averageRating", "log_revenue", "log_numVotes"]},
+        ),
+        # Shades
+        FigureSpec(
+            "number_of_movies_per_genre",
+            "shades",
+            ipu.create_interactive_number_of_movies_per_genre_plot,
+            ["genre_counts_top20"],
+        ),
+        FigureSpec(
+            "number_of_genres_per_movie",
+            "shades",
+            ipu.create_interactive_number_of_genres_per_movie,
+            ["num_genres_distribution"],
+        ),
+        FigureSpec(
+            "interactive_top_20_genres_with_highest_revenue",
+            "shades",
+            ipu.create_interactive_top_20_genres_with_highest_revenue,
+            ["mean_genre_revenue"],
+        ),
+        FigureSpec(
+            "boxplots_revenue_distribution_top_20",
+            "shades",
+            ipu.create_interactive_boxplots_revenue_distribution_top_20,
+            ["df_top_genres", "mean_genre_order"],
+        ),
+        FigureSpec(
+            "boxplots_num_genres",
+            "shades",
+            ipu.create_interactive_boxplots_num_genres,
+            ["df_genres"],
+        ),
+        FigureSpec(
+            "avg_revenue_per_num_genres",
+            "shades",
+            ipu.create_interactive_avg_revenue_per_num_genres,
+            ["sorted_avg_revenue"],
+        ),
+        FigureSpec(
+            "revenue_trends_over_time_heatmap",
+            "shades",
+            ipu.create_interactive_revenue_trends_over_time_heatmap,
+            ["mean_revenue_pivot"],
+        ),
+        FigureSpec(
+            "genre_ranking_over_time_racing_barplot",
+            "shades",
+            ipu.create_interactive_genre_ranking_over_time_racing_barplot,
+            ["mean_revenue_pivot_decade"],
+        ),
+        FigureSpec(
+            "stacked_area_plot_genre_over_time",
+            "shades",
+            ipu.create_interactive_stacked_area_plot,
+            ["genre_year_pivot"],
+        ),
+        FigureSpec(
+            "heatmap_genre_over_time",
+            "shades",
+            ipu.create_interactive_heatmap_genre_over_time,
+            ["genre_year_pivot"],
+        ),
+        FigureSpec(
+            "grid",
+            "shades",
+            ipu.create_interactive_grid,
+            ["mean_revenue_pivot", "genre_year_pivot"],
+        ),
+        FigureSpec(
+            "genre_barplot", "shades", pu.plot_genre_barplot, ["genre_counts_top20"]
+        ),
+        # Tongues
+        FigureSpec(
+            "top_10_movie_release_countries",
+            "tongues",
+            ipu.top_10_movie_release_countries,
+            ["top_countries_count"],
+        ),
+        FigureSpec(
+            "top_10_movie_languages",
+            "tongues",
+            ipu.top_10_movie_languages,
+            ["top_languages_count"],
+        ),
+        FigureSpec(
+            "language_highest_mean_box_office",
+            "tongues",
+            ipu.language_highest_mean_box_office,
+            ["top_languages_revenue", "df_movie_country_language_extended"],
+        ),
+        FigureSpec(
+            "average_revenue_per_language_per_year",
+            "tongues",
+            ipu.average_revenue_per_language_per_year,
+            ["language_revenue_per_year"],
+        ),
+        FigureSpec(
+            "revenue_per_nbr_languages",
+            "tongues",
+            ipu.revenue_per_nbr_languages,
+            ["df_movie_country_language", "mean_language_revenue"],
+        ),
+        FigureSpec(
+            "map_average_revenue_by_country",
+            "tongues",
+            ipu.map_average_revenue_by_country,
+            ["country_revenue_df"],
+        ),
+        FigureSpec(
+            "country_highest_mean_box_office",
+            "tongues",
+            ipu.country_highest_mean_box_office,
+            ["df_movie_country_language", "top_countries_revenue"],
+        ),
+        # Starlight
+        FigureSpec(
+            "top_10_movies_treemap",
+            "starlight",
+            ipu.create_animated_treemap,
+            ["df_dir"],
+            {
+                "title": "Movie",
+                "colors": px.colors.qualitative.Set2,
+                "mode": "movies",
+                "name": "top_10_movies_treemap",
+            },
+        ),
+        FigureSpec(
+            "top_10_directors_treemap",
+            "starlight",
+            ipu.create_animated_treemap,
+            ["df_dir"],
+            {
+                "title": "Director",
+                "colors": px.colors.qualitative.Set2,
+                "mode": "directors",
+                "name": "top_10_directors_treemap",
+            },
+        ),
+        FigureSpec(
+            "log_max_box_office_revenue_over_time",
+            "starlight",
+            ipu.interactive_log_revenue,
+            ["df_dir"],
+        ),
+        FigureSpec(
+            "top_directors_movie_count",
+            "starlight",
+            ipu.barplot_top_directors_movie_count,
+            ["director_movie_count"],
+        ),
+        FigureSpec(
+            "cumulative_revenue_director_top15_raceplot",
+            "starlight",
+            ipu.race_plot,
+            ["df_dir"],
+        ),
+        FigureSpec(
+            "top_15_directors_total_revenue",
+            "starlight",
+            ipu.total_barplot,
+            ["director_total_revenue"],
+        ),
+        # Treasure
+        FigureSpec(
+            "scatter_budget_vs_revenue",
+            "treasure",
+            ipu.create_interactive_scatter_budget_vs_revenue,
+            ["df_budget_scatter"],
+        ),
+        FigureSpec(
+            "boxplots_budget_per_genre",
+            "treasure",
+            ipu.create_interactive_boxplots_budget_per_genre,
+            ["df_budget_filtered", "top_20_genres"],
+        ),
+        FigureSpec(
+            "boxplots_ROI_per_genre",
+            "treasure",
+            ipu.create_interactive_boxplots_ROI_per_genre,
+            ["df_budget_filtered", "top_20_genres"],
+        ),
+        FigureSpec(
+            "budget_and_revenue_distributions",
+            "treasure",
+            ipu.plot_budget_and_revenue_distributions,
+            ["df_budget", "colors"],
+        ),
+        FigureSpec(
+            "budget_revenue_over_time",
+            "treasure",
+            ipu.plot_budget_revenue_over_time,
+            ["df_budget"],
+        ),
+        FigureSpec(
+            "roi_distribution",
+            "treasure",
+            ipu.plot_roi_distribution,
+            ["df_budget"],
+            {"column": "ROI", "transformation": _log_roi, "xlabel": "Log10(ROI + 1)"},
+        ),
+        FigureSpec("roi_by_genre", "treasure", ipu.plot_roi_by_genre, ["df_budget"]),
+        FigureSpec(
+            "roi_per_genre_boxplot",
+            "treasure",
+            ipu.plot_roi_per_genre_boxplot,
+            ["df_budget"],
+        ),
+        FigureSpec(
+            "budget_per_genre",
+            "treasure",
+            ipu.plot_budget_per_genre,
+            ["df_budget_filtered", "top_20_genres"],
+        ),
+        FigureSpec(
+            "revenue_to_budget_ratio",
+            "treasure",
+            ipu.plot_revenue_to_budget_ratio,
+            ["df_budget"],
+        ),
+        FigureSpec(
+            "budget_correlation_per_genre",
+            "treasure",
+            ipu.plot_budget_correlation_per_genre,
+            ["genre_corrs_budget"],
+        ),
+        FigureSpec(
+            "budget_vs_revenue_hexbin",
+            "treasure",
+            ipu.plot_budget_vs_revenue,
+            ["df_budget"],
+        ),
+        FigureSpec(
+            "budget_revenue_trend",
+            "treasure",
+            pu.plot_budget_revenue_trend,
+            ["df_budget"],
+        ),
+    ]
+
+
+def _value_digest(value) -> bytes:
+    """Content digest of an input value."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        try:
+            hashes = pd.util.hash_pandas_object(value, index=True).to_numpy()
+            names = repr(
+                list(value.columns) if isinstance(value, pd.DataFrame) else value.name
+            )
+            return hashlib.sha256(hashes.tobytes() + names.encode()).digest()
+        except TypeError:
+            # list cells are not hashable by pandas
+            pass
+    return hashlib.sha256(pickle.dumps(value, protocol=4)).digest()
+
+
+def _function_source(func) -> str:
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return repr(func)
+
+
+def figure_hashes(
+    specs: Iterable[FigureSpec],
+    inputs: Dict[str, Any],
+    include_plotlyjs="cdn",
+    code_dir: str = pipe.CODE_DIR,
+) -> Dict[str, str]:
+    """
+    Hash of every figure's builder, parameters, input values and output settings.
+
+    Besides the builder's own source, the hash covers every module of
+    code_dir, so that a change to a helper the builder calls (or to the
+    module-level constants it reads) also triggers a new export.
+
+    Every input is only digested once, however many figures use it.
+
+    Args:
+        specs (iterable): the figures to hash
+        inputs (dict): the values computed by compute_figure_inputs
+        include_plotlyjs: where the HTML files get plotly.js from
+        code_dir (str): directory of the builder and helper modules
+
+    Returns:
+        dict: hash of every figure, by name
+    """
+    code = pipe.code_version(code_dir).encode() + repr(include_plotlyjs).encode()
+    digests = {}
+    hashes = {}
+    for spec in specs:
+        hasher = hashlib.sha256(code)
+        hasher.update(_function_source(spec.builder).encode())
+        hasher.update(
+            repr(
+                sorted(
+                    (key, _function_source(value) if callable(value) else value)
+                    for key, value in spec.params.items()
+                )
+            ).encode()
+        )
+        for name in spec.inputs:
+            if name not in digests:
+                digests[name] = _value_digest(inputs[name])
+            hasher.update(name.encode() + digests[name])
+        hashes[spec.name] = hasher.hexdigest()
+    return hashes
+
+
+def _error_message(error: Exception) -> str:
+    # first line only: plotly's property errors list the whole schema
+    first_line = next(iter(str(error).strip().splitlines()), "")
+    return f"{type(error).__name__}: {first_line}"
+
+
+def _report_row(spec: FigureSpec, status: str, result: Dict[str, Any]) -> Dict:
+    return {
+        "figure": spec.name,
+        "section": spec.section,
+        "status": status,
+        "build_seconds": result.get("build_seconds", np.nan),
+        "write_seconds": result.get("write_seconds", np.nan),
+        "paths": result["paths"],
+        "error": result["error"],
+    }
+
+
+def render_figure(
+    spec: FigureSpec, args: List[Any], root: str, include_plotlyjs
+) -> Dict[str, Any]:
+    """
+    Build and write one figure, timing both steps.
+
+    Returns:
+        dict: name, build_seconds, write_seconds, paths and error (None if
+        the figure was written)
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from plotly.basedatatypes import BaseFigure
+
+    backend = matplotlib.get_backend()
+    plt.switch_backend("Agg")
+    plt.close("all")
+    result = {"name": spec.name, "build_seconds": np.nan, "write_seconds": 0.0}
+    try:
+        start = time.perf_counter()
+        with fu.batch_export(root=root, include_plotlyjs=include_plotlyjs) as batch:
+            figure = spec.builder(*args, **spec.params)
+            result["build_seconds"] = time.perf_counter() - start
+            if isinstance(figure, BaseFigure):
+                fu.output_figure(figure, spec.section, spec.name)
+        paths = list(batch.paths)
+        result["write_seconds"] = sum(batch.seconds.values())
+
+        numbers = plt.get_fignums()
+        for i, number in enumerate(numbers):
+            suffix = f"_{i + 1}" if len(numbers) > 1 else ""
+            path = os.path.join(root, spec.section, f"{spec.name}{suffix}.png")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            start = time.perf_counter()
+            plt.figure(number).savefig(path, bbox_inches="tight")
+            result["write_seconds"] += time.perf_counter() - start
+            paths.append(path)
+        result.update(paths=paths, error=None)
+    except Exception as error:
+        result.update(paths=[], error=_error_message(error))
+    finally:
+        plt.close("all")
+        plt.switch_backend(backend)
+    return result
+
+
+def _load_manifest(root: str) -> Dict[str, Dict]:
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_datastory_figures(
+    df: pd.DataFrame,
+    root: str = fu.DATASTORY_ROOT,
+    include_plotlyjs="cdn",
+    workers: int = 4,
+    only: Optional[Iterable[str]] = None,
+    force: bool = False,
+    encodings: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    Build and write all the datastory figures, in parallel.
+
+    Inputs are computed once from the processed dataset, then the figures
+    are rendered across a process pool. A figure is skipped when the hash of
+    its code, inputs and output settings matches the one recorded at its
+    last export and its files still exist.
+
+    Args:
+        df (pd.DataFrame): the processed movie table
+        root (str): output root, with one directory per section
+        include_plotlyjs: where the HTML files get plotly.js from (see
+            figure_utils.OutputSettings)
+        workers (int): number of processes, 1 to render in this process
+        only (iterable): sections or figure names to export, all if None
+        force (bool): render every figure, even if its inputs are unchanged
+        encodings (dict): optional pre-computed encodings of the list columns
+
+    Returns:
+        pd.DataFrame: one row per figure with its status ("written",
+        "skipped" or "failed"), build and write times, files and error
+    """
+    specs = datastory_figures()
+    if only is not None:
+        only = set(only)
+        specs = [s for s in specs if s.name in only or s.section in only]
+
+    start = time.perf_counter()
+    try:
+        inputs = compute_figure_inputs(df, encodings)
+    except Exception as error:
+        # every figure fails, but the caller still gets a report
+        result = {"paths": [], "error": f"inputs failed: {_error_message(error)}"}
+        report = pd.DataFrame(
+            [_report_row(spec, "failed", result) for spec in specs]
+        ).set_index("figure")
+        report.attrs["inputs_seconds"] = time.perf_counter() - start
+        return report
+    inputs_seconds = time.perf_counter() - start
+    hashes = figure_hashes(specs, inputs, include_plotlyjs)
+
+    manifest = _load_manifest(root)
+    todo = [
+        spec
+        for spec in specs
+        if force
+        or manifest.get(spec.name, {}).get("hash") != hashes[spec.name]
+        or not all(os.path.exists(p) for p in manifest[spec.name].get("paths", []))
+    ]
+    if include_plotlyjs == "shared":
+        fu.write_plotlyjs_bundle(root)
+
+    results = {}
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                spec.name: executor.submit(
+                    render_figure,
+                    spec,
+                    [inputs[name] for name in spec.inputs],
+                    root,
+                    include_plotlyjs,
+                )
+                for spec in todo
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        for spec in todo:
+            # builders may modify their inputs, which are shared in this process
+            args = [copy.deepcopy(inputs[name]) for name in spec.inputs]
+            results[spec.name] = render_figure(spec, args, root, include_plotlyjs)
+
+    rows = []
+    for spec in specs:
+        if spec.name in results:
+            result = results[spec.name]
+            status = "failed" if result["error"] else "written"
+            if not result["error"]:
+                manifest[spec.name] = {
+                    "hash": hashes[spec.name],
+                    "paths": result["paths"],
+                }
+        else:
+            result = {"paths": manifest[spec.name]["paths"], "error": None}
+            status = "skipped"
+        rows.append(_report_row(spec, status, result))
+
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    report = pd.DataFrame(rows).set_index("figure")
+    report.attrs["inputs_seconds"] = inputs_seconds
+    return report
@@ -0,0 +1,208 @@
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Union
+
+import plotly.io as pio
+
+# Root of the datastory plots, one sub-directory per section (echo, shades...)
+DATASTORY_ROOT = "../c1n3mada-datastory/assets/plots/"
+# Name of the shared local plotly.js bundle, written once at the output root
+PLOTLYJS_BUNDLE = "plotly.min.js"
+
+
+@dataclass
+class OutputSettings:
+    """
+    How the interactive plots are displayed and saved.
+
+    include_plotlyjs chooses where the HTML files get plotly.js from:
+    "cdn" (a script tag to the plotly CDN), "shared" (one local bundle at the
+    root of the outputs, referenced by relative path), True (embedded in
+    every file, several MB each) or any other value accepted by
+    plotly's write_html.
+    """
+
+    root: str = DATASTORY_ROOT
+    include_plotlyjs: Union[str, bool] = "cdn"
+    show: bool = True
+    write: bool = True
+
+
+@dataclass
+class FigureBatch:
+    """Figures collected by batch_export and written when it exits."""
+
+    figures: List[tuple] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+
+_settings = OutputSettings()
+_batch: Optional[FigureBatch] = None
+
+
+def get_output_settings() -> OutputSettings:
+    """Return the current output settings."""
+    return _settings
+
+
+def configure_output(**settings) -> OutputSettings:
+    """
+    Change the output settings of all the interactive plots.
+
+    Args:
+        **settings: OutputSettings fields (root, include_plotlyjs, show, write)
+
+    Returns:
+        OutputSettings: the updated settings
+    """
+    names = {f.name for f in fields(OutputSettings)}
+    unknown = set(settings) - names
+    if unknown:
+        raise ValueError(f"Unknown output settings: {sorted(unknown)}")
+    for name, value in settings.items():
+        setattr(_settings, name, value)
+    return _settings
+
+
+@contextmanager
+def output_settings(**settings):
+    """Temporarily change the output settings (see configure_output)."""
+    previous = {f.name: getattr(_settings, f.name) for f in fields(OutputSettings)}
+    configure_output(**settings)
+    try:
+        yield _settings
+    finally:
+        configure_output(**previous)
+
+
+def figure_path(section: str, name: str, root: Optional[str] = None) -> str:
+    """Path of the HTML file of a figure."""
+    return os.path.join(_settings.root if root is None else root, section, f"{name}.html")
+
+
+def write_plotlyjs_bundle(root: Optional[str] = None) -> str:
+    """Write the shared plotly.js bundle at the output root, if it is not there yet."""
+    bundle = os.path.join(_settings.root if root is None else root, PLOTLYJS_BUNDLE)
+    if not os.path.exists(bundle):
+        from plotly.offline import get_plotlyjs
+
+        os.makedirs(os.path.dirname(bundle) or ".", exist_ok=True)
+        # write then rename, so a concurrent reader never sees a partial file
+        with open(bundle + ".tmp", "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+        os.replace(bundle + ".tmp", bundle)
+    return bundle
+
+
+def _plotlyjs_source(path: str, include_plotlyjs: Union[str, bool], root: str):
+    """Value of write_html's include_plotlyjs for a file, writing the shared bundle if needed."""
+    if include_plotlyjs != "shared":
+        return include_plotlyjs
+    bundle = write_plotlyjs_bundle(root)
+    # relative path, so that the assets folder can be moved as a whole
+    return os.path.relpath(bundle, os.path.dirname(path)).replace(os.sep, "/")
+
+
+def write_figure(
+    fig,
+    path: str,
+    filename: Optional[str] = None,
+    include_plotlyjs: Union[str, bool, None] = None,
+    root: Optional[str] = None,
+) -> str:
+    """
+    Write a figure to an HTML file.
+
+    Args:
+        fig (go.Figure): figure to write
+        path (str): output file
+        filename (str): name of the images downloaded from the figure's
+            toolbar, defaults to the file name
+        include_plotlyjs: see OutputSettings, defaults to the current setting
+        root (str): directory of the shared plotly.js bundle, defaults to the
+            current output root
+
+    Returns:
+        str: the path written
+    """
+    if include_plotlyjs is None:
+        include_plotlyjs = _settings.include_plotlyjs
+    if filename is None:
+        filename = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pio.write_html(
+        fig,
+        path,
+        config={"toImageButtonOptions": {"filename": filename}},
+        include_plotlyjs=_plotlyjs_source(
+            path, include_plotlyjs, _settings.root if root is None else root
+        ),
+    )
+    return path
+
+
+def output_figure(fig, section: str, name: str, filename: Optional[str] = None):
+    """
+    Display and save a datastory figure according to the output settings.
+
+    Every plot function of interactive_plots_utils ends with this call. Inside
+    batch_export the figure is only collected, and written when the batch ends.
+
+    Args:
+        fig (go.Figure): the figure
+        section (str): datastory section (echo, tongues, shades, treasure, starlight)
+        name (str): file name, without extension
+        filename (str): name of the images downloaded from the figure's
+            toolbar, defaults to name
+
+    Returns:
+        go.Figure: the figure
+    """
+    if name.endswith(".html"):
+        name = name[: -len(".html")]
+    filename = filename or name
+
+    if _settings.show:
+        fig.show()
+    if _settings.write:
+        path = figure_path(section, name)
+        if _batch is not None:
+            _batch.figures.append((fig, path, filename))
+        else:
+            write_figure(fig, path, filename)
+    return fig
+
+
+@contextmanager
+def batch_export(show: bool = False, **settings):
+    """
+    Collect the figures output inside the block and write them all at its end.
+
+    Figures are not displayed by default, and the shared plotly.js bundle
+    (if used) is written once for the whole batch.
+
+    Args:
+        show (bool): whether figures are still displayed
+        **settings: other output settings for the duration of the batch
+
+    Yields:
+        FigureBatch: the collected figures, with the written paths and the
+        write time of every file once the block exits
+    """
+    global _batch
+    if _batch is not None:
+        raise RuntimeError("batch_export blocks cannot be nested")
+    batch = FigureBatch()
+    with output_settings(show=show, **settings):
+        _batch = batch
+        try:
+            yield batch
+        finally:
+            _batch = None
+        for fig, path, filename in batch.figures:
+            start = time.perf_counter()
+            batch.paths.append(write_figure(fig, path, filename))
+            batch.seconds[path] = time.perf_counter() - start
@@ -1,4 +1,36 @@
-def perform_final_checks(df):
+import numpy as np
+import pandas as pd
+
+from src.utils.encoding_utils import get_encoding
+from src.utils.evaluation_utils import (
+    NotNullRule,
+    RangeRule,
+    RatioRule,
+    RequiredColumnsRule,
+    validate,
+)
+
+# Columns every processed movie must have a value for
+ESSENTIAL_COLUMNS = [
+    "movie_name",
+    "release_year",
+    "combined_revenue",
+    "inflated_revenue",
+    "movie_genres",
+    "averageRating",
+]
+
+FINAL_CHECK_RULES = [
+    RequiredColumnsRule(ESSENTIAL_COLUMNS),
+    RangeRule("inflated_revenue", min_value=0, name="non_negative_inflated_revenue"),
+    RangeRule("release_year", max_value=2024, name="no_future_release"),
+    NotNullRule(ESSENTIAL_COLUMNS, name="essential_not_null"),
+    # reasonable range for the inflation multiplier
+    RatioRule("inflated_revenue", "combined_revenue", 0.5, 10, name="inflation_ratio"),
+]
+
+
+def perform_final_checks(df, rules=None, return_report=False):
     """
     Perform final validation checks on the processed dataset.
 
@@ -6,61 +38,23 @@ def perform_final_checks(df):
     -----------
     df : pandas.DataFrame
         The final processed DataFrame
+    rules : list, optional
+        Validation rules (see evaluation_utils), defaults to FINAL_CHECK_RULES
+    return_report : bool, optional (default=False)
+        Whether to also return the full ValidationReport
 
     Returns:
     --------
     bool
-        True if all checks pass, False otherwise
+        True if all checks pass, False otherwise (with the report if
+        return_report is True)
     """
-    checks_passed = True
-
     print("Performing final data quality checks...")
+    report = validate(df, FINAL_CHECK_RULES if rules is None else rules)
 
-    # Check 1: No negative revenues
-    neg_revenues = df[df["inflated_revenue"] < 0]
-    if not neg_revenues.empty:
-        print(
-            f"WARNING: Found {len(neg_revenues)} movies with negative inflated revenues"
-        )
-        checks_passed = False
-
-    # Check 2: No future release dates
-    future_movies = df[df["release_year"] > 2024]
-    if not future_movies.empty:
-        print(
-            f"WARNING: Found {len(future_movies)} movies with release dates in the future"
-        )
-        checks_passed = False
-
-    # Check 3: Verify essential columns exist
-    essential_columns = [
-        "movie_name",
-        "release_year",
-        "combined_revenue",
-        "inflated_revenue",
-        "movie_genres",
-        "averageRating",
-    ]
-    missing_columns = [col for col in essential_columns if col not in df.columns]
-    if missing_columns:
-        print(f"WARNING: Missing essential columns: {missing_columns}")
-        checks_passed = False
-
-    # Check 4: Verify data completeness
-    null_counts = df[essential_columns].isnull().sum()
-    if null_counts.any():
-        print("\nNull values in essential columns:")
-        print(null_counts[null_counts > 0])
-        checks_passed = False
-
-    # Check 5: Verify revenue inflation worked correctly
-    inflation_ratio = df["inflated_revenue"].mean() / df["combined_revenue"].mean()
-    if not (0.5 < inflation_ratio < 10):  # reasonable range for inflation multiplier
-        print(f"WARNING: Unusual inflation ratio: {inflation_ratio:.2f}")
-        checks_passed = False
-
-    # Summary statistics
-    if checks_passed:
+    if report.passed:
+        genres = get_encoding(df, "movie_genres")
+        n_genres = len(np.unique(genres.vocabulary.arrays()[1][genres.codes]))
         print("\nAll checks passed! Dataset summary:")
         print(f"Total number of movies: {len(df):,}")
         print(
@@ -69,53 +63,144 @@ def perform_final_checks(df):
         print(
             f"Average inflation-adjusted revenue: ${df['inflated_revenue'].mean():,.2f}"
         )
-        print(
-            f"Number of unique genres: {len(set([genre for genres in df['movie_genres'] for genre in genres]))}"
-        )
+        print(f"Number of unique genres: {n_genres}")
+    else:
+        print(report.format())
 
-    return checks_passed
+    if return_report:
+        return report.passed, report
+    return report.passed
 
 
-def adjust_for_inflation(df, cpi, target_year=2016):
+def build_cpi_multipliers(cpi, target_year=2016):
     """
-    Adjust revenues for inflation using CPI data.
+    Build a year-indexed lookup array of inflation multipliers.
 
     Parameters:
     -----------
-    df : pandas.DataFrame
-        DataFrame containing movie data with 'combined_revenue' and 'release_year' columns
     cpi : pandas.DataFrame
-        DataFrame containing CPI data
+        DataFrame containing CPI data with 'year' and 'CPIAUCNS' columns
     target_year : int, optional (default=2016)
         The year to adjust all values to
 
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with new 'inflated_revenue' column
+    tuple
+        (first_year, multipliers) where multipliers[year - first_year] is the
+        factor converting an amount from that year to target_year dollars.
+        Years without CPI data hold NaN.
     """
     # Verify target year is in CPI data
     if target_year not in cpi["year"].values:
         raise ValueError(f"Target year {target_year} not found in CPI data")
 
+    years = cpi["year"].to_numpy(dtype=np.int64)
+    values = cpi["CPIAUCNS"].to_numpy(dtype=np.float64)
+
     # Get CPI value for target year
-    target_year_cpi = cpi[cpi["year"] == target_year]["CPIAUCNS"].values[0]
+    target_year_cpi = values[years == target_year][0]
+
+    first_year = years.min()
+    multipliers = np.full(years.max() - first_year + 1, np.nan)
+    multipliers[years - first_year] = target_year_cpi / values
+
+    return first_year, multipliers
+
+
+def adjust_for_inflation(
+    df,
+    cpi,
+    target_year=2016,
+    columns=None,
+    year_column="release_year",
+    return_missing=False,
+):
+    """
+    Adjust money columns for inflation using CPI data.
 
-    # Calculate inflation-adjusted revenue
+    The year -> multiplier lookup is built once and all columns are adjusted
+    in a single vectorized pass. Rows whose year has no CPI entry get NaN
+    instead of raising.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        DataFrame containing movie data with the money columns and 'release_year'
+    cpi : pandas.DataFrame
+        DataFrame containing CPI data
+    target_year : int, optional (default=2016)
+        The year to adjust all values to
+    columns : dict, optional
+        Mapping of source column -> adjusted column. Defaults to
+        {'combined_revenue': 'inflated_revenue', 'budget': 'inflated_budget'}
+    year_column : str, optional (default='release_year')
+        Column holding the year each amount is expressed in
+    return_missing : bool, optional (default=False)
+        If True, also return the rows whose year has no CPI entry
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with the adjusted columns added
+    pandas.DataFrame, optional
+        Only if return_missing is True: the index and year of every row that
+        could not be adjusted
+    """
+    if columns is None:
+        columns = {
+            "combined_revenue": "inflated_revenue",
+            "budget": "inflated_budget",
+        }
+
+    first_year, multipliers = build_cpi_multipliers(cpi, target_year)
+
+    # Map each row's year to a position in the lookup array
+    years = df[year_column].to_numpy(dtype=np.float64)
+    positions = years - first_year
+    in_range = (positions >= 0) & (positions < len(multipliers))
+    row_multipliers = np.full(len(df), np.nan)
+    row_multipliers[in_range] = multipliers[positions[in_range].astype(np.int64)]
+
+    # Calculate all inflation-adjusted columns at once
     df = df.copy()
-    df["inflated_revenue"] = df.apply(
-        lambda x: x["combined_revenue"]
-        * target_year_cpi
-        / cpi[cpi["year"] == x["release_year"]]["CPIAUCNS"].values[0],
-        axis=1,
+    values = df[list(columns)].to_numpy(dtype=np.float64)
+    adjusted = values * row_multipliers[:, None]
+    for i, target_column in enumerate(columns.values()):
+        df[target_column] = adjusted[:, i]
+
+    if not return_missing:
+        return df
+
+    missing_mask = np.isnan(row_multipliers)
+    missing = pd.DataFrame(
+        {year_column: df[year_column].to_numpy()[missing_mask]},
+        index=df.index[missing_mask],
     )
+    return df, missing
 
-    # calculate inflation-adjusted budget
-    df["inflated_budget"] = df.apply(
-        lambda x: x["budget"]
-        * target_year_cpi
-        / cpi[cpi["year"] == x["release_year"]]["CPIAUCNS"].values[0],
-        axis=1,
-    )
 
-    return df
+def adjust_movies_for_inflation(df, cpi, target_year=None):
+    """
+    Inflation-correct the merged movie dataset.
+
+    Movies released before the first CPI year are removed, as their adjustment
+    wouldn't be accurate, then revenues and budgets are adjusted.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The cleaned movie dataset
+    cpi : pandas.DataFrame
+        Yearly CPI data
+    target_year : int, optional
+        The year to adjust all values to (defaults to the latest release year)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame with 'inflated_revenue' and 'inflated_budget' columns
+    """
+    df = df[df["release_year"] >= cpi["year"].min()]
+    if target_year is None:
+        target_year = int(df["release_year"].max())
+    return adjust_for_inflation(df, cpi, target_year)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Iterable, List
+
+
+class GenreIndex:
+    """
+    Sparse movie x genre membership matrix with per-genre inverted lists.
+
+    Row i of the matrix is the i-th row of the DataFrame the index was built
+    from, so the positions returned by the lookups can be used with .iloc.
+    """
+
+    def __init__(self, genres_lists: pd.Series):
+        lengths = genres_lists.map(len).to_numpy(dtype=np.int64)
+        flat = [genre for genres in genres_lists for genre in genres]
+        codes, genres = pd.factorize(pd.Series(flat, dtype=object), sort=True)
+
+        rows = np.repeat(np.arange(len(genres_lists)), lengths)
+        data = np.ones(len(codes), dtype=bool)
+        self.genres = np.asarray(genres, dtype=object)
+        self.index = genres_lists.index
+        # duplicate (movie, genre) pairs are summed, so cast back to bool
+        self.matrix = sparse.csr_matrix(
+            (data, (rows, codes)), shape=(len(genres_lists), len(self.genres))
+        ).astype(bool)
+        # CSC layout gives the sorted row positions of every genre
+        self._postings = self.matrix.tocsc()
+        self._postings.sort_indices()
+        self._codes = {genre: code for code, genre in enumerate(self.genres)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = "genres_list") -> "GenreIndex":
+        """Build the index from a DataFrame column of genre lists."""
+        return cls(df[column])
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def __contains__(self, genre):
+        return genre in self._codes
+
+    def rows(self, genre: str) -> np.ndarray:
+        """Sorted row positions of the movies with the given genre."""
+        code = self._codes.get(genre)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        start, end = self._postings.indptr[code], self._postings.indptr[code + 1]
+        return self._postings.indices[start:end]
+
+    def mask(self, genre: str) -> np.ndarray:
+        """Boolean mask of the movies with the given genre."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows(genre)] = True
+        return mask
+
+    def _codes_of(self, genres: Iterable[str]) -> List[int]:
+        return [self._codes[genre] for genre in genres if genre in self._codes]
+
+    def any_of(self, genres: Iterable[str]) -> np.ndarray:
+        """Sorted row positions of the movies with at least one of the genres."""
+        hits = self._postings[:, self._codes_of(genres)].getnnz(axis=1)
+        return np.flatnonzero(hits)
+
+    def all_of(self, genres: Iterable[str]) -> np.ndarray:
+        """Sorted row positions of the movies with all of the genres."""
+        genres = list(genres)
+        codes = self._codes_of(genres)
+        if len(codes) < len(set(genres)):
+            return np.empty(0, dtype=np.int64)
+        hits = self._postings[:, codes].getnnz(axis=1)
+        return np.flatnonzero(hits == len(codes))
+
+    def counts(self) -> pd.Series:
+        """Number of movies per genre, sorted in descending order."""
+        counts = pd.Series(
+            np.diff(self._postings.indptr), index=self.genres, name="count"
+        )
+        return counts.sort_values(ascending=False, kind="stable")
@@ -6,16 +6,21 @@ import plotly.graph_objs as go
 import plotly.figure_factory as ff
 from plotly.subplots import make_subplots
 import seaborn as sns
+from matplotlib.colors import to_hex
 import scipy.stats as stats
 import statsmodels.api as sm
 from scipy.stats import linregress
 
-## ---------- PATHS ---------- #
-SAVE_PATH_ECHO = "../c1n3mada-datastory/assets/plots/echo/"
-SAVE_PATH_TONGUES = "../c1n3mada-datastory/assets/plots/tongues/"
-SAVE_PATH_SHADES = "../c1n3mada-datastory/assets/plots/shades/"
-SAVE_PATH_TREASURE = "../c1n3mada-datastory/assets/plots/treasure/"
-SAVE_PATH_STARLIGHT = "../c1n3mada-datastory/assets/plots/starlight/"
+from src.utils.animation_utils import (
+    add_delta_frames,
+    cumulative_top_k,
+    race_frames,
+    ranked_bar_frames,
+    revenue_treemap_animation,
+    treemap_tables,
+    treemap_top_data,
+)
+from src.utils.figure_utils import output_figure
 
 
 ## ----------INTERACTIVE PLOTS FOR THE MOVIE ECHO ---------- #
@@ -54,11 +59,7 @@ def plot_num_of_movies_per_genre(df_rating):
         texttemplate="%{text}",
         hovertemplate="<b>Genre:</b> %{x}<br><b>Number of Movies:</b> %{y}<extra></extra>",
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}num_movies_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "num_movies_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "num_movies_per_genre")
 
 
 def plot_imdb_rating_distribution(df_rating):
@@ -105,11 +106,7 @@ def plot_imdb_rating_distribution(df_rating):
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}imdb_rating_distribution.html",
-        config={"toImageButtonOptions": {"filename": "imdb_rating_distribution"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "imdb_rating_distribution")
 
 
 def plot_box_office_revenue_distribution(df_rating):
@@ -152,13 +149,7 @@ def plot_box_office_revenue_distribution(df_rating):
         title_font=dict(family="Arial"),
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}box_office_revenue_distribution.html",
-        config={
-            "toImageButtonOptions": {"filename": "box_office_revenue_distribution"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "echo", "box_office_revenue_distribution")
 
 
 def plot_imdb_rating_vs_box_office_revenue(df_rating):
@@ -194,13 +185,7 @@ def plot_imdb_rating_vs_box_office_revenue(df_rating):
     fig.update_traces(
         marker=dict(size=8, line=dict(width=1, color="darkgray")),
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}imdb_rating_vs_box_office_revenue.html",
-        config={
-            "toImageButtonOptions": {"filename": "imdb_rating_vs_box_office_revenue"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "echo", "imdb_rating_vs_box_office_revenue")
 
 
 def plot_correlation_matrix(df_rating):
@@ -239,11 +224,7 @@ def plot_correlation_matrix(df_rating):
         coloraxis=dict(colorbar=dict(title="Correlation Score")),
         title_font=dict(family="Arial"),
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}correlation_matrix.html",
-        config={"toImageButtonOptions": {"filename": "correlation_matrix"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "correlation_matrix")
 
 
 def plot_genre_correlation(genre_corrs):
@@ -293,11 +274,7 @@ def plot_genre_correlation(genre_corrs):
         template="plotly_white",
         title_x=0.5,
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}genre_correlation.html",
-        config={"toImageButtonOptions": {"filename": "genre_correlation"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "genre_correlation")
 
 
 def plot_3d_regression_plane(df_rating, model_multi):
@@ -354,9 +331,11 @@ def plot_3d_regression_plane(df_rating, model_multi):
     fig = go.Figure(data=[scatter, surface])
     fig.update_layout(
         scene=dict(
-            xaxis=dict(title="IMDb Rating", titlefont=dict(size=12)),
-            yaxis=dict(title="Logarithmic Number of Votes", titlefont=dict(size=12)),
-            zaxis=dict(title="Logarithmic Revenue [$]", titlefont=dict(size=12)),
+            xaxis=dict(title=dict(text="IMDb Rating", font=dict(size=12))),
+            yaxis=dict(
+                title=dict(text="Logarithmic Number of Votes", font=dict(size=12))
+            ),
+            zaxis=dict(title=dict(text="Logarithmic Revenue [$]", font=dict(size=12))),
         ),
         title=dict(
             text="Regression Model for IMDb Rating, Revenue and Number of Votes",
@@ -366,11 +345,7 @@ def plot_3d_regression_plane(df_rating, model_multi):
         template="plotly_white",
         title_font=dict(family="Arial"),
     )
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}3d_regression_plane.html",
-        config={"toImageButtonOptions": {"filename": "3d_regression_plane"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "3d_regression_plane")
 
 
 def plot_hexbin_regression_plane(df_rating):
@@ -447,11 +422,7 @@ def plot_hexbin_regression_plane(df_rating):
         template="plotly_white",
     )
     fig = go.Figure(data=[hexbin_trace, trendline_trace, x_hist, y_hist], layout=layout)
-    fig.write_html(
-        f"{SAVE_PATH_ECHO}hexbin_regression_plane.html",
-        config={"toImageButtonOptions": {"filename": "hexbin_regression_plane"}},
-    )
-    fig.show()
+    output_figure(fig, "echo", "hexbin_regression_plane")
 
 
 ## ----------INTERACTIVE PLOTS FOR THE MOVIE SHADES----------#
@@ -481,11 +452,7 @@ def create_interactive_number_of_movies_per_genre_plot(genre_counts_top20):
         title_x=0.5,
     )
     os.makedirs("interactive_plots/shades", exist_ok=True)
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}number_of_movies_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "number_of_movies_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "number_of_movies_per_genre")
 
 
 def create_interactive_number_of_genres_per_movie(num_genres_distribution):
@@ -516,11 +483,7 @@ def create_interactive_number_of_genres_per_movie(num_genres_distribution):
             tickvals=num_genres_distribution.index,
         ),
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}number_of_genres_per_movie.html",
-        config={"toImageButtonOptions": {"filename": "number_of_genres_per_movie"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "number_of_genres_per_movie")
 
 
 def create_interactive_top_20_genres_with_highest_revenue(mean_genre_revenue):
@@ -556,13 +519,12 @@ def create_interactive_top_20_genres_with_highest_revenue(mean_genre_revenue):
         margin=dict(t=70, b=50, l=50, r=50),
         title=dict(pad=dict(t=10, b=0)),
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}interactive_top_20_genres_with_highest_revenue.html",
-        config={
-            "toImageButtonOptions": {"filename": "top_20_genres_with_highest_revenue"}
-        },
+    output_figure(
+        fig,
+        "shades",
+        "interactive_top_20_genres_with_highest_revenue",
+        "top_20_genres_with_highest_revenue",
     )
-    fig.show()
 
 
 def create_interactive_boxplots_revenue_distribution_top_20(
@@ -586,13 +548,7 @@ def create_interactive_boxplots_revenue_distribution_top_20(
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}boxplots_revenue_distribution_top_20.html",
-        config={
-            "toImageButtonOptions": {"filename": "boxplots_revenue_distribution_top_20"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "shades", "boxplots_revenue_distribution_top_20")
 
 
 def create_interactive_boxplots_num_genres(df_genres):
@@ -616,11 +572,7 @@ def create_interactive_boxplots_num_genres(df_genres):
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}boxplots_num_genres.html",
-        config={"toImageButtonOptions": {"filename": "boxplots_num_genres"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "boxplots_num_genres")
 
 
 def create_interactive_avg_revenue_per_num_genres(sorted_avg_revenue):
@@ -648,18 +600,14 @@ def create_interactive_avg_revenue_per_num_genres(sorted_avg_revenue):
         bargap=0.2,
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}avg_revenue_per_num_genres.html",
-        config={"toImageButtonOptions": {"filename": "avg_revenue_per_num_genres"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "avg_revenue_per_num_genres")
 
 
 def create_interactive_revenue_trends_over_time_heatmap(mean_revenue_pivot):
     mean_revenue_pivot = mean_revenue_pivot.replace(0, np.nan)
     cubehelix_cmap = sns.color_palette("ch:s=-.2,r=.6", as_cmap=True)
     plotly_cubehelix = [
-        [i / 255, f"rgb{tuple((np.array(cubehelix_cmap(i / 255)) * 255).astype(int))}"]
+        [i / 255, to_hex(cubehelix_cmap(i / 255))]
         for i in range(256)
     ]
     fig = px.imshow(
@@ -677,13 +625,7 @@ def create_interactive_revenue_trends_over_time_heatmap(mean_revenue_pivot):
         title=dict(pad=dict(t=10, b=0)),
         template="plotly_white",
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}revenue_trends_over_time_heatmap.html",
-        config={
-            "toImageButtonOptions": {"filename": "revenue_trends_over_time_heatmap"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "shades", "revenue_trends_over_time_heatmap")
 
 
 def create_interactive_genre_ranking_over_time_racing_barplot(
@@ -691,45 +633,21 @@ def create_interactive_genre_ranking_over_time_racing_barplot(
 ):
     mean_revenue_pivot_decade = mean_revenue_pivot_decade.fillna(0)
     genre_colors = px.colors.qualitative.Alphabet
-    genre_color_map = {
-        genre: genre_colors[i % len(genre_colors)]
-        for i, genre in enumerate(mean_revenue_pivot_decade.columns)
-    }
+    genres = mean_revenue_pivot_decade.columns
     decades = mean_revenue_pivot_decade.index.unique()
-    frames = []
-    for decade in decades:
-        sorted_data = mean_revenue_pivot_decade.loc[decade].sort_values(ascending=False)
-        frames.append(
-            go.Frame(
-                data=[
-                    go.Bar(
-                        y=sorted_data.index,
-                        x=sorted_data.values,
-                        orientation="h",
-                        marker=dict(
-                            color=[
-                                genre_color_map[genre] for genre in sorted_data.index
-                            ]
-                        ),
-                        name="Revenue",
-                    )
-                ],
-                name=str(decade),
-            )
-        )
-    initial_decade = decades[0]
-    sorted_initial = mean_revenue_pivot_decade.loc[initial_decade].sort_values(
-        ascending=False
-    )
+    # every genre keeps its bar (label and colour), frames only move it to its rank
+    frames = ranked_bar_frames(mean_revenue_pivot_decade)
+    initial = frames[str(decades[0])][0]
     layout = go.Layout(
         title="Genre Ranking by Average Box Office Revenue per Decade",
         xaxis=dict(
             title="Average Box Office Revenue [$]",
-            range=[0, mean_revenue_pivot_decade.max().max() * 1.1],
+            # room for the genre labels next to the bars
+            range=[0, mean_revenue_pivot_decade.max().max() * 1.3],
         ),
         template="plotly_white",
         title_x=0.5,
-        yaxis=dict(autorange="reversed", title="Genres"),
+        yaxis=dict(autorange="reversed", title="Genres", showticklabels=False),
         sliders=[
             {
                 "active": 0,
@@ -793,27 +711,25 @@ def create_interactive_genre_ranking_over_time_racing_barplot(
     fig = go.Figure(
         data=[
             go.Bar(
-                y=sorted_initial.index,
-                x=sorted_initial.values,
+                y=initial["y"],
+                x=initial["x"],
                 orientation="h",
+                text=list(genres),
+                textposition="outside",
+                cliponaxis=False,
                 marker=dict(
-                    color=[genre_color_map[genre] for genre in sorted_initial.index]
+                    color=[
+                        genre_colors[i % len(genre_colors)] for i in range(len(genres))
+                    ]
                 ),
+                hovertemplate="<b>%{text}</b><br>%{x:$,.0f}<extra></extra>",
                 name="Revenue",
             )
         ],
         layout=layout,
-        frames=frames,
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}genre_ranking_over_time_racing_barplot.html",
-        config={
-            "toImageButtonOptions": {
-                "filename": "genre_ranking_over_time_racing_barplot"
-            }
-        },
-    )
-    fig.show()
+    add_delta_frames(fig, frames)
+    output_figure(fig, "shades", "genre_ranking_over_time_racing_barplot")
 
 
 def create_interactive_stacked_area_plot(genre_year_pivot):
@@ -847,19 +763,13 @@ def create_interactive_stacked_area_plot(genre_year_pivot):
         margin=dict(t=70, b=50, l=50, r=50),
         title=dict(text="Number of Movies per Genre Over Time", pad=dict(t=10, b=0)),
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}stacked_area_plot_genre_over_time.html",
-        config={
-            "toImageButtonOptions": {"filename": "stacked_area_plot_genre_over_time"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "shades", "stacked_area_plot_genre_over_time")
 
 
 def create_interactive_heatmap_genre_over_time(genre_year_pivot):
     cubehelix_cmap = sns.color_palette("ch:s=-.2,r=.6", as_cmap=True)
     plotly_cubehelix = [
-        [i / 255, f"rgb{tuple((np.array(cubehelix_cmap(i / 255)) * 255).astype(int))}"]
+        [i / 255, to_hex(cubehelix_cmap(i / 255))]
         for i in range(256)
     ]
     fig = go.Figure(
@@ -886,11 +796,7 @@ def create_interactive_heatmap_genre_over_time(genre_year_pivot):
         margin=dict(t=70, b=50, l=50, r=50),
         title=dict(text="Number of Movies per Genre Over Time", pad=dict(t=10, b=0)),
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}heatmap_genre_over_time.html",
-        config={"toImageButtonOptions": {"filename": "heatmap_genre_over_time"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "heatmap_genre_over_time")
 
 
 def create_interactive_grid(mean_revenue_pivot, genre_year_pivot):
@@ -978,11 +884,7 @@ def create_interactive_grid(mean_revenue_pivot, genre_year_pivot):
             ),
         ],
     )
-    fig.write_html(
-        f"{SAVE_PATH_SHADES}grid.html",
-        config={"toImageButtonOptions": {"filename": "grid"}},
-    )
-    fig.show()
+    output_figure(fig, "shades", "grid")
 
 
 ## ----------INTERACTIVE PLOTS FOR THE MOVIE TONGUES----------#
@@ -1010,12 +912,7 @@ def top_10_movie_release_countries(top_countries):
         showlegend=False,
     )
 
-    fig.show()
-
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}top_10_movie_release_countries.html",
-        config={"toImageButtonOptions": {"filename": "top_10_movie_release_countries"}},
-    )
+    output_figure(fig, "tongues", "top_10_movie_release_countries")
 
 
 def top_10_movie_languages(top_languages):
@@ -1042,12 +939,7 @@ def top_10_movie_languages(top_languages):
         showlegend=False,
     )
 
-    fig.show()
-
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}top_10_movie_languages.html",
-        config={"toImageButtonOptions": {"filename": "top_10_movie_languages"}},
-    )
+    output_figure(fig, "tongues", "top_10_movie_languages")
 
 
 def language_highest_mean_box_office(top_languages, df_movie_country_language_extended):
@@ -1101,14 +993,7 @@ def language_highest_mean_box_office(top_languages, df_movie_country_language_ex
 
     fig.update_yaxes(range=[0, max(top_languages.values) * 1.2])
 
-    fig.show()
-
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}language_highest_mean_box_office.html",
-        config={
-            "toImageButtonOptions": {"filename": "language_highest_mean_box_office"}
-        },
-    )
+    output_figure(fig, "tongues", "language_highest_mean_box_office")
 
 
 def average_revenue_per_language_per_year(filtered_df):
@@ -1123,33 +1008,12 @@ def average_revenue_per_language_per_year(filtered_df):
     all_languages = mean_revenue_pivot_year.columns
 
     years = mean_revenue_pivot_year.index.unique()
-    frames = []
-    for year in years:
-        sorted_data = mean_revenue_pivot_year.loc[year].sort_values(ascending=False)
-        frames.append(
-            go.Frame(
-                data=[
-                    go.Bar(
-                        y=all_languages,
-                        x=[sorted_data.get(lang, 0) for lang in all_languages],
-                        orientation="h",
-                        width=0.8,
-                        marker=dict(
-                            color=[
-                                language_color_map[language]
-                                for language in all_languages
-                            ]
-                        ),
-                        name="Revenue",
-                    )
-                ],
-                name=str(year),
-            )
-        )
+    # the languages and their colours are static, frames only carry the revenues
+    frames = {
+        str(year): [{"x": mean_revenue_pivot_year.loc[year].to_numpy()}]
+        for year in years
+    }
     initial_year = years[0]
-    sorted_initial = (
-        mean_revenue_pivot_year.loc[initial_year].reindex(all_languages).fillna(0)
-    )
 
     max_revenue = mean_revenue_pivot_year.max().max()
 
@@ -1231,8 +1095,9 @@ def average_revenue_per_language_per_year(filtered_df):
         data=[
             go.Bar(
                 y=all_languages,
-                x=[sorted_initial.get(lang, 0) for lang in all_languages],
+                x=frames[str(initial_year)][0]["x"],
                 orientation="h",
+                width=0.8,
                 marker=dict(
                     color=[language_color_map[language] for language in all_languages]
                 ),
@@ -1240,19 +1105,10 @@ def average_revenue_per_language_per_year(filtered_df):
             )
         ],
         layout=layout,
-        frames=frames,
     )
+    add_delta_frames(fig, frames)
 
-    fig.show()
-
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}average_revenue_per_language_per_year.html",
-        config={
-            "toImageButtonOptions": {
-                "filename": "average_revenue_per_language_per_year"
-            }
-        },
-    )
+    output_figure(fig, "tongues", "average_revenue_per_language_per_year")
 
 
 def revenue_per_nbr_languages(df_movie_country_language, mean_language_revenue):
@@ -1285,11 +1141,7 @@ def revenue_per_nbr_languages(df_movie_country_language, mean_language_revenue):
         showlegend=False,
     )
 
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}revenue_per_nbr_languages.html",
-        config={"toImageButtonOptions": {"filename": "revenue_per_nbr_languages"}},
-    )
+    output_figure(fig, "tongues", "revenue_per_nbr_languages")
 
 
 def map_average_revenue_by_country(country_revenue_df):
@@ -1313,11 +1165,7 @@ def map_average_revenue_by_country(country_revenue_df):
         template="plotly_white",
     )
 
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}map_average_revenue_by_country.html",
-        config={"toImageButtonOptions": {"filename": "map_average_revenue_by_country"}},
-    )
+    output_figure(fig, "tongues", "map_average_revenue_by_country")
 
 
 def country_highest_mean_box_office(df_movie_country_language, top_countries):
@@ -1371,39 +1219,13 @@ def country_highest_mean_box_office(df_movie_country_language, top_countries):
 
     fig.update_yaxes(range=[0, max(top_countries.values) * 1.2])
 
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_TONGUES}country_highest_mean_box_office.html",
-        config={
-            "toImageButtonOptions": {"filename": "country_highest_mean_box_office"}
-        },
-    )
+    output_figure(fig, "tongues", "country_highest_mean_box_office")
 
 
 def create_treemap(data, title, year, colors, mode="movies", top_n=10):
     year_data = data[data["release_year"] == year]
-
-    if mode == "movies":
-        col_to_path = ["movie_name"]
-        top_data = year_data.nlargest(top_n, "inflated_revenue")[
-            ["movie_name", "director", "inflated_revenue"]
-        ].reset_index()
-
-    elif mode == "directors":
-        col_to_path = ["director"]
-        top_data = (
-            year_data.groupby("director")["inflated_revenue"]
-            .sum()
-            .nlargest(top_n)
-            .reset_index()
-        )
-        top_data["movie_name"] = top_data["director"].apply(
-            lambda x: year_data[year_data["director"] == x]["movie_name"].tolist()
-        )
-
-        top_data["movie_name"] = top_data["movie_name"].apply(lambda x: ",".join(x))
-    else:
-        raise ValueError("Invalid mode. Choose 'movies' or 'directors'.")
+    top_data = treemap_top_data(year_data, mode, top_n)
+    col_to_path = ["movie_name"] if mode == "movies" else ["director"]
 
     fig = px.treemap(
         top_data,
@@ -1449,18 +1271,14 @@ def create_animated_treemap(
     if start_year is None:
         start_year = unique_years[len(unique_years) // 2]
 
-    frames = [
-        go.Frame(
-            data=create_treemap(data, title, year, colors, mode=mode, top_n=top_n).data,
-            name=str(year),
-        )
-        for year in unique_years
-    ]
-
-    initial_fig = create_treemap(
-        data, title, start_year, colors, mode=mode, top_n=top_n
+    tables = treemap_tables(data, mode=mode, top_n=top_n)
+    # labels and colours are stored once, frames only carry what changes
+    initial_fig = revenue_treemap_animation(tables, mode, colors, start=start_year)
+    initial_fig.update_layout(
+        title=f"Top {top_n} {title} Revenues Over the Years",
+        paper_bgcolor="white",
+        template="plotly_white",
     )
-    initial_fig.frames = frames
 
     initial_fig.update_layout(
         updatemenus=[
@@ -1530,11 +1348,7 @@ def create_animated_treemap(
         margin=dict(t=70, b=50, l=50, r=50),
         title=dict(pad=dict(t=10, b=0)),
     )
-    initial_fig.show()
-    initial_fig.write_html(
-        f"{SAVE_PATH_STARLIGHT}{name}.html",
-        config={"toImageButtonOptions": {"filename": name}},
-    )
+    output_figure(initial_fig, "starlight", name)
 
 
 def interactive_log_revenue(data):
@@ -1575,13 +1389,7 @@ def interactive_log_revenue(data):
     fig.update_xaxes(
         range=[yearly_max["release_year"].min(), yearly_max["release_year"].max()]
     )
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_STARLIGHT}log_max_box_office_revenue_over_time.html",
-        config={
-            "toImageButtonOptions": {"filename": "log_max_box_office_revenue_over_time"}
-        },
-    )
+    output_figure(fig, "starlight", "log_max_box_office_revenue_over_time")
 
 
 def barplot_top_directors_movie_count(data):
@@ -1609,70 +1417,116 @@ def barplot_top_directors_movie_count(data):
         coloraxis_showscale=False,
         title_x=0.5,
     )
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_STARLIGHT}top_10_movie_release_countries.html",
-        config={"toImageButtonOptions": {"filename": "top_10_movie_release_countries"}},
-    )
+    output_figure(fig, "starlight", "top_10_movie_release_countries")
 
 
-def race_plot(data, speed=1000):
-    df_race = data.sort_values(by="release_year")
-    df_race["cumulative_revenue"] = df_race.groupby("director")[
-        "inflated_revenue"
-    ].cumsum()
-    all_years = pd.DataFrame(
-        {
-            "release_year": range(
-                int(df_race.release_year.min()), int(df_race.release_year.max()) + 1
-            )
-        }
+def race_plot(data, speed=1000, top_n=15):
+    # top directors by cumulative revenue at the end of every year, ranked
+    # incrementally instead of over a dense year x director grid
+    years = range(int(data.release_year.min()), int(data.release_year.max()) + 1)
+    top = cumulative_top_k(
+        data, "director", "inflated_revenue", "release_year", k=top_n, times=years
+    )
+    top = top.rename(columns={"inflated_revenue": "cumulative_revenue"})
+    directors, frames = race_frames(
+        top, "director", "cumulative_revenue", "release_year"
     )
-    all_directors = pd.DataFrame({"director": df_race["director"].unique()})
-    year_director_grid = all_years.merge(all_directors, how="cross")
-    cumulative_df = year_director_grid.merge(
-        df_race[["release_year", "director", "cumulative_revenue"]],
-        on=["release_year", "director"],
-        how="left",
-    )
-    cumulative_df["cumulative_revenue"] = (
-        cumulative_df.groupby("director")["cumulative_revenue"].ffill().fillna(0)
-    )
-    cumulative_df = (
-        cumulative_df.groupby("release_year")
-        .apply(lambda group: group.nlargest(15, "cumulative_revenue"))
-        .reset_index(drop=True)
-    )
-    colors = px.colors.qualitative.Set2 * 10 + px.colors.qualitative.Set2[:7]
-    color_discrete_map = {
-        director: colors[i]
-        for i, director in enumerate(cumulative_df["director"].unique())
+    colors = px.colors.qualitative.Set2
+    # the x axis follows the leader of every year
+    leaders = top.groupby("release_year")["cumulative_revenue"].max()
+    layouts = {
+        str(year): {"xaxis": {"range": [0, leader * 1.3]}}
+        for year, leader in leaders.items()
     }
-    cumulative_df["color"] = cumulative_df["director"].map(color_discrete_map)
-    colors = cumulative_df["color"].values
-    bar = go.barplot(
-        df=cumulative_df,
-        item_column="director",
-        value_column="cumulative_revenue",
-        time_column="release_year",
-        top_entries=10,
-        item_color=colors,
-    )
-    bar.plot(
+    first_year = str(leaders.index[0])
+
+    layout = go.Layout(
         title="Cumulative Revenue of Directors Over Time",
-        item_label="Director",
-        value_label="Cumulative Revenue [$]",
-        frame_duration=speed,
-    )
-    bar.fig.update_layout(title_x=0.5)
-    bar.fig.show()
-    bar.fig.write_html(
-        f"{SAVE_PATH_STARLIGHT}cumulative_revenue_director_top15_raceplot.html",
-        config={
-            "toImageButtonOptions": {
-                "filename": "cumulative_revenue_director_top15_raceplot"
+        title_x=0.5,
+        xaxis=dict(title="Cumulative Revenue [$]", range=[0, leaders.iloc[0] * 1.3]),
+        yaxis=dict(title="Director", autorange="reversed", showticklabels=False),
+        template="plotly_white",
+        sliders=[
+            {
+                "active": 0,
+                "steps": [
+                    {
+                        "label": year,
+                        "method": "animate",
+                        "args": [
+                            [year],
+                            {
+                                "frame": {"duration": speed, "redraw": True},
+                                "mode": "immediate",
+                            },
+                        ],
+                    }
+                    for year in frames
+                ],
+                "x": 0.1,
+                "y": -0.1,
+                "len": 0.9,
             }
-        },
+        ],
+        updatemenus=[
+            {
+                "buttons": [
+                    {
+                        "args": [
+                            None,
+                            {
+                                "frame": {"duration": speed, "redraw": True},
+                                "fromcurrent": True,
+                                "transition": {"duration": 100, "easing": "linear"},
+                            },
+                        ],
+                        "label": "Play",
+                        "method": "animate",
+                    },
+                    {
+                        "args": [
+                            [None],
+                            {
+                                "frame": {"duration": 0, "redraw": False},
+                                "mode": "immediate",
+                            },
+                        ],
+                        "label": "Pause",
+                        "method": "animate",
+                    },
+                ],
+                "direction": "left",
+                "pad": {"r": 10, "t": 87},
+                "showactive": False,
+                "type": "buttons",
+                "x": 0.1,
+                "xanchor": "right",
+                "y": -0.1,
+                "yanchor": "top",
+            }
+        ],
+    )
+    fig = go.Figure(
+        data=[
+            go.Bar(
+                y=frames[first_year][0]["y"],
+                x=frames[first_year][0]["x"],
+                orientation="h",
+                text=list(directors),
+                textposition="outside",
+                cliponaxis=False,
+                marker=dict(
+                    color=[colors[i % len(colors)] for i in range(len(directors))]
+                ),
+                hovertemplate="<b>%{text}</b><br>%{x:$,.0f}<extra></extra>",
+                name="Cumulative Revenue",
+            )
+        ],
+        layout=layout,
+    )
+    add_delta_frames(fig, frames, layouts)
+    output_figure(
+        fig, "starlight", f"cumulative_revenue_director_top{top_n}_raceplot"
     )
 
 
@@ -1709,11 +1563,7 @@ def total_barplot(data):
         title_x=0.5,
         template="plotly_white",
     )
-    fig.show()
-    fig.write_html(
-        f"{SAVE_PATH_STARLIGHT}top_15_directors_total_revenue.html",
-        config={"toImageButtonOptions": {"filename": "top_15_directors_total_revenue"}},
-    )
+    output_figure(fig, "starlight", "top_15_directors_total_revenue")
 
 
 def create_interactive_scatter_budget_vs_revenue(df):
@@ -1745,11 +1595,7 @@ def create_interactive_scatter_budget_vs_revenue(df):
         title_font=dict(family="Arial"),
         template="plotly_white",
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}scatter_budget_vs_revenue.html",
-        config={"toImageButtonOptions": {"filename": "scatter_budget_vs_revenue"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "scatter_budget_vs_revenue")
 
 
 def create_interactive_boxplots_budget_per_genre(df_budget_filtered, top_20_genres):
@@ -1770,11 +1616,7 @@ def create_interactive_boxplots_budget_per_genre(df_budget_filtered, top_20_genr
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}boxplots_budget_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "boxplots_budget_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "boxplots_budget_per_genre")
 
 
 def create_interactive_boxplots_ROI_per_genre(df_budget_filtered, top_20_genres):
@@ -1794,11 +1636,7 @@ def create_interactive_boxplots_ROI_per_genre(df_budget_filtered, top_20_genres)
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}boxplots_ROI_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "boxplots_ROI_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "boxplots_ROI_per_genre")
 
 
 def plot_budget_and_revenue_distributions(df, colors, nbins=50):
@@ -1839,13 +1677,7 @@ def plot_budget_and_revenue_distributions(df, colors, nbins=50):
     fig.update_yaxes(title_text="Frequency", row=1, col=1)
     fig.update_xaxes(title_text="Logarithmic Revenue [$]", row=1, col=2)
     fig.update_yaxes(title_text="Frequency", row=1, col=2)
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}budget_and_revenue_distributions.html",
-        config={
-            "toImageButtonOptions": {"filename": "budget_and_revenue_distributions"}
-        },
-    )
-    fig.show()
+    output_figure(fig, "treasure", "budget_and_revenue_distributions")
 
 
 def plot_budget_revenue_over_time(df):
@@ -1887,15 +1719,13 @@ def plot_budget_revenue_over_time(df):
         title_font=dict(family="Arial"),
         xaxis=dict(title="Release Year"),
         yaxis=dict(
-            title="Average Budget [$]",
-            titlefont=dict(color="rgb(102,194,165)"),
+            title=dict(text="Average Budget [$]", font=dict(color="rgb(102,194,165)")),
             tickfont=dict(color="rgb(102,194,165)"),
             showgrid=True,
             zeroline=True,
         ),
         yaxis2=dict(
-            title="Average Revenue [$]",
-            titlefont=dict(color="rgb(252,141,98)"),
+            title=dict(text="Average Revenue [$]", font=dict(color="rgb(252,141,98)")),
             tickfont=dict(color="rgb(252,141,98)"),
             overlaying="y",
             side="right",
@@ -1911,11 +1741,7 @@ def plot_budget_revenue_over_time(df):
         template="plotly_white",
         showlegend=False,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}budget_revenue_over_time.html",
-        config={"toImageButtonOptions": {"filename": "budget_revenue_over_time"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "budget_revenue_over_time")
 
 
 def plot_roi_distribution(
@@ -1965,11 +1791,7 @@ def plot_roi_distribution(
         template="plotly_white",
         title_x=0.5,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}roi_distribution.html",
-        config={"toImageButtonOptions": {"filename": f"roi_distribution"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "roi_distribution")
 
 
 def plot_roi_by_genre(df):
@@ -2023,11 +1845,7 @@ def plot_roi_by_genre(df):
         bargap=0.4,
     )
     fig.add_vline(x=0, line_width=1, line_dash="dash", line_color="black")
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}roi_by_genre.html",
-        config={"toImageButtonOptions": {"filename": f"roi_by_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "roi_by_genre")
 
 
 def plot_roi_per_genre_boxplot(df_budget):
@@ -2057,11 +1875,7 @@ def plot_roi_per_genre_boxplot(df_budget):
         title_x=0.5,
         title_font=dict(family="Arial"),
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}roi_per_genre_boxplot.html",
-        config={"toImageButtonOptions": {"filename": "roi_per_genre_boxplot"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "roi_per_genre_boxplot")
 
 
 def plot_budget_per_genre(df_budget_filtered, top_20_genres):
@@ -2084,11 +1898,7 @@ def plot_budget_per_genre(df_budget_filtered, top_20_genres):
         template="plotly_white",
         title_x=0.5,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}budget_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "budget_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "budget_per_genre")
 
 
 def plot_revenue_to_budget_ratio(df_budget):
@@ -2141,11 +1951,7 @@ def plot_revenue_to_budget_ratio(df_budget):
         template="plotly_white",
         title_font=dict(family="Arial"),
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}revenue_to_budget_ratio.html",
-        config={"toImageButtonOptions": {"filename": "revenue_to_budget_ratio"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "revenue_to_budget_ratio")
 
 
 def plot_budget_correlation_per_genre(genre_corrs):
@@ -2180,11 +1986,7 @@ def plot_budget_correlation_per_genre(genre_corrs):
         legend_title="Correlation Type",
         height=800,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}budget_correlation_per_genre.html",
-        config={"toImageButtonOptions": {"filename": "budget_correlation_per_genre"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "budget_correlation_per_genre")
 
 
 def plot_budget_vs_revenue(df_budget):
@@ -2242,8 +2044,4 @@ def plot_budget_vs_revenue(df_budget):
         legend=dict(y=1.05),
         title_x=0.5,
     )
-    fig.write_html(
-        f"{SAVE_PATH_TREASURE}budget_vs_revenue_hexbin.html",
-        config={"toImageButtonOptions": {"filename": "budget_vs_revenue_hexbin"}},
-    )
-    fig.show()
+    output_figure(fig, "treasure", "budget_vs_revenue_hexbin")
@@ -0,0 +1,371 @@
+import re
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict, Optional, Tuple
+
+
+def _clean_title_keys(titles: pd.Series) -> pd.Series:
+    """Punctuation, whitespace and article cleanup of lowercased titles."""
+    return (
+        titles.str.replace("&", " and ", regex=False)
+        .str.replace(r"['`]", "", regex=True)
+        .str.replace(r"[^\w\s]|_", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.replace(r"^(?:the|a|an) ", "", regex=True)
+        .str.replace(r" (?:the|a|an)$", "", regex=True)
+        .replace("", np.nan)
+    )
+
+
+def normalize_titles(titles: pd.Series) -> pd.Series:
+    """
+    Normalize movie titles into join keys.
+
+    Strips accents, lowercases, replaces "&" by "and", removes punctuation and
+    leading/trailing articles ("The Matrix" and "Matrix, The" both become
+    "matrix"). Titles without any ASCII letter or digit (e.g. written in a
+    non-Latin script) keep their casefolded original characters. Each
+    distinct title is only normalized once.
+
+    Args:
+        titles (pd.Series): raw titles
+
+    Returns:
+        pd.Series: normalized titles, NaN where the title is missing or empty
+    """
+    codes, uniques = pd.factorize(titles)
+    raw = pd.Series(uniques, dtype=object).astype(str)
+    keys = _clean_title_keys(
+        raw.str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.lower()
+    )
+    # stripping the non-ASCII characters would leave nothing to match on
+    no_ascii = keys.isna()
+    if no_ascii.any():
+        # object dtype, so that the regexes match Unicode word characters
+        keys[no_ascii] = _clean_title_keys(
+            raw[no_ascii].str.normalize("NFKC").str.casefold().astype(object)
+        )
+    normalized = keys.to_numpy(dtype=object)[codes]
+    normalized[codes < 0] = np.nan
+    return pd.Series(normalized, index=titles.index, dtype=object)
+
+
+def _join_keys(titles: pd.Series, years: pd.Series) -> pd.Series:
+    """Combine normalized titles and years into one hashable key (NaN if either is missing)."""
+    keys = normalize_titles(titles) + "|" + years.astype("Int64").astype(str)
+    return keys.where(titles.notna() & years.notna())
+
+
+def build_tmdb_title_index(df_tmdb: pd.DataFrame) -> Tuple[pd.Index, np.ndarray, int]:
+    """
+    Build a hashed (normalized title, release year) index over TMDB.
+
+    When several TMDB rows share a key, the row with a known revenue, then a
+    known budget, then the highest revenue is kept, ties being broken by row
+    order, so the result is deterministic.
+
+    Args:
+        df_tmdb (pd.DataFrame): preprocessed TMDB data
+
+    Returns:
+        tuple: (index of unique keys, TMDB row position of each key,
+        number of duplicate TMDB rows that were dropped)
+    """
+    keys = _join_keys(df_tmdb["title"], df_tmdb["release_year"])
+    candidates = pd.DataFrame(
+        {
+            "key": keys.to_numpy(),
+            "no_revenue": df_tmdb["revenue"].isna().to_numpy(),
+            "no_budget": df_tmdb["budget"].isna().to_numpy(),
+            "revenue": -df_tmdb["revenue"].fillna(0).to_numpy(),
+            "position": np.arange(len(df_tmdb)),
+        }
+    ).dropna(subset=["key"])
+    candidates = candidates.sort_values(
+        ["key", "no_revenue", "no_budget", "revenue", "position"], kind="stable"
+    )
+    unique = candidates.drop_duplicates(subset="key", keep="first")
+
+    n_duplicates = len(candidates) - len(unique)
+    return pd.Index(unique["key"]), unique["position"].to_numpy(), n_duplicates
+
+
+def match_cmu_tmdb(
+    df_movies: pd.DataFrame,
+    df_tmdb: pd.DataFrame,
+    fuzzy_threshold: Optional[float] = None,
+    year_window: int = 1,
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
+    """
+    Match every CMU movie to at most one TMDB movie on normalized title and year.
+
+    If fuzzy_threshold is given, movies without an exact match are then
+    fuzzy-matched against the TMDB movies released within year_window years
+    that no exact match took (see fuzzy_match_titles). Fuzzy matching is off
+    by default: close titles are often different movies, and a wrong match
+    copies their revenue and budget.
+
+    Args:
+        df_movies (pd.DataFrame): CMU movies with "movie_name" and "release_year"
+        df_tmdb (pd.DataFrame): TMDB movies with "title" and "release_year"
+        fuzzy_threshold (float): minimum similarity of a fuzzy match (e.g.
+            0.9), None to only use exact matches
+        year_window (int): maximum release year difference of a fuzzy match
+
+    Returns:
+        tuple: (TMDB row position of every CMU row, -1 if unmatched,
+        match confidence of every CMU row (1 for exact matches, the title
+        similarity for fuzzy matches, NaN if unmatched),
+        dictionary of match statistics)
+    """
+    tmdb_keys, tmdb_positions, n_duplicates = build_tmdb_title_index(df_tmdb)
+    cmu_keys = _join_keys(df_movies["movie_name"], df_movies["release_year"])
+
+    key_positions = tmdb_keys.get_indexer(cmu_keys)
+    positions = np.where(key_positions >= 0, tmdb_positions[key_positions], -1)
+    confidence = np.where(positions >= 0, 1.0, np.nan)
+    n_exact = int((positions >= 0).sum())
+
+    # fuzzy matching of the movies left unmatched by the exact join
+    n_fuzzy = 0
+    if fuzzy_threshold is not None:
+        unmatched = np.flatnonzero(positions < 0)
+        # TMDB movies already matched exactly are not candidates
+        available = tmdb_positions[~np.isin(tmdb_positions, positions)]
+        candidates = df_tmdb.iloc[available]
+        fuzzy_positions, fuzzy_scores = fuzzy_match_titles(
+            df_movies["movie_name"].iloc[unmatched],
+            df_movies["release_year"].iloc[unmatched],
+            candidates["title"],
+            candidates["release_year"],
+            year_window=year_window,
+            threshold=fuzzy_threshold,
+        )
+        found = fuzzy_positions >= 0
+        positions[unmatched[found]] = available[fuzzy_positions[found]]
+        confidence[unmatched[found]] = fuzzy_scores[found]
+        n_fuzzy = int(found.sum())
+
+    n_matched = n_exact + n_fuzzy
+    stats = {
+        "cmu_rows": len(df_movies),
+        "tmdb_rows": len(df_tmdb),
+        "tmdb_keys": len(tmdb_keys),
+        "tmdb_duplicates_dropped": n_duplicates,
+        "exact_matched": n_exact,
+        "fuzzy_matched": n_fuzzy,
+        "matched": n_matched,
+        "unmatched": len(df_movies) - n_matched,
+        "match_rate": n_matched / len(df_movies) if len(df_movies) else np.nan,
+    }
+    return positions, confidence, stats
+
+
+# Roman numerals up to 39, the ones used for sequels ("ii", "iv", "xii", ...)
+_ROMAN_NUMERAL = r"x{0,3}(?:ix|iv|v?i{0,3})"
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10}
+
+
+def _roman_to_int(numeral: str) -> int:
+    values = [_ROMAN_VALUES[c] for c in numeral]
+    return sum(
+        -v if i + 1 < len(values) and v < values[i + 1] else v
+        for i, v in enumerate(values)
+    )
+
+
+def title_numbers(titles: np.ndarray) -> np.ndarray:
+    """
+    Numbers of every normalized title, Arabic or Roman ("saw iii" -> (3,)).
+
+    Two titles with different numbers are different movies (usually sequels
+    of one another), however similar the rest of their titles.
+
+    Args:
+        titles (np.ndarray): normalized titles
+
+    Returns:
+        np.ndarray: sorted tuple of the numbers of every title
+    """
+    words = pd.Series(titles, dtype=object).str.split()
+    numbers = np.empty(len(titles), dtype=object)
+    for i, title_words in enumerate(words):
+        found = []
+        for word in title_words if isinstance(title_words, list) else []:
+            if word.isdigit():
+                found.append(int(word))
+            elif re.fullmatch(_ROMAN_NUMERAL, word) and word:
+                found.append(_roman_to_int(word))
+        numbers[i] = tuple(sorted(found))
+    return numbers
+
+
+def _ngram_matrix(
+    titles: np.ndarray, n: int, vocabulary: Dict[str, int], grow: bool
+) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Binary title x character n-gram matrix.
+
+    Args:
+        titles (np.ndarray): normalized titles
+        n (int): n-gram size
+        vocabulary (dict): n-gram -> column, extended in place if grow is True
+        grow (bool): whether unseen n-grams are added to the vocabulary
+
+    Returns:
+        tuple: (sparse matrix, number of distinct n-grams of every title)
+    """
+    indptr = [0]
+    indices = []
+    sizes = np.empty(len(titles), dtype=np.int64)
+    for i, title in enumerate(titles):
+        padded = f" {title} "
+        grams = {padded[j : j + n] for j in range(len(padded) - n + 1)}
+        sizes[i] = len(grams)
+        for gram in grams:
+            column = vocabulary.get(gram)
+            if column is None and grow:
+                column = vocabulary[gram] = len(vocabulary)
+            if column is not None:
+                indices.append(column)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(titles), len(vocabulary)),
+    )
+    return matrix, sizes
+
+
+def fuzzy_match_titles(
+    titles: pd.Series,
+    years: pd.Series,
+    candidate_titles: pd.Series,
+    candidate_years: pd.Series,
+    year_window: int = 1,
+    n: int = 3,
+    threshold: float = 0.8,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuzzy-match titles against candidate titles released within a year window.
+
+    Candidates are blocked by release year (+/- year_window) and scored with
+    the Dice coefficient of their character n-gram sets, computed for a whole
+    year block at once as a sparse n-gram matrix product, so only pairs
+    sharing at least one n-gram in a nearby year are ever scored. Pairs whose
+    titles contain different numbers ("Saw II" and "Saw III") are rejected.
+
+    Matching is one-to-one: the pairs are assigned greedily from the highest
+    similarity (then the closest year), so a candidate is never used twice.
+
+    Args:
+        titles (pd.Series): titles to match
+        years (pd.Series): release years of titles
+        candidate_titles (pd.Series): titles to match against
+        candidate_years (pd.Series): release years of candidate_titles
+        year_window (int): maximum release year difference
+        n (int): n-gram size
+        threshold (float): minimum Dice similarity of a match
+
+    Returns:
+        tuple: (candidate row position of every title, -1 if unmatched,
+        similarity of every match, NaN if unmatched)
+    """
+    positions = np.full(len(titles), -1, dtype=np.int64)
+    scores = np.full(len(titles), np.nan)
+
+    normalized = normalize_titles(titles).to_numpy()
+    candidate_normalized = normalize_titles(candidate_titles).to_numpy()
+    year_values = pd.to_numeric(years, errors="coerce").to_numpy(dtype=float)
+    candidate_year_values = pd.to_numeric(candidate_years, errors="coerce").to_numpy(
+        dtype=float
+    )
+
+    valid = pd.notna(normalized) & ~np.isnan(year_values)
+    candidate_valid = pd.notna(candidate_normalized) & ~np.isnan(candidate_year_values)
+    if not valid.any() or not candidate_valid.any():
+        return positions, scores
+
+    rows = np.flatnonzero(valid)
+    candidate_rows = np.flatnonzero(candidate_valid)
+    numbers = title_numbers(normalized[rows])
+    candidate_numbers = title_numbers(candidate_normalized[candidate_rows])
+
+    vocabulary = {}
+    candidate_matrix, candidate_sizes = _ngram_matrix(
+        candidate_normalized[candidate_rows], n, vocabulary, grow=True
+    )
+    matrix, sizes = _ngram_matrix(normalized[rows], n, vocabulary, grow=False)
+    matrix.resize(matrix.shape[0], candidate_matrix.shape[1])
+
+    # candidates sorted by year, so that a year window is a contiguous slice
+    candidate_order = np.argsort(candidate_year_values[candidate_rows], kind="stable")
+    sorted_candidate_years = candidate_year_values[candidate_rows][candidate_order]
+    candidate_matrix_t = candidate_matrix[candidate_order].T.tocsr()
+
+    # (row, candidate, similarity, year gap) of every acceptable pair
+    pairs = []
+    row_years = year_values[rows]
+    for year in np.unique(row_years):
+        block = np.flatnonzero(row_years == year)
+        start, end = np.searchsorted(
+            sorted_candidate_years, [year - year_window, year + year_window + 1]
+        )
+        if start == end:
+            continue
+
+        # number of shared n-grams of every (title, candidate) pair in the block
+        shared = (matrix[block] @ candidate_matrix_t[:, start:end]).tocsr()
+        if shared.nnz == 0:
+            continue
+        pair_rows = np.repeat(np.arange(len(block)), np.diff(shared.indptr))
+        pair_candidates = candidate_order[start:end][shared.indices]
+        dice = (
+            2
+            * shared.data
+            / (sizes[block][pair_rows] + candidate_sizes[pair_candidates])
+        )
+
+        year_gap = np.abs(sorted_candidate_years[start:end][shared.indices] - year)
+        keep = dice >= threshold
+        keep[keep] = [
+            numbers[block[r]] == candidate_numbers[c]
+            for r, c in zip(pair_rows[keep], pair_candidates[keep])
+        ]
+        pairs.append(
+            (
+                block[pair_rows[keep]],
+                pair_candidates[keep],
+                dice[keep],
+                year_gap[keep],
+            )
+        )
+
+    if not pairs:
+        return positions, scores
+    pair_rows, pair_candidates, dice, year_gap = (
+        np.concatenate(values) for values in zip(*pairs)
+    )
+
+    # greedy one-to-one assignment: highest similarity, then closest year
+    order = np.lexsort((pair_candidates, pair_rows, year_gap, -dice))
+    row_used = np.zeros(len(rows), dtype=bool)
+    candidate_used = np.zeros(len(candidate_rows), dtype=bool)
+    for i in order:
+        row, candidate = pair_rows[i], pair_candidates[i]
+        if row_used[row] or candidate_used[candidate]:
+            continue
+        row_used[row] = candidate_used[candidate] = True
+        positions[rows[row]] = candidate_rows[candidate]
+        scores[rows[row]] = dice[i]
+
+    return positions, scores
+
+
+def take_rows(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """Take the rows at the given positions, with NaN rows where the position is -1."""
+    return df.reset_index(drop=True).reindex(positions).reset_index(drop=True)
@@ -1,144 +1,187 @@
 import numpy as np
 import pandas as pd
 
+from src.utils.matching_utils import match_cmu_tmdb, take_rows
 
-def merge_cmu_tmdb_data(df_movies, df_tmdb):
+
+def merge_cmu_tmdb_data(df_movies, df_tmdb, return_stats=False, fuzzy_threshold=None):
     """
     Merges CMU movies data with TMDB data.
 
+    Movies are matched on their normalized title and release year. With a
+    fuzzy_threshold, the remaining ones are then fuzzy-matched on title within
+    one release year (off by default, see matching_utils.match_cmu_tmdb). Each
+    CMU movie is matched to at most one TMDB movie, so the merge never adds
+    rows (see matching_utils.match_cmu_tmdb). The match_confidence column
+    records how each movie was matched.
+
     Args:
         df_movies (pd.DataFrame): CMU movies dataframe.
         df_tmdb (pd.DataFrame): TMDB movies dataframe.
+        return_stats (bool): also return the match statistics.
+        fuzzy_threshold (float): minimum title similarity of a fuzzy match,
+            None (the default) to only use exact matches.
 
     Returns:
         df_movies_merged (pd.DataFrame): Merged dataframe.
+        stats (dict): Match statistics, only if return_stats is True.
     """
+    df_movies = df_movies.copy()
+
     # Ensure movie_release_date is in datetime format and extract year, month, and day
     df_movies["movie_release_date"] = pd.to_datetime(
         df_movies["movie_release_date"], errors="coerce"
     )
     df_movies["release_year"] = df_movies["movie_release_date"].dt.year
-    df_movies["release_month"] = df_movies["movie_release_date"].dt.month
-    df_movies["release_day"] = df_movies["movie_release_date"].dt.day
-
-    # Merge the TMDB dataset with the existing df_movies DataFrame
-    df_movies_merged = pd.merge(
-        df_movies,
-        df_tmdb[
-            [
-                "title",
-                "release_year",
-                "release_month",
-                "release_day",
-                "revenue",
-                "budget",
-                "imdb_id",
-            ]
-        ],
-        left_on=["movie_name", "release_year"],
-        right_on=["title", "release_year"],
-        how="left",
+    release_month = df_movies["movie_release_date"].dt.month
+    release_day = df_movies["movie_release_date"].dt.day
+
+    # Only keep the month and day when the release date actually gives them
+    if "movie_release_date_precision" in df_movies.columns:
+        precision = df_movies["movie_release_date_precision"]
+        release_month = release_month.where(precision.isin(["month", "day"]))
+        release_day = release_day.where(precision == "day")
+
+    # Match every CMU movie to at most one TMDB movie
+    positions, confidence, stats = match_cmu_tmdb(
+        df_movies, df_tmdb, fuzzy_threshold=fuzzy_threshold
+    )
+    df_tmdb_matched = take_rows(
+        df_tmdb[["release_month", "release_day", "revenue", "budget", "imdb_id"]],
+        positions,
+    )
+    df_tmdb_matched.index = df_movies.index
+
+    df_movies_merged = pd.concat(
+        [df_movies, df_tmdb_matched[["revenue", "budget", "imdb_id"]]], axis=1
     )
+    df_movies_merged["match_confidence"] = confidence
 
     # Create a combined revenue column
     df_movies_merged["combined_revenue"] = df_movies_merged[
         "movie_box_office_revenue"
     ].combine_first(df_movies_merged["revenue"])
 
-    # Create combined release_month and release_day columns
-    df_movies_merged["release_month"] = df_movies_merged[
-        "release_month_x"
-    ].combine_first(df_movies_merged["release_month_y"])
-    df_movies_merged["release_day"] = df_movies_merged["release_day_x"].combine_first(
-        df_movies_merged["release_day_y"]
+    # Create combined release_month and release_day columns (TMDB fills in the
+    # month and day of movies whose CMU release date only gives the year)
+    df_movies_merged["release_month"] = release_month.combine_first(
+        df_tmdb_matched["release_month"]
     )
-
-    # Drop the redundant columns
-    df_movies_merged.drop(
-        columns=[
-            "release_month_x",
-            "release_month_y",
-            "release_day_x",
-            "release_day_y",
-            "title",
-        ],
-        inplace=True,
+    df_movies_merged["release_day"] = release_day.combine_first(
+        df_tmdb_matched["release_day"]
     )
 
+    if return_stats:
+        return df_movies_merged, stats
     return df_movies_merged
 
 
-def merge_with_imdb_data(
-    df_movies_merged, df_title_basics, df_title_ratings, df_title_crew, df_name_basics
+def _keyed_subset(table, key_column, value_columns, keys=None):
+    """
+    Index the value columns of an IMDb table by its key column.
+
+    Args:
+        table (pd.DataFrame): IMDb table
+        key_column (str): "tconst" or "nconst"
+        value_columns (list): columns to keep
+        keys (array-like): if given, only these keys are kept
+
+    Returns:
+        pd.DataFrame: value_columns indexed by unique keys
+    """
+    if keys is not None:
+        table = table[table[key_column].isin(keys)]
+    subset = table[[key_column] + value_columns].drop_duplicates(subset=key_column)
+    return subset.set_index(key_column)
+
+
+def build_imdb_index(
+    df_title_basics, df_title_ratings, df_title_crew, df_name_basics, tconsts=None
 ):
     """
-    Merges the merged CMU and TMDB data with IMDb data.
+    Build the tconst- and nconst-keyed lookup tables used to enrich movies.
 
     Args:
-        df_movies_merged (pd.DataFrame): Dataframe after merging CMU and TMDB data.
         df_title_basics (pd.DataFrame): IMDb title basics dataframe.
         df_title_ratings (pd.DataFrame): IMDb title ratings dataframe.
         df_title_crew (pd.DataFrame): IMDb title crew dataframe.
         df_name_basics (pd.DataFrame): IMDb name basics dataframe.
+        tconsts (array-like): if given, only these titles (and their first
+            directors) are indexed, which keeps the index small.
 
     Returns:
-        df_movies_combined (pd.DataFrame): Dataframe after merging with IMDb data.
+        imdb_index (dict): "titles" (primaryTitle, startYear, averageRating,
+        numVotes, first_director indexed by tconst) and "names" (primaryName
+        indexed by nconst).
     """
-    # Merge with IMDb title_basics
-    df_movies_combined = pd.merge(
-        df_movies_merged,
-        df_title_basics[["tconst", "primaryTitle", "startYear"]],
-        left_on="imdb_id",
-        right_on="tconst",
-        how="left",
-    )
+    if tconsts is not None:
+        tconsts = pd.unique(pd.Series(tconsts).dropna())
 
-    # Merge with IMDb title_ratings
-    df_movies_combined = pd.merge(
-        df_movies_combined,
-        df_title_ratings[["tconst", "averageRating", "numVotes"]],
-        left_on="imdb_id",
-        right_on="tconst",
-        how="left",
+    basics = _keyed_subset(
+        df_title_basics, "tconst", ["primaryTitle", "startYear"], tconsts
     )
-
-    # Merge with IMDb title_crew
-    df_movies_combined = pd.merge(
-        df_movies_combined,
-        df_title_crew[["tconst", "directors"]],
-        left_on="imdb_id",
-        right_on="tconst",
-        how="left",
+    ratings = _keyed_subset(
+        df_title_ratings, "tconst", ["averageRating", "numVotes"], tconsts
     )
+    crew = _keyed_subset(df_title_crew, "tconst", ["directors"], tconsts)
 
-    # Get the first mentioned director
-    df_movies_combined["first_director"] = (
-        df_movies_combined["directors"].str.split(",").str[0]
-    )
+    # Keep the first mentioned director only
+    first_director = crew["directors"].str.split(",", n=1).str[0]
+    titles = basics.join([ratings, first_director.rename("first_director")], how="outer")
 
-    # Merge with name.basics to get director details
-    df_movies_combined = pd.merge(
-        df_movies_combined,
-        df_name_basics[["nconst", "primaryName"]],
-        left_on="first_director",
-        right_on="nconst",
-        how="left",
-    )
+    nconsts = None if tconsts is None else first_director.dropna().unique()
+    names = _keyed_subset(df_name_basics, "nconst", ["primaryName"], nconsts)
+
+    return {"titles": titles, "names": names}
+
+
+def merge_with_imdb_data(
+    df_movies_merged,
+    df_title_basics=None,
+    df_title_ratings=None,
+    df_title_crew=None,
+    df_name_basics=None,
+    imdb_index=None,
+):
+    """
+    Merges the merged CMU and TMDB data with IMDb data.
+
+    Every attribute is looked up in a keyed index with a single reindex, instead
+    of successive merges against the full IMDb tables.
 
-    # Rename the column to 'director'
-    df_movies_combined.rename(columns={"primaryName": "director"}, inplace=True)
-
-    # Drop the redundant columns
-    df_movies_combined.drop(
-        columns=[
-            "tconst_x",
-            "tconst_y",
-            "tconst",
-            "directors",
-            "first_director",
-            "nconst",
-        ],
-        inplace=True,
+    Args:
+        df_movies_merged (pd.DataFrame): Dataframe after merging CMU and TMDB data.
+        df_title_basics (pd.DataFrame): IMDb title basics dataframe.
+        df_title_ratings (pd.DataFrame): IMDb title ratings dataframe.
+        df_title_crew (pd.DataFrame): IMDb title crew dataframe.
+        df_name_basics (pd.DataFrame): IMDb name basics dataframe.
+        imdb_index (dict): Pre-built index from build_imdb_index, used instead
+            of the IMDb dataframes if given.
+
+    Returns:
+        df_movies_combined (pd.DataFrame): Dataframe after merging with IMDb data.
+    """
+    if imdb_index is None:
+        imdb_index = build_imdb_index(
+            df_title_basics,
+            df_title_ratings,
+            df_title_crew,
+            df_name_basics,
+            tconsts=df_movies_merged["imdb_id"],
+        )
+
+    df_movies_combined = df_movies_merged.copy()
+
+    # Look up the title attributes of every movie
+    titles = imdb_index["titles"].reindex(df_movies_combined["imdb_id"].to_numpy())
+    for column in ["primaryTitle", "startYear", "averageRating", "numVotes"]:
+        df_movies_combined[column] = titles[column].to_numpy()
+
+    # Look up the name of the first mentioned director
+    df_movies_combined["director"] = (
+        imdb_index["names"]["primaryName"]
+        .reindex(titles["first_director"].to_numpy())
+        .to_numpy()
     )
 
     return df_movies_combined
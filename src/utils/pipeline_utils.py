@@ -0,0 +1,459 @@
+import os
+import ast
+import time
+import pickle
+import hashlib
+import inspect
+import importlib
+import sysconfig
+import tracemalloc
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils import data_utils as du
+from src.utils import merge_utils as mu
+from src.utils import general_utils as gu
+from src.utils import update_utils as uu
+from src.utils.storage_utils import save_processed_metadata, save_processed_movies
+
+CACHE_DIR = "data/cache/"
+# Directory of the helper modules
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules installed there are not part of the project, so not part of its cache keys
+_LIBRARY_PATHS = tuple(
+    os.path.realpath(sysconfig.get_paths()[name])
+    for name in ["stdlib", "platstdlib", "purelib", "platlib"]
+)
+
+
+@dataclass
+class Stage:
+    """
+    A named pipeline step.
+
+    The function is called with the upstream outputs named in inputs (in that
+    order) and with params as keyword arguments. Its result is stored under
+    the names in outputs (a tuple is unpacked when there are several).
+    """
+
+    name: str
+    func: Callable
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    files: List[str] = field(default_factory=list)
+    cache: bool = True
+
+
+def _hash_file(path, hasher, chunk_size=1 << 20):
+    """Feed the content of a file, or of every file in a directory, to hasher."""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                hasher.update(os.path.relpath(file_path, path).encode())
+                _hash_file(file_path, hasher, chunk_size)
+        return
+    if not os.path.exists(path):
+        hasher.update(b"<missing>")
+        return
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+
+
+def code_version(code_dir: str = CODE_DIR) -> str:
+    """Hash of the source of every Python module of a directory."""
+    hasher = hashlib.sha256()
+    for name in sorted(os.listdir(code_dir)):
+        if name.endswith(".py"):
+            hasher.update(name.encode())
+            _hash_file(os.path.join(code_dir, name), hasher)
+    return hasher.hexdigest()
+
+
+def _project_module(name: str) -> Optional[ModuleType]:
+    """The module of that name if it is a project module (not a library), else None."""
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+    path = getattr(module, "__file__", None)
+    if path is None or os.path.realpath(path).startswith(_LIBRARY_PATHS):
+        return None
+    return module
+
+
+def module_closure(module: ModuleType) -> List[ModuleType]:
+    """
+    The module and the project modules it imports, directly or not.
+
+    Imports are read from the source, so that imports inside functions are
+    found too. Standard library and installed packages are left out.
+
+    Args:
+        module (ModuleType): the module
+
+    Returns:
+        list: the modules, sorted by name
+    """
+    closure = {}
+    todo = [module]
+    while todo:
+        current = todo.pop()
+        if current.__name__ in closure:
+            continue
+        closure[current.__name__] = current
+        try:
+            tree = ast.parse(inspect.getsource(current))
+        except (OSError, TypeError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                # "from package import module" imports a module too
+                names = [node.module]
+                names += [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for name in names:
+                imported = None if name in closure else _project_module(name)
+                if imported is not None:
+                    todo.append(imported)
+    return [closure[name] for name in sorted(closure)]
+
+
+def modules_version(modules: List[ModuleType]) -> str:
+    """Hash of the source of the given modules."""
+    hasher = hashlib.sha256()
+    for module in modules:
+        hasher.update(module.__name__.encode())
+        path = getattr(module, "__file__", None)
+        if path is not None:
+            _hash_file(path, hasher)
+    return hasher.hexdigest()
+
+
+def _function_source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return repr(func)
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order with an on-disk cache of their outputs.
+
+    Each stage's cache key hashes its function source, its parameters, the
+    content of its input files and the keys of the stages it depends on, so
+    editing any of them only re-executes that stage and the stages downstream.
+    Keys also include the source of the project modules the stage function's
+    module imports, directly or not (see module_closure), so editing a helper
+    invalidates the stages that may call it, and only those.
+    Stages whose outputs are cached are not run, and their own inputs are not
+    even loaded.
+    """
+
+    def __init__(self, stages: List[Stage], cache_dir: str = CACHE_DIR):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self._code_versions = {}
+        self.producers = {
+            output: stage.name for stage in stages for output in stage.outputs
+        }
+        self.report = []
+        self._keys = {}
+        self._profile = False
+
+    def stage_key(self, name: str) -> str:
+        """Cache key of a stage, derived from its definition and its inputs' keys."""
+        if name in self._keys:
+            return self._keys[name]
+        stage = self.stages[name]
+        hasher = hashlib.sha256()
+        hasher.update(self._code_version(stage.func).encode())
+        hasher.update(_function_source(stage.func).encode())
+        hasher.update(repr(sorted(stage.params.items())).encode())
+        hasher.update(repr(stage.outputs).encode())
+        for path in stage.files:
+            hasher.update(path.encode())
+            _hash_file(path, hasher)
+        for upstream in sorted({self.producers[i] for i in stage.inputs}):
+            hasher.update(self.stage_key(upstream).encode())
+        self._keys[name] = hasher.hexdigest()
+        return self._keys[name]
+
+    def _code_version(self, func: Callable) -> str:
+        """Hash of the modules a stage function may call into."""
+        module = inspect.getmodule(func)
+        if module is None:
+            return ""
+        if module.__name__ not in self._code_versions:
+            self._code_versions[module.__name__] = modules_version(
+                module_closure(module)
+            )
+        return self._code_versions[module.__name__]
+
+    def _cache_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{self.stage_key(name)[:16]}.pkl")
+
+    def _run_stage(self, name: str, values: Dict[str, Any], force: bool):
+        stage = self.stages[name]
+        cache_path = self._cache_path(name)
+
+        if stage.cache and not force and os.path.exists(cache_path):
+            start = time.perf_counter()
+            with open(cache_path, "rb") as f:
+                outputs = pickle.load(f)
+            self.report.append(
+                {
+                    "stage": name,
+                    "cached": True,
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+            values.update(outputs)
+            return
+
+        args = [self._resolve(i, values, force) for i in stage.inputs]
+        if self._profile:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = stage.func(*args, **stage.params)
+        seconds = time.perf_counter() - start
+
+        if len(stage.outputs) == 1:
+            result = (result,)
+        outputs = dict(zip(stage.outputs, result))
+        entry = {"stage": name, "cached": False, "seconds": seconds}
+        if self._profile:
+            # memory allocated on top of what was alive when the stage started
+            entry["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+        self.report.append(entry)
+
+        if stage.cache:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write then rename, so an interrupted run never leaves a bad entry
+            with open(cache_path + ".tmp", "wb") as f:
+                pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+        values.update(outputs)
+
+    def _resolve(self, output: str, values: Dict[str, Any], force: bool):
+        if output not in values:
+            self._run_stage(self.producers[output], values, force)
+        return values[output]
+
+    def run(
+        self,
+        targets: Optional[List[str]] = None,
+        force: bool = False,
+        profile: bool = False,
+    ):
+        """
+        Compute the target outputs, re-executing only invalidated stages.
+
+        Args:
+            targets (list): output names to compute, defaults to the outputs of
+                the last stage
+            force (bool): ignore the cache and re-execute every needed stage
+            profile (bool): trace allocations to record the peak memory of
+                every executed stage in the report (slows the run down)
+
+        Returns:
+            dict: output name -> value for every output computed or loaded
+        """
+        if targets is None:
+            targets = list(self.stages.values())[-1].outputs
+        self.report = []
+        self._keys = {}
+        self._code_versions = {}
+        self._profile = profile
+        started_tracing = profile and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            values = {}
+            for target in targets:
+                self._resolve(target, values, force)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._profile = False
+        return values
+
+
+def _export_movies(
+    df_movies,
+    checks_passed,
+    cpi,
+    output_dir,
+    output_format,
+    cpi_file,
+    ratings_file,
+    target_year=None,
+):
+    """
+    Write the processed movie dataset, if the final checks passed.
+
+    The ratings and CPI snapshots it was built from are recorded in its
+    metadata, so update_utils can later patch it incrementally.
+    """
+    if not checks_passed:
+        raise ValueError("Final validation checks failed. Please review the data.")
+    if target_year is None:
+        target_year = int(df_movies["release_year"].max())
+    metadata = {"snapshots": {"cpi": uu.cpi_snapshot(cpi, cpi_file, target_year)}}
+    if os.path.exists(ratings_file):
+        metadata["snapshots"]["ratings"] = uu.ratings_snapshot(ratings_file)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    if output_format in ("csv", "all"):
+        paths.append(os.path.join(output_dir, "movies_processed.csv"))
+        df_movies.to_csv(paths[-1], index=False)
+        save_processed_metadata(paths[-1], metadata)
+    if output_format in ("parquet", "all"):
+        paths.append(
+            save_processed_movies(
+                df_movies,
+                os.path.join(output_dir, "movies_processed.parquet"),
+                metadata=metadata,
+            )
+        )
+    return paths
+
+
+def build_data_preparation_pipeline(
+    path="data/",
+    cpi_file="data/Inflation/CPIAUCNS.csv",
+    target_year=None,
+    output_dir="data/processed/",
+    output_format="csv",
+    workers=4,
+    cache_dir=CACHE_DIR,
+):
+    """
+    Build the load -> preprocess -> merge -> clean -> inflate -> check -> export pipeline.
+
+    This is the pipeline of the data_preparation notebook. The raw loading
+    stages are not cached (reading the raw files is as fast as unpickling
+    them), but their files are hashed so any change invalidates what follows.
+
+    Args:
+        path (str): Base directory path containing the dataset folders
+        cpi_file (str): Path to the CPI data
+        target_year (int): Year to adjust money to, defaults to the latest release year
+        output_dir (str): Directory the processed dataset is written to
+        output_format (str): "csv", "parquet" or "all"
+        workers (int): Number of IMDb files loaded in parallel
+        cache_dir (str): Directory of the stage cache
+
+    Returns:
+        Pipeline: the pipeline, whose final output is "output_paths"
+    """
+    stages = [
+        Stage(
+            "load_cmu",
+            du.load_cmu_movies_data,
+            outputs=["raw_movies", "plots", "raw_characters"],
+            params={"path": path},
+            files=[f"{path}MovieSummaries"],
+            cache=False,
+        ),
+        Stage(
+            "load_tmdb",
+            du.load_tmdb_data,
+            outputs=["raw_tmdb"],
+            params={"path": path},
+            files=[f"{path}TMDB"],
+            cache=False,
+        ),
+        Stage(
+            "load_imdb",
+            du.load_imdb_data,
+            outputs=["raw_title_basics", "raw_title_ratings", "raw_title_crew", "raw_name_basics"],
+            params={"path": path, "max_workers": workers},
+            files=[f"{path}IMDB"],
+            cache=False,
+        ),
+        Stage(
+            "preprocess_cmu",
+            du.preprocess_cmu_movies_data,
+            inputs=["raw_movies", "raw_characters"],
+            outputs=["movies", "characters"],
+        ),
+        Stage(
+            "preprocess_tmdb",
+            du.preprocess_tmdb_data,
+            inputs=["raw_tmdb"],
+            outputs=["tmdb"],
+        ),
+        Stage(
+            "preprocess_imdb",
+            du.preprocess_imdb_data,
+            inputs=["raw_title_basics", "raw_title_ratings", "raw_title_crew", "raw_name_basics"],
+            outputs=["title_basics", "title_ratings", "title_crew", "name_basics"],
+            cache=False,
+        ),
+        Stage(
+            "merge_tmdb",
+            mu.merge_cmu_tmdb_data,
+            inputs=["movies", "tmdb"],
+            outputs=["movies_merged"],
+        ),
+        Stage(
+            "merge_imdb",
+            mu.merge_with_imdb_data,
+            inputs=["movies_merged", "title_basics", "title_ratings", "title_crew", "name_basics"],
+            outputs=["movies_combined"],
+        ),
+        Stage(
+            "clean",
+            du.clean_combined_movies,
+            inputs=["movies_combined"],
+            outputs=["movies_clean"],
+        ),
+        Stage(
+            "load_cpi",
+            du.load_cpi_data,
+            outputs=["cpi"],
+            params={"cpi_file": cpi_file},
+            files=[cpi_file],
+        ),
+        Stage(
+            "inflate",
+            gu.adjust_movies_for_inflation,
+            inputs=["movies_clean", "cpi"],
+            outputs=["movies_processed"],
+            params={"target_year": target_year},
+        ),
+        Stage(
+            "checks",
+            gu.perform_final_checks,
+            inputs=["movies_processed"],
+            outputs=["checks_passed"],
+            # not cached, so that its report and warnings are printed every run
+            cache=False,
+        ),
+        Stage(
+            "export",
+            _export_movies,
+            inputs=["movies_processed", "checks_passed", "cpi"],
+            outputs=["output_paths"],
+            params={
+                "output_dir": output_dir,
+                "output_format": output_format,
+                "cpi_file": cpi_file,
+                "ratings_file": f"{path}IMDB/title.ratings.tsv.gz",
+                "target_year": target_year,
+            },
+            cache=False,
+        ),
+    ]
+    return Pipeline(stages, cache_dir=cache_dir)
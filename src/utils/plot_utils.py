@@ -2,7 +2,12 @@ import numpy as np
 import seaborn as sns
 import plotly.express as px
 import matplotlib.pyplot as plt
-import plotly.graph_objects as go
+
+from src.utils.animation_utils import (
+    revenue_treemap_animation,
+    treemap_tables,
+    treemap_top_data,
+)
 
 
 def plot_genre_barplot(genre_counts, title="Number of Movies per Genre"):
@@ -111,21 +116,21 @@ def plot_genre_correlation_bars(
     )
     for i in y:
         ax.text(
-            x_pearson[i],
+            x_pearson.iloc[i],
             i + 0.2,
-            f"{x_pearson[i]:.3f}",
+            f"{x_pearson.iloc[i]:.3f}",
             va="center",
-            ha="left" if x_pearson[i] >= 0 else "right",
+            ha="left" if x_pearson.iloc[i] >= 0 else "right",
             fontsize=12,
             fontweight="bold",
             color="#16a085",
         )
         ax.text(
-            x_spearman[i],
+            x_spearman.iloc[i],
             i - 0.2,
-            f"{x_spearman[i]:.3f}",
+            f"{x_spearman.iloc[i]:.3f}",
             va="center",
-            ha="left" if x_spearman[i] >= 0 else "right",
+            ha="left" if x_spearman.iloc[i] >= 0 else "right",
             fontsize=12,
             fontweight="bold",
             color="#2980b9",
@@ -149,30 +154,9 @@ def create_treemap(data, title, year, mode="movies", top_n=15):
         Plotly treemap figure
     """
     year_data = data[data["release_year"] == year]  # filter data for the given year
-
-    if mode == "movies":
-        col_to_path = ["movie_name"]
-        top_data = year_data.nlargest(top_n, "inflated_revenue")[
-            ["movie_name", "director", "inflated_revenue"]
-        ].reset_index()
-
-    elif mode == "directors":
-        col_to_path = ["director"]
-        top_data = (
-            year_data.groupby("director")["inflated_revenue"]
-            .sum()
-            .nlargest(top_n)
-            .reset_index()
-        )  # group by director and sum the revenue
-        top_data["movie_name"] = top_data["director"].apply(
-            lambda x: year_data[year_data["director"] == x]["movie_name"].tolist()
-        )
-
-        top_data["movie_name"] = top_data["movie_name"].apply(
-            lambda x: ",".join(x)
-        )  # join the movie names to a single string
-    else:
-        raise ValueError("Invalid mode. Choose 'movies' or 'directors'.")
+    # top movies, or top directors with their movie names joined
+    top_data = treemap_top_data(year_data, mode, top_n)
+    col_to_path = ["movie_name"] if mode == "movies" else ["director"]
 
     # interactive treemap
     fig = px.treemap(
@@ -215,18 +199,22 @@ def create_animated_treemap(data, title, mode="movies", top_n=15):
     """
     unique_years = sorted(data["release_year"].unique())
 
-    # Create frames for each year
-    frames = [
-        go.Frame(
-            data=create_treemap(data, title, year, mode=mode, top_n=top_n).data,
-            name=str(year),
-        )
-        for year in unique_years
-    ]
+    # Tiles of every year
+    tables = treemap_tables(data, mode=mode, top_n=top_n)
 
-    # Create initial plot for the first year
-    initial_fig = create_treemap(data, title, unique_years[0], mode=mode, top_n=top_n)
-    initial_fig.frames = frames
+    # Labels and colours are stored once, frames only carry what changes
+    initial_fig = revenue_treemap_animation(
+        tables, mode, px.colors.qualitative.Light24, start=unique_years[0]
+    )
+    initial_fig.update_layout(
+        title=dict(
+            text=f"Top {top_n} {title} revenue over the years",
+            font=dict(size=20),
+            x=0.5,
+        ),
+        paper_bgcolor="black",
+        font=dict(color="white"),
+    )
 
     # Add controls for animation
     initial_fig.update_layout(
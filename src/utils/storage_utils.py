@@ -0,0 +1,229 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from src.utils.encoding_utils import LIST_COLUMNS, parse_tuple_list
+
+PROCESSED_CSV_PATH = "data/processed/movies_processed.csv"
+PROCESSED_PARQUET_PATH = "data/processed/movies_processed.parquet"
+
+# Schema metadata key holding the dataset's own metadata (snapshot versions...)
+METADATA_KEY = b"movies_processed"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for the columnar movie cache. Install it with `pip install pyarrow`."
+        ) from e
+    return pa, pq, feather
+
+
+def _fix_surrogates(text):
+    """Recombine UTF-16 surrogate pairs left over from the Freebase JSON escapes."""
+    try:
+        text.encode("utf-8")
+        return text
+    except UnicodeEncodeError:
+        return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+
+def _tuple_lists_to_arrow(values, pa):
+    """
+    Convert a sequence of (freebase_id, name) lists to an Arrow list<struct> array.
+
+    Stringified cells are only parsed once per distinct value.
+    """
+    series = pd.Series(values, dtype=object)
+    if series.map(type).eq(str).all():
+        uniques = series.unique()
+        parsed = dict(zip(uniques, map(parse_tuple_list, uniques)))
+        rows = series.map(parsed)
+    else:
+        rows = series.map(parse_tuple_list)
+
+    lengths = rows.map(len).to_numpy(dtype=np.int32)
+    offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = [pair for row in rows for pair in row]
+    ids = pa.array([pair[0] for pair in flat], type=pa.string()).dictionary_encode()
+    names = pa.array(
+        [_fix_surrogates(pair[1]) for pair in flat], type=pa.string()
+    ).dictionary_encode()
+    items = pa.StructArray.from_arrays([ids, names], names=["id", "name"])
+    return pa.ListArray.from_arrays(pa.array(offsets), items)
+
+
+def _decode_strings(array):
+    """Decode a (possibly dictionary-encoded) Arrow string array to Python strings."""
+    if hasattr(array, "dictionary"):
+        dictionary = np.array(array.dictionary.to_pylist(), dtype=object)
+        return dictionary[array.indices.to_numpy(zero_copy_only=False)].tolist()
+    return array.to_pylist()
+
+
+def _arrow_to_tuple_lists(column):
+    """Convert an Arrow list<struct<id, name>> column back to tuples of pairs."""
+    column = column.combine_chunks()
+    offsets = column.offsets.to_numpy()
+    items = column.values
+    ids = _decode_strings(items.field("id"))
+    names = _decode_strings(items.field("name"))
+    pairs = list(zip(ids, names))
+    return [tuple(pairs[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _metadata_sidecar(path: str) -> str:
+    return f"{path}.meta.json"
+
+
+def save_processed_movies(
+    df: pd.DataFrame,
+    path: str = PROCESSED_PARQUET_PATH,
+    metadata: Optional[dict] = None,
+) -> str:
+    """
+    Write the processed movie table to a columnar file.
+
+    The list columns (languages, countries, genres) are stored as nested
+    list<struct<id, name>> columns with dictionary-encoded strings, so they
+    never have to be re-parsed from their string representation.
+
+    Args:
+        df (pd.DataFrame): the processed movie table, with list columns either
+            parsed (lists of tuples) or stringified as in the CSV export
+        path (str): output path, ending in .parquet or .feather
+        metadata (dict): optional JSON-serializable metadata stored in the
+            file's schema (see load_processed_metadata)
+
+    Returns:
+        str: the path the table was written to
+    """
+    pa, pq, feather = _import_pyarrow()
+
+    list_columns = [col for col in LIST_COLUMNS if col in df.columns]
+    table = pa.Table.from_pandas(
+        df.drop(columns=list_columns), preserve_index=False
+    )
+    for col in list_columns:
+        table = table.append_column(col, _tuple_lists_to_arrow(df[col], pa))
+    # keep the original column order
+    table = table.select(list(df.columns))
+    if metadata is not None:
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata)}
+        )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".feather"):
+        feather.write_feather(table, path, compression="zstd")
+    else:
+        pq.write_table(table, path, compression="zstd")
+
+    return path
+
+
+def load_processed_movies(
+    path: Optional[str] = None, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Load the processed movie table, reading only the requested columns.
+
+    Reads the columnar cache when it exists and falls back to the CSV export
+    otherwise. In both cases the list columns are returned as (hashable)
+    tuples of (freebase_id, name) pairs.
+
+    Args:
+        path (str): path to a .parquet, .feather or .csv file. Defaults to the
+            Parquet cache, or the CSV export if the cache has not been built.
+        columns (list): subset of columns to load, None for all
+
+    Returns:
+        pd.DataFrame: the processed movie table
+    """
+    if path is None:
+        path = (
+            PROCESSED_PARQUET_PATH
+            if os.path.exists(PROCESSED_PARQUET_PATH)
+            else PROCESSED_CSV_PATH
+        )
+
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, usecols=columns)
+        for col in LIST_COLUMNS:
+            if col in df.columns:
+                uniques = df[col].dropna().unique()
+                parsed = {value: tuple(parse_tuple_list(value)) for value in uniques}
+                df[col] = df[col].map(parsed)
+        return df
+
+    pa, pq, feather = _import_pyarrow()
+    if path.endswith(".feather"):
+        table = feather.read_table(path, columns=columns)
+    else:
+        table = pq.read_table(path, columns=columns)
+
+    list_columns = [col for col in LIST_COLUMNS if col in table.column_names]
+    df = table.drop(list_columns).to_pandas()
+    for col in list_columns:
+        df[col] = _arrow_to_tuple_lists(table.column(col))
+
+    return df[table.column_names]
+
+
+def convert_processed_csv(
+    csv_path: str = PROCESSED_CSV_PATH, path: str = PROCESSED_PARQUET_PATH
+) -> str:
+    """
+    Build the columnar cache from an existing CSV export.
+
+    Args:
+        csv_path (str): path to the processed CSV file
+        path (str): output path, ending in .parquet or .feather
+
+    Returns:
+        str: the path the table was written to
+    """
+    return save_processed_movies(pd.read_csv(csv_path), path)
+
+
+def save_processed_metadata(path: str, metadata: dict) -> None:
+    """
+    Store metadata for a CSV export, in a JSON file next to it.
+
+    Columnar files keep their metadata in their schema instead (see
+    save_processed_movies).
+    """
+    with open(_metadata_sidecar(path), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_processed_metadata(path: str = PROCESSED_PARQUET_PATH) -> dict:
+    """
+    Read the metadata stored with a processed movie file, without reading the data.
+
+    Args:
+        path (str): path to a .parquet, .feather or .csv file
+
+    Returns:
+        dict: the stored metadata, empty if there is none
+    """
+    if path.endswith(".csv"):
+        if not os.path.exists(_metadata_sidecar(path)):
+            return {}
+        with open(_metadata_sidecar(path)) as f:
+            return json.load(f)
+
+    pa, pq, feather = _import_pyarrow()
+    if path.endswith(".feather"):
+        schema = pa.ipc.open_file(path).schema
+    else:
+        schema = pq.read_schema(path)
+    raw = (schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else {}
@@ -0,0 +1,188 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.utils import data_utils as du
+from src.utils import general_utils as gu
+from src.utils import storage_utils as su
+
+
+def file_fingerprint(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def ratings_snapshot(ratings_file: str, rows_updated: Optional[int] = None) -> Dict:
+    """Snapshot record of an applied IMDb ratings file."""
+    return {
+        "file": ratings_file,
+        "sha256": file_fingerprint(ratings_file),
+        "applied_at": _now(),
+        "rows_updated": rows_updated,
+    }
+
+
+def cpi_snapshot(
+    cpi: pd.DataFrame, cpi_file: str, target_year: int, rows_updated: Optional[int] = None
+) -> Dict:
+    """Snapshot record of applied CPI data, keeping the yearly values to diff against."""
+    return {
+        "file": cpi_file,
+        "sha256": file_fingerprint(cpi_file),
+        "applied_at": _now(),
+        "target_year": int(target_year),
+        "values": {str(int(y)): float(v) for y, v in zip(cpi["year"], cpi["CPIAUCNS"])},
+        "rows_updated": rows_updated,
+    }
+
+
+def update_ratings(df: pd.DataFrame, ratings_file: str, metadata: Dict):
+    """
+    Patch averageRating and numVotes from a new IMDb ratings snapshot.
+
+    Only the movies whose rating or vote count changed are touched; movies
+    missing from the new snapshot keep their values.
+
+    Args:
+        df (pd.DataFrame): the processed movie table (modified in place)
+        ratings_file (str): path to the new title.ratings.tsv.gz
+        metadata (dict): the table's metadata, whose "snapshots" are updated
+
+    Returns:
+        np.ndarray: positions of the updated rows
+    """
+    snapshots = metadata.setdefault("snapshots", {})
+    fingerprint = file_fingerprint(ratings_file)
+    if snapshots.get("ratings", {}).get("sha256") == fingerprint:
+        return np.empty(0, dtype=np.int64)
+
+    ratings = du.load_imdb_ratings(ratings_file, tconsts=df["imdb_id"].dropna())
+    new = ratings.drop_duplicates("tconst").set_index("tconst").reindex(df["imdb_id"])
+    new_rating = new["averageRating"].to_numpy(dtype=float)
+    new_votes = new["numVotes"].to_numpy(dtype=float)
+
+    # Compare at the precision IMDb publishes ratings with
+    old_rating = df["averageRating"].to_numpy(dtype=float)
+    old_votes = df["numVotes"].to_numpy(dtype=float)
+    changed = ~np.isnan(new_rating) & (
+        (np.round(new_rating, 1) != np.round(old_rating, 1)) | (new_votes != old_votes)
+    )
+    rows = np.flatnonzero(changed)
+
+    df.iloc[rows, df.columns.get_loc("averageRating")] = np.round(new_rating[rows], 1)
+    df.iloc[rows, df.columns.get_loc("numVotes")] = new_votes[rows]
+
+    snapshots["ratings"] = ratings_snapshot(ratings_file, int(len(rows)))
+    return rows
+
+
+def update_cpi(
+    df: pd.DataFrame, cpi_file: str, metadata: Dict, target_year: Optional[int] = None
+):
+    """
+    Patch inflated_revenue and inflated_budget from new CPI data.
+
+    The yearly CPI values are diffed against the last applied snapshot: only
+    the movies released in a year whose CPI changed are re-adjusted, unless
+    the target year or its CPI changed, in which case every movie is.
+
+    Args:
+        df (pd.DataFrame): the processed movie table (modified in place)
+        cpi_file (str): path to the new CPIAUCNS.csv
+        metadata (dict): the table's metadata, whose "snapshots" are updated
+        target_year (int): year to adjust money to, defaults to the last
+            applied target year (or the latest release year)
+
+    Returns:
+        np.ndarray: positions of the updated rows
+    """
+    snapshots = metadata.setdefault("snapshots", {})
+    previous = snapshots.get("cpi", {})
+    fingerprint = file_fingerprint(cpi_file)
+    if target_year is None:
+        target_year = previous.get("target_year", int(df["release_year"].max()))
+    if previous.get("sha256") == fingerprint and previous.get("target_year") == target_year:
+        return np.empty(0, dtype=np.int64)
+
+    cpi = du.load_cpi_data(cpi_file)
+    new_values = pd.Series(cpi["CPIAUCNS"].to_numpy(), index=cpi["year"].astype(int))
+    old_values = pd.Series(
+        {int(year): value for year, value in previous.get("values", {}).items()},
+        dtype=float,
+    )
+
+    if (
+        previous.get("target_year") != target_year
+        or old_values.get(target_year) != new_values.get(target_year)
+    ):
+        rows = np.arange(len(df))
+    else:
+        old_aligned = old_values.reindex(new_values.index)
+        changed_years = new_values.index[~np.isclose(new_values, old_aligned)]
+        rows = np.flatnonzero(df["release_year"].isin(changed_years).to_numpy())
+
+    if len(rows):
+        adjusted = gu.adjust_for_inflation(df.iloc[rows], cpi, target_year)
+        for column in ["inflated_revenue", "inflated_budget"]:
+            df.iloc[rows, df.columns.get_loc(column)] = adjusted[column].to_numpy()
+
+    snapshots["cpi"] = cpi_snapshot(cpi, cpi_file, target_year, int(len(rows)))
+    return rows
+
+
+def update_processed_movies(
+    path: str = su.PROCESSED_PARQUET_PATH,
+    ratings_file: Optional[str] = None,
+    cpi_file: Optional[str] = None,
+    target_year: Optional[int] = None,
+    output_path: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Incrementally refresh the processed dataset with a new ratings and/or CPI file.
+
+    Args:
+        path (str): processed movie file (.parquet, .feather or .csv)
+        ratings_file (str): new IMDb title.ratings snapshot, if any
+        cpi_file (str): new CPI data, if any
+        target_year (int): year to adjust money to, see update_cpi
+        output_path (str): where to write the result, defaults to path
+
+    Returns:
+        dict: number of rows updated by each snapshot
+    """
+    output_path = output_path or path
+    # A CSV is read raw: the updates never touch the list columns, so they
+    # are kept as the original strings and written back unchanged, and the
+    # floats are parsed exactly so that untouched cells round-trip
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, float_precision="round_trip")
+    else:
+        df = su.load_processed_movies(path)
+    metadata = su.load_processed_metadata(path)
+
+    updated = {}
+    if ratings_file is not None:
+        updated["ratings"] = len(update_ratings(df, ratings_file, metadata))
+    if cpi_file is not None:
+        updated["cpi"] = len(update_cpi(df, cpi_file, metadata, target_year))
+
+    if output_path.endswith(".csv"):
+        if not path.endswith(".csv"):
+            # Stringify the parsed list columns the way the CSV export does
+            for col in [col for col in su.LIST_COLUMNS if col in df.columns]:
+                df[col] = df[col].map(lambda value: str(list(value)))
+        df.to_csv(output_path, index=False)
+        su.save_processed_metadata(output_path, metadata)
+    else:
+        su.save_processed_movies(df, output_path, metadata=metadata)
+    return updated